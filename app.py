@@ -3,7 +3,7 @@ import json
 import uuid
 import logging
 from aiohttp import web
-from aiogram import executor
+from aiogram import executor, types
 from environs import Env
 
 # Environment variables
@@ -18,12 +18,23 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import bot va dispatcher
-from loader import dp, bot, user_db
+from loader import dp, bot, user_db, user_db_async, channel_db_async, broadcast_db
+from data.config import RUN_WORKER, WORKER_CONCURRENCY, WORKER_POLL_INTERVAL
+from utils.db_api.database import pool as db_pool
+from utils.db_api.instrumentation import query_stats
+from utils.db_api.migrations import create_tables, run_migrations
+from utils.misc.http_client import http_stats
+from utils.misc.polling import poll_stats
+from utils.misc.generation import generation_stats
+from utils.misc.llm_cache import llm_cache
+from utils.misc.openai_pool import openai_pool
+from utils.misc import subscription
 
 # Import utilities
 from utils.content_generator import ContentGenerator
 from utils.presenton_api import PresentonAPI
 from utils.presentation_worker import PresentationWorker
+from utils.render_pool import render_pool
 
 # API keys
 OPENAI_API_KEY = env.str("OPENAI_API_KEY")
@@ -61,34 +72,6 @@ async def handle_submit_presentation(request):
         theme_id = data.get('theme_id', 'chisel')
         language = data.get('language', 'uz')
 
-        free_left = user_db.get_free_presentations(telegram_id)
-        is_free = free_left > 0
-
-        if is_free:
-            user_db.use_free_presentation(telegram_id)
-            amount_charged = 0
-        else:
-            price_per_slide = user_db.get_price('slide_basic') or 2000.0
-            total_price = price_per_slide * slide_count
-            balance = user_db.get_user_balance(telegram_id)
-
-            if balance < total_price:
-                return web.json_response({
-                    'error': 'insufficient_balance',
-                    'required': total_price,
-                    'balance': balance
-                }, status=402)
-
-            success = user_db.deduct_from_balance(telegram_id, total_price)
-            if not success:
-                return web.json_response({'error': 'Balance deduction failed'}, status=500)
-
-            user_db.create_transaction(
-                telegram_id=telegram_id, transaction_type='withdrawal',
-                amount=total_price, description=f'Prezentatsiya ({slide_count} slayd)', status='approved'
-            )
-            amount_charged = total_price
-
         task_uuid = str(uuid.uuid4())
         content_data = {
             'topic': topic, 'details': details,
@@ -102,33 +85,39 @@ async def handle_submit_presentation(request):
             content_data['subtitle'] = data.get('subtitle', '')
             content_data['slides'] = data.get('slides', [])
 
-        task_id = user_db.create_presentation_task(
+        # Bepul limit/balans, tranzaksiya va task - bitta atomar tranzaksiyada
+        charge = await user_db_async.charge_and_create_presentation_task(
             telegram_id=telegram_id, task_uuid=task_uuid,
             presentation_type='basic', slide_count=slide_count,
             answers=json.dumps(content_data, ensure_ascii=False),
-            amount_charged=amount_charged
+            description=f'Prezentatsiya ({slide_count} slayd)'
         )
 
-        if not task_id:
-            if not is_free and amount_charged > 0:
-                user_db.add_to_balance(telegram_id, amount_charged)
-            return web.json_response({'error': 'Task creation failed'}, status=500)
+        if charge.get('error') == 'user_not_found':
+            return web.json_response({'error': 'user_not_found'}, status=404)
+        if not charge['ok']:
+            return web.json_response({
+                'error': 'insufficient_balance',
+                'required': charge['required'],
+                'balance': charge['balance']
+            }, status=402)
+
+        is_free = charge['is_free']
+        amount_charged = charge['amount_charged']
 
         try:
             if is_free:
-                new_free = user_db.get_free_presentations(telegram_id)
                 text = (
                     f"🎁 <b>BEPUL prezentatsiya boshlandi!</b>\n\n"
                     f"📊 Mavzu: {topic}\n📑 Slaydlar: {slide_count} ta\n"
-                    f"🎁 Qolgan bepul: {new_free} ta\n\n"
+                    f"🎁 Qolgan bepul: {charge['free_left']} ta\n\n"
                     f"⏳ <b>1-3 daqiqa</b>. Tayyor bo'lgach PPTX yuboriladi!"
                 )
             else:
-                new_balance = user_db.get_user_balance(telegram_id)
                 text = (
                     f"✅ <b>Prezentatsiya boshlandi!</b>\n\n"
                     f"📊 Mavzu: {topic}\n📑 Slaydlar: {slide_count} ta\n"
-                    f"💰 Yechildi: {amount_charged:,.0f} so'm\n💳 Balans: {new_balance:,.0f} so'm\n\n"
+                    f"💰 Yechildi: {amount_charged:,.0f} so'm\n💳 Balans: {charge['balance']:,.0f} so'm\n\n"
                     f"⏳ <b>1-3 daqiqa</b>. Tayyor bo'lgach PPTX yuboriladi!"
                 )
             await bot.send_message(telegram_id, text, parse_mode='HTML')
@@ -153,6 +142,36 @@ async def handle_health(request):
     return web.json_response({'status': 'ok', 'service': 'pitch_cv_bot'})
 
 
+async def handle_db_stats(request):
+    """SQL so'rovlar statistikasi (monitoring uchun)"""
+    auth = request.headers.get('Authorization', '')
+    if auth != f'Bearer {API_SECRET}':
+        return web.json_response({'error': 'Unauthorized'}, status=401)
+
+    try:
+        top = int(request.query.get('top', 20))
+    except ValueError:
+        top = 20
+    # Manfiy yoki juda katta qiymat - javob hajmi cheklangan
+    top = max(1, min(top, 100))
+    return web.json_response(query_stats.snapshot(top=top))
+
+
+async def handle_http_stats(request):
+    """Tashqi API (Presenton) latency, AI generatsiya qadamlari, AI kesh va OpenAI limit/token statistikasi"""
+    auth = request.headers.get('Authorization', '')
+    if auth != f'Bearer {API_SECRET}':
+        return web.json_response({'error': 'Unauthorized'}, status=401)
+
+    return web.json_response({
+        'endpoints': http_stats.snapshot(),
+        'polling': poll_stats.snapshot(),
+        'generation': generation_stats.snapshot(),
+        'llm_cache': {**llm_cache.snapshot(), **(await llm_cache.db_async.get_llm_cache_stats())},
+        'openai': openai_pool.snapshot(),
+    })
+
+
 api_runner = None
 
 async def start_api_server():
@@ -160,6 +179,8 @@ async def start_api_server():
     app = web.Application()
     app.router.add_post('/api/submit-presentation', handle_submit_presentation)
     app.router.add_get('/api/health', handle_health)
+    app.router.add_get('/api/db-stats', handle_db_stats)
+    app.router.add_get('/api/http-stats', handle_http_stats)
 
     @web.middleware
     async def cors_middleware(request, handler):
@@ -188,32 +209,6 @@ async def stop_api_server():
         logger.info("✅ HTTP API server to'xtatildi")
 
 
-def run_migrations():
-    logger.info("🔄 Database migratsiyalar tekshirilmoqda...")
-
-    migrations = [
-        {
-            'name': 'free_presentations',
-            'table': 'Users',
-            'sql': 'ALTER TABLE Users ADD COLUMN free_presentations INTEGER DEFAULT 0'
-        },
-    ]
-
-    for migration in migrations:
-        try:
-            check_sql = f"PRAGMA table_info({migration['table']})"
-            columns = user_db.execute(check_sql, fetchall=True)
-            column_names = [col[1] for col in columns]
-
-            if migration['name'] not in column_names:
-                user_db.execute(migration['sql'], commit=True)
-                logger.info(f"✅ Migration qo'shildi: {migration['name']}")
-            else:
-                logger.info(f"ℹ️ Migration mavjud: {migration['name']}")
-        except Exception as e:
-            logger.error(f"❌ Migration xato ({migration['name']}): {e}")
-
-
 async def on_startup(dispatcher):
     global presentation_worker
 
@@ -221,33 +216,64 @@ async def on_startup(dispatcher):
     logger.info("🚀 BOT ISHGA TUSHMOQDA...")
     logger.info("=" * 50)
 
+    # Har qanday rejimda (RUN_WORKER=false bo'lsa ham biznes reja DOCX shu pool'da)
+    # va boshqa thread'lar paydo bo'lishidan oldin
+    try:
+        render_pool.start()
+    except Exception as e:
+        logger.error(f"❌ Render pool xato: {e}")
+
     try:
-        user_db.create_table_users()
-        user_db.create_table_transactions()
-        user_db.create_table_pricing()
-        user_db.create_table_presentation_tasks()
-        user_db.create_business_plans_table()
+        create_tables(user_db, broadcast_db)
+        llm_cache.db.create_table_llm_cache()
         logger.info("✅ Database jadvallari tayyor")
     except Exception as e:
         logger.error(f"❌ Database xato: {e}")
 
     try:
-        run_migrations()
+        run_migrations(user_db)
         logger.info("✅ Database migratsiyalar tayyor")
+        logger.info(f"✅ Narxlar keshi: {user_db.load_pricing_cache()} ta narx "
+                    f"(versiya {user_db.get_pricing_version()})")
     except Exception as e:
         logger.error(f"❌ Migration xato: {e}")
 
     try:
-        presentation_worker = PresentationWorker(
-            bot=bot,
-            user_db=user_db,
-            content_generator=content_generator,
-            presenton_api=presenton_api
-        )
-        await presentation_worker.start()
-        logger.info("✅ Background Worker ishga tushdi")
+        channels = await channel_db_async.get_all_channels()
+        live = await subscription.sync_live_channels([channel[1] for channel in channels])
+        logger.info(f"✅ Obuna indeksi: {live}/{len(channels)} kanaldan chat_member update'lari keladi")
+    except Exception as e:
+        logger.error(f"❌ Obuna indeksi xato: {e}")
+
+    try:
+        await presenton_api.start()
     except Exception as e:
-        logger.error(f"❌ Worker xato: {e}")
+        logger.error(f"❌ Presenton sessiya xato: {e}")
+
+    if RUN_WORKER:
+        try:
+            presentation_worker = PresentationWorker(
+                bot=bot,
+                user_db=user_db_async,
+                content_generator=content_generator,
+                presenton_api=presenton_api,
+                concurrency=WORKER_CONCURRENCY,
+                recovery_interval=WORKER_POLL_INTERVAL
+            )
+            await presentation_worker.start()
+            logger.info("✅ Background Worker ishga tushdi")
+        except Exception as e:
+            logger.error(f"❌ Worker xato: {e}")
+    else:
+        logger.info("ℹ️ RUN_WORKER=false - task'larni alohida worker.py bajaradi")
+
+    try:
+        from handlers.users.reklama import resume_advertisements
+        resumed = await resume_advertisements()
+        if resumed:
+            logger.info(f"✅ {resumed} ta reklama davom ettirildi")
+    except Exception as e:
+        logger.error(f"❌ Reklamalarni tiklashda xato: {e}")
 
     try:
         await start_api_server()
@@ -271,10 +297,15 @@ async def on_shutdown(dispatcher):
         logger.info("✅ Background Worker to'xtatildi")
 
     await stop_api_server()
+    await presenton_api.close()
+    await openai_pool.close()
 
     await dp.storage.close()
     await dp.storage.wait_closed()
 
+    render_pool.shutdown(wait=False)
+    db_pool.close_all()
+
     logger.info("=" * 50)
     logger.info("✅ BOT TO'XTATILDI")
     logger.info("=" * 50)
@@ -285,5 +316,12 @@ if __name__ == '__main__':
         dp,
         on_startup=on_startup,
         on_shutdown=on_shutdown,
-        skip_updates=True
+        skip_updates=True,
+        # chat_member Telegram default'ida yo'q - obuna indeksi uchun alohida so'raladi
+        allowed_updates=(
+            types.AllowedUpdates.MESSAGE
+            + types.AllowedUpdates.CALLBACK_QUERY
+            + types.AllowedUpdates.CHAT_MEMBER
+            + types.AllowedUpdates.MY_CHAT_MEMBER
+        )
     )
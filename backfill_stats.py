@@ -0,0 +1,44 @@
+# backfill_stats.py
+# Statistika rollup jadvallarini (StatsUserGrowth, StatsUserTotals,
+# StatsDailyTransactions, StatsDailyTasks) asosiy jadvallardan qayta hisoblash.
+#
+# Bot ishga tushganda trigger'lar yo'q bo'lsa backfill avtomatik bajariladi;
+# bu skript qo'lda ta'mirlash yoki eski bazani import qilgandan keyin kerak.
+#
+#     python backfill_stats.py
+#     python backfill_stats.py --db data/user.db
+
+import argparse
+import sys
+import time
+
+from utils.db_api.users import UserDatabase
+from utils.db_api.database import pool as db_pool
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Statistika rollup'larini qayta hisoblash")
+    parser.add_argument("--db", default="data/user.db", help="SQLite fayl yo'li")
+    args = parser.parse_args()
+
+    user_db = UserDatabase(path_to_db=args.db)
+    started = time.perf_counter()
+    try:
+        # Jadval va trigger'lar hali yo'q bo'lsa yaratiladi (va shu yerda to'ldiriladi)
+        user_db.create_stats_rollups()
+        if not user_db.rebuild_stats_rollups():
+            return 1
+
+        hours = user_db.execute("SELECT COUNT(*), COALESCE(SUM(user_count), 0) FROM StatsUserGrowth",
+                                fetchone=True)
+        days = user_db.execute("SELECT COUNT(DISTINCT day) FROM StatsDailyTransactions", fetchone=True)
+        print(f"✅ Rollup'lar qayta hisoblandi ({time.perf_counter() - started:.2f} s)")
+        print(f"   Userlar: {hours[1]} ta, {hours[0]} ta soatlik bucket")
+        print(f"   Tranzaksiyalar: {days[0]} kunlik bucket")
+        return 0
+    finally:
+        db_pool.close_all()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
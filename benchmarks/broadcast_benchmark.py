@@ -0,0 +1,141 @@
+# benchmarks/broadcast_benchmark.py
+# Reklama yuborish benchmark: eski per-type send_* tarmoqlash vs BroadcastContent (copy_message)
+#
+# Soxta Telegram Bot API serveri (aiohttp) lokal portda ishga tushadi, bot unga
+# TelegramAPIServer orqali ulanadi - haqiqiy Telegram'ga so'rov ketmaydi.
+#
+# Ishga tushirish (loyiha ildizidan):
+#     python -m benchmarks.broadcast_benchmark --users 2000 --latency 20 --concurrency 20
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from aiogram import Bot, types
+from aiohttp import web
+from aiogram.bot.api import TelegramAPIServer
+
+from utils.broadcast import BroadcastContent, BroadcastEngine, RateLimiter
+
+ADMIN_CHAT_ID = 1
+FAKE_TOKEN = "123456:benchmark"
+
+CAMPAIGNS = {
+    'text': {'text': "Yangi kurs! Batafsil: example.com"},
+    'photo': {'photo': [{'file_id': 'photo-small', 'file_unique_id': 'ps', 'width': 90, 'height': 90},
+                        {'file_id': 'photo-big', 'file_unique_id': 'pb', 'width': 1280, 'height': 1280}],
+              'caption': "Aksiya"},
+    'video': {'video': {'file_id': 'video-1', 'file_unique_id': 'v1', 'width': 1280, 'height': 720,
+                        'duration': 30}, 'caption': "Video reklama"},
+    'document': {'document': {'file_id': 'doc-1', 'file_unique_id': 'd1'}, 'caption': "Katalog"},
+}
+
+
+class FakeTelegramServer:
+    """Har qanday metodga `latency` ms dan keyin muvaffaqiyatli javob"""
+
+    def __init__(self, latency: float):
+        self.latency = latency / 1000
+        self.calls = Counter()
+        self.runner = None
+        self.port = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        self.calls[method] += 1
+        data = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method.lower() == 'copymessage':
+            return web.json_response({'ok': True, 'result': {'message_id': 1}})
+        return web.json_response({'ok': True, 'result': {
+            'message_id': 1, 'date': int(time.time()), 'text': 'ok',
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+        }})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def make_message(kind: str) -> types.Message:
+    return types.Message.to_object({
+        'message_id': 42, 'date': int(time.time()),
+        'chat': {'id': ADMIN_CHAT_ID, 'type': 'private'},
+        **CAMPAIGNS[kind],
+    })
+
+
+async def legacy_send(bot: Bot, chat_id: int, message: types.Message):
+    """Eski handle_non_text_content: har userda content_type tarmoqlash"""
+    if message.content_type == types.ContentType.TEXT:
+        await bot.send_message(chat_id=chat_id, text=message.text or "Matn mavjud emas.")
+    elif message.content_type == types.ContentType.PHOTO:
+        await bot.send_photo(chat_id=chat_id, photo=message.photo[-1].file_id, caption=message.caption)
+    elif message.content_type == types.ContentType.VIDEO:
+        await bot.send_video(chat_id=chat_id, video=message.video.file_id, caption=message.caption)
+    elif message.content_type == types.ContentType.DOCUMENT:
+        await bot.send_document(chat_id=chat_id, document=message.document.file_id, caption=message.caption)
+
+
+async def run_campaign(bot: Bot, send, users: int, concurrency: int) -> float:
+    """xabar/s qaytaradi"""
+    async def fetch_page(after_id, limit):
+        return [(i, 1000 + i) for i in range(after_id + 1, min(after_id + limit, users) + 1)]
+
+    engine = BroadcastEngine(
+        fetch_page=fetch_page,
+        send=send,
+        # Limiter o'chirilgan: klient tomonining o'tkazuvchanligi o'lchanadi
+        limiter=RateLimiter(rate=1_000_000, per_chat_interval=0),
+        concurrency=concurrency,
+    )
+    started = time.perf_counter()
+    await engine.run()
+    elapsed = time.perf_counter() - started
+    if engine.failed_count:
+        print(f"   ⚠️ {engine.failed_count} ta xato")
+    return engine.sent_count / elapsed
+
+
+async def main_async(args):
+    server = FakeTelegramServer(args.latency)
+    await server.start()
+    bot = Bot(FAKE_TOKEN, server=TelegramAPIServer.from_base(f"http://127.0.0.1:{server.port}"))
+    try:
+        print(f"{'kampaniya':<10} {'legacy msg/s':>13} {'copy msg/s':>11} {'API metodlar (copy)':>22}")
+        for kind in CAMPAIGNS:
+            message = make_message(kind)
+            legacy_rate = await run_campaign(
+                bot, lambda chat_id: legacy_send(bot, chat_id, message), args.users, args.concurrency
+            )
+            server.calls.clear()
+            content = BroadcastContent(bot, message, mode='copy')
+            copy_rate = await run_campaign(bot, content.send, args.users, args.concurrency)
+            methods = ', '.join(f"{name}={count}" for name, count in server.calls.items())
+            print(f"{kind:<10} {legacy_rate:>13.0f} {copy_rate:>11.0f} {methods:>22}")
+    finally:
+        await (await bot.get_session()).close()
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast yuborish benchmark")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=20, help="Soxta API javob kechikishi (ms)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/db_benchmark.py
+# Database.execute mikro-benchmark: har so'rovda yangi ulanish vs pul
+#
+# Ishga tushirish (loyiha ildizidan):
+#     python -m benchmarks.db_benchmark --queries 5000
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from utils.db_api.database import Database, pool
+
+
+def legacy_execute(path, sql, parameters=(), fetchone=False, commit=False):
+    """Eski Database.execute: har chaqiruvda connect() + close()"""
+    connection = sqlite3.connect(path)
+    cursor = connection.cursor()
+    data = None
+    try:
+        cursor.execute(sql, parameters)
+        if commit:
+            connection.commit()
+        if fetchone:
+            data = cursor.fetchone()
+    finally:
+        connection.close()
+    return data
+
+
+def prepare(path: str, users: int):
+    db = Database(path_to_db=path)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS Users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id BIGINT NOT NULL UNIQUE,
+            username VARCHAR(255) NULL,
+            balance DECIMAL(10, 2) DEFAULT 0.00,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """, commit=True)
+    connection = db.connection
+    connection.executemany(
+        "INSERT OR IGNORE INTO Users (telegram_id, username, balance) VALUES (?, ?, ?)",
+        [(1000 + i, f"user{i}", i % 50 * 1000) for i in range(users)]
+    )
+    connection.commit()
+    return db
+
+
+def run(fn, queries: int, users: int) -> float:
+    """q/s qaytaradi"""
+    started = time.perf_counter()
+    for i in range(queries):
+        fn(1000 + i % users)
+    elapsed = time.perf_counter() - started
+    return queries / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database.execute benchmark")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        db = prepare(path, args.users)
+        read_sql = "SELECT balance FROM Users WHERE telegram_id = ?"
+        write_sql = "UPDATE Users SET balance = balance + 1 WHERE telegram_id = ?"
+
+        cases = [
+            ("read  (connect/close)", lambda tid: legacy_execute(path, read_sql, (tid,), fetchone=True)),
+            ("read  (pooled)", lambda tid: db.execute(read_sql, (tid,), fetchone=True)),
+            ("write (connect/close)", lambda tid: legacy_execute(path, write_sql, (tid,), commit=True)),
+            ("write (pooled)", lambda tid: db.execute(write_sql, (tid,), commit=True)),
+        ]
+        results = []
+        for label, fn in cases:
+            qps = run(fn, args.queries, args.users)
+            results.append(qps)
+            print(f"{label:<24} {args.queries:>7} so'rov  {qps:>10.0f} q/s")
+
+        pool.close_all()
+
+    print(f"\nread  speedup: x{results[1] / results[0]:.1f}")
+    print(f"write speedup: x{results[3] / results[2]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/render_benchmark.py
+# PPTX yig'ish benchmark: event loop'da ketma-ket vs RenderPool (N process)
+#
+# Ishga tushirish (loyiha ildizidan):
+#     python -m benchmarks.render_benchmark --presentations 24 --slides 12 --processes 4
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from utils.pptx_generator import ProPPTXGenerator
+from utils.render_pool import RenderPool, render_presentation
+
+
+def make_content(slides: int) -> dict:
+    """Rasmsiz sintetik content (GPT javobi shaklida)"""
+    return {
+        "title": "Sun'iy intellekt ta'limda",
+        "subtitle": "Benchmark prezentatsiyasi",
+        "slides": [
+            {
+                "title": f"{i + 1}-bo'lim: asosiy g'oyalar",
+                "content": "Qisqa kirish matni. " * 8,
+                "bullet_points": [f"Muhim nuqta {j + 1} - batafsil izoh bilan" for j in range(5)],
+            }
+            for i in range(slides)
+        ],
+    }
+
+
+async def run_inline(content: dict, tmp: str, presentations: int) -> float:
+    """Eski usul: _build to'g'ridan-to'g'ri event loop ichida"""
+    started = time.perf_counter()
+    for i in range(presentations):
+        ProPPTXGenerator(theme_id=None)._build(content, {}, os.path.join(tmp, f"inline_{i}.pptx"))
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+async def run_pool(pool: RenderPool, content: dict, tmp: str, presentations: int) -> float:
+    pool.start()
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        pool.run(render_presentation, None, content, {}, os.path.join(tmp, f"pool_{i}.pptx"))
+        for i in range(presentations)
+    ])
+    return time.perf_counter() - started
+
+
+async def loop_lag(coro) -> tuple:
+    """coro bajarilayotganda event loop qancha kechikdi (eng katta oraliq, ms)"""
+    max_lag = 0.0
+    done = False
+
+    async def probe():
+        nonlocal max_lag
+        while not done:
+            tick = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, (time.perf_counter() - tick - 0.01) * 1000)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(0)
+    result = await coro
+    done = True
+    await probe_task
+    return result, max_lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PPTX render benchmark")
+    parser.add_argument("--presentations", type=int, default=24)
+    parser.add_argument("--slides", type=int, default=12)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    content = make_content(args.slides)
+    # title + agenda + content + rahmat
+    slides_per_deck = args.slides + (3 if args.slides >= 5 else 2)
+    total_slides = slides_per_deck * args.presentations
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inline_elapsed, inline_lag = asyncio.run(loop_lag(run_inline(content, tmp, args.presentations)))
+
+        pool = RenderPool(max_workers=args.processes)
+        try:
+            pool_elapsed, pool_lag = asyncio.run(loop_lag(run_pool(pool, content, tmp, args.presentations)))
+        finally:
+            pool.shutdown()
+
+    print(f"{'rejim':<22} {'vaqt':>8} {'slayd/s':>10} {'loop lag':>10}")
+    print(f"{'event loop (inline)':<22} {inline_elapsed:>7.2f}s {total_slides / inline_elapsed:>10.1f} "
+          f"{inline_lag:>8.0f}ms")
+    print(f"{f'RenderPool x{args.processes}':<22} {pool_elapsed:>7.2f}s {total_slides / pool_elapsed:>10.1f} "
+          f"{pool_lag:>8.0f}ms")
+    print(f"\nspeedup: x{inline_elapsed / pool_elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
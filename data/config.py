@@ -10,3 +10,19 @@ ADMINS = list(map(int, env.list("ADMINS")))
 IP = env.str("ip", "localhost")
 OPENAI_API_KEY = env.str("OPENAI_API_KEY")
 PRESENTON_URL = env.str("PRESENTON_URL", "http://presenton:80")
+
+# Presentation worker: bir vaqtda bajariladigan task'lar soni (tur bo'yicha)
+WORKER_CONCURRENCY = {
+    'basic': env.int("WORKER_CONCURRENCY_PRESENTATION", 4),
+    'pitch_deck': env.int("WORKER_CONCURRENCY_PITCH_DECK", 2),
+    'course_work': env.int("WORKER_CONCURRENCY_COURSE_WORK", 2),
+}
+# False - worker alohida process(lar)da ishlaydi (worker.py), app.py faqat bot + API
+RUN_WORKER = env.bool("RUN_WORKER", True)
+# Navbatni DB'dan tekshirish oralig'i (soniya). Bitta process'da yangi task'lar
+# darhol signal beradi, shuning uchun bu faqat recovery sweep
+WORKER_POLL_INTERVAL = env.int("WORKER_POLL_INTERVAL", 60)
+# Alohida worker.py uchun: task'lar boshqa process'da yaratiladi, signal kelmaydi -
+# navbat faqat shu oraliqda tekshiriladi
+WORKER_RECOVERY_INTERVAL = env.int("WORKER_RECOVERY_INTERVAL", 5)
+WORKER_DRAIN_TIMEOUT = env.int("WORKER_DRAIN_TIMEOUT", 120)
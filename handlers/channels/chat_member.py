@@ -0,0 +1,41 @@
+# handlers/channels/chat_member.py
+# Majburiy obuna kanallaridagi a'zolik o'zgarishlari -> subscription indeksi
+
+import logging
+
+from aiogram import types
+
+from loader import dp, channel_db_async
+from utils.misc import subscription
+
+logger = logging.getLogger(__name__)
+
+
+async def is_tracked_channel(chat_id: int) -> bool:
+    """Kanal ChannelDatabase'dagi majburiy obuna kanallaridanmi"""
+    channels = await channel_db_async.get_all_channels()
+    return any(channel[1] == chat_id for channel in channels)
+
+
+CHANNEL_CHAT_TYPES = [types.ChatType.CHANNEL, types.ChatType.SUPERGROUP, types.ChatType.GROUP]
+
+
+@dp.chat_member_handler(chat_type=CHANNEL_CHAT_TYPES)
+async def channel_member_updated(update: types.ChatMemberUpdated):
+    """User kanalga qo'shildi yoki chiqdi - keshni Telegram'ga so'ramasdan yangilaymiz"""
+    if not await is_tracked_channel(update.chat.id):
+        return
+
+    member = update.new_chat_member
+    subscription.record_member_update(member.user.id, update.chat.id, member.status)
+
+
+@dp.my_chat_member_handler(chat_type=CHANNEL_CHAT_TYPES)
+async def bot_member_updated(update: types.ChatMemberUpdated):
+    """Botning o'z statusi o'zgardi - admin bo'lmasa chat_member update'lari kelmaydi"""
+    if not await is_tracked_channel(update.chat.id):
+        return
+
+    status = update.new_chat_member.status
+    subscription.cache.mark_live(update.chat.id, status in subscription.BOT_ADMIN_STATUSES)
+    logger.info(f"ℹ️ Bot statusi o'zgardi: {update.chat.id} -> {status}")
@@ -8,7 +8,7 @@ from aiogram.dispatcher.filters import Text
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 import logging
 
-from loader import dp, bot, user_db
+from loader import dp, bot, user_db, user_db_async
 from data.config import ADMINS
 
 logger = logging.getLogger(__name__)
@@ -335,19 +335,16 @@ async def admin_free_all_execute(callback: types.CallbackQuery, state: FSMContex
     await callback.message.edit_text("⏳ <b>Bajarilmoqda...</b>", parse_mode='HTML')
 
     try:
-        user_db.execute(
-            "UPDATE Users SET free_presentations = COALESCE(free_presentations, 0) + ?",
-            parameters=(count,),
-            commit=True
-        )
-
-        total_users = user_db.count_users()
+        result = await user_db_async.add_free_presentations_all(count)
+        if result is None:
+            raise RuntimeError("Bazaga yozishda xato, hech narsa o'zgarmadi")
 
         await callback.message.edit_text(
             f"✅ <b>MUVAFFAQIYATLI!</b>\n\n"
-            f"📊 Yangilangan: <b>{total_users}</b> ta user\n"
+            f"📊 Yangilangan: <b>{result['users']}</b> ta user\n"
             f"➕ Har biriga qo'shildi: <b>+{count}</b> ta\n\n"
-            f"Jami qo'shildi: <b>{total_users * count}</b> ta",
+            f"Jami qo'shildi: <b>{result['added']}</b> ta\n"
+            f"⏱ Bajarildi: {result['elapsed_ms']} ms",
             reply_markup=free_presentations_menu_keyboard(),
             parse_mode='HTML'
         )
@@ -516,21 +513,13 @@ async def admin_free_setall_execute(callback: types.CallbackQuery, state: FSMCon
     await callback.message.edit_text("⏳ <b>Bajarilmoqda...</b>", parse_mode='HTML')
 
     try:
-        result = user_db.execute(
-            "SELECT COALESCE(SUM(free_presentations), 0) FROM Users",
-            fetchone=True
-        )
-        old_total = result[0] if result else 0
-
         # Barcha user'larga O'RNATISH
-        user_db.execute(
-            "UPDATE Users SET free_presentations = ?",
-            parameters=(count,),
-            commit=True
-        )
-
-        total_users = user_db.count_users()
-        new_total = total_users * count
+        result = await user_db_async.set_free_presentations_all(count)
+        if result is None:
+            raise RuntimeError("Bazaga yozishda xato, hech narsa o'zgarmadi")
+        total_users = result['users']
+        old_total = result['old_total']
+        new_total = result['new_total']
 
         if count == 0:
             result_text = f"🗑 <b>BARCHASI O'CHIRILDI!</b>\n\n"
@@ -542,7 +531,8 @@ async def admin_free_setall_execute(callback: types.CallbackQuery, state: FSMCon
             f"📊 Yangilangan: <b>{total_users}</b> ta user\n"
             f"🔄 Har biriga o'rnatildi: <b>{count}</b> ta\n\n"
             f"📊 Eski jami: {old_total} ta\n"
-            f"📊 Yangi jami: <b>{new_total}</b> ta",
+            f"📊 Yangi jami: <b>{new_total}</b> ta\n"
+            f"⏱ Bajarildi: {result['elapsed_ms']} ms",
             reply_markup=free_presentations_menu_keyboard(),
             parse_mode='HTML'
         )
@@ -683,29 +673,19 @@ async def admin_free_remove_execute(callback: types.CallbackQuery, state: FSMCon
     await callback.message.edit_text("⏳ <b>Bajarilmoqda...</b>", parse_mode='HTML')
 
     try:
-        result = user_db.execute(
-            "SELECT COALESCE(SUM(free_presentations), 0) FROM Users",
-            fetchone=True
-        )
-        old_total = result[0] if result else 0
-
-        result = user_db.execute(
-            "SELECT COUNT(*) FROM Users WHERE free_presentations > 0",
-            fetchone=True
-        )
-        affected_users = result[0] if result else 0
-
         # Barchasini 0 ga tushirish
-        user_db.execute(
-            "UPDATE Users SET free_presentations = 0",
-            commit=True
-        )
+        result = await user_db_async.remove_free_presentations_all()
+        if result is None:
+            raise RuntimeError("Bazaga yozishda xato, hech narsa o'zgarmadi")
+        old_total = result['removed']
+        affected_users = result['users']
 
         await callback.message.edit_text(
             f"🗑 <b>BARCHASI O'CHIRILDI!</b>\n\n"
             f"📊 Yangilangan userlar: <b>{affected_users}</b> ta\n"
             f"📊 O'chirildi: <b>{old_total}</b> ta bepul prezentatsiya\n\n"
-            f"Endi barcha user'larda bepul prezentatsiya: <b>0</b> ta",
+            f"Endi barcha user'larda bepul prezentatsiya: <b>0</b> ta\n"
+            f"⏱ Bajarildi: {result['elapsed_ms']} ms",
             reply_markup=free_presentations_menu_keyboard(),
             parse_mode='HTML'
         )
@@ -2,11 +2,13 @@ from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters import Text
 from aiogram.dispatcher.filters.state import State, StatesGroup
+import html
 import logging
 
 from data.config import ADMINS
-from loader import dp, user_db, bot
+from loader import dp, user_db, user_db_async, bot
 from keyboards.default.default_keyboard import menu_ichki_admin, menu_admin
+from utils.db_api.instrumentation import query_stats
 
 logger = logging.getLogger(__name__)
 
@@ -68,7 +70,7 @@ async def control_panel(message: types.Message):
 
     if await check_super_admin_permission(telegram_id) or await check_admin_permission(telegram_id):
         # Statistika olish
-        stats = get_admin_statistics()
+        stats = await user_db_async.run(get_admin_statistics)
 
         stats_text = f"""
 🎛 <b>ADMIN PANEL</b>
@@ -786,8 +788,8 @@ async def reset_all_balances_command(message: types.Message):
         return
 
     # Hozirgi statistika
-    total_users = user_db.count_users()
-    total_balance = user_db.get_total_balance()  # Yangi metod kerak
+    total_users = await user_db_async.count_users()
+    total_balance = await user_db_async.get_total_balance()
 
     warning_text = f"""
 ⚠️ <b>DIQQAT! XAVFLI OPERATSIYA!</b>
@@ -873,14 +875,12 @@ async def execute_reset_all_balances(callback: types.CallbackQuery):
     await callback.message.edit_text("⏳ Balanslar reset qilinmoqda...")
 
     try:
-        # Reset qilishdan oldingi statistika
-        total_before = user_db.get_total_balance()
-        users_with_balance = user_db.count_users_with_balance()
+        # BARCHA BALANSLARNI 0 GA TUSHIRISH (statistika shu tranzaksiyada olinadi)
+        result = await user_db_async.reset_all_balances(admin_telegram_id=telegram_id)
 
-        # BARCHA BALANSLARNI 0 GA TUSHIRISH
-        success = user_db.reset_all_balances(admin_telegram_id=telegram_id)
-
-        if success:
+        if result is not None:
+            users_with_balance = result['users']
+            total_before = result['amount']
             result_text = f"""
 ✅ <b>BALANSLAR RESET QILINDI!</b>
 
@@ -889,6 +889,7 @@ async def execute_reset_all_balances(callback: types.CallbackQuery):
 💰 O'chirilgan summa: {total_before:,.0f} so'm
 👨‍💼 Bajardi: {admin_name}
 🕐 Vaqt: {callback.message.date.strftime('%Y-%m-%d %H:%M:%S')}
+⏱ Bajarildi: {result['elapsed_ms']} ms
 
 ⚠️ Bu amal log'ga yozildi.
 """
@@ -936,7 +937,7 @@ async def control_panel(message: types.Message):
         return
 
     # Kengaytirilgan statistika olish
-    stats = user_db.get_extended_statistics()
+    stats = await user_db_async.get_extended_statistics()
 
     if not stats:
         await message.answer("❌ Statistikani olishda xatolik!")
@@ -1043,7 +1044,7 @@ async def quick_stats(message: types.Message):
         await message.reply("❌ Siz admin emassiz!")
         return
 
-    stats = user_db.get_extended_statistics()
+    stats = await user_db_async.get_extended_statistics()
 
     if not stats:
         await message.answer("❌ Statistikani olishda xatolik!")
@@ -1080,7 +1081,7 @@ async def finance_report(message: types.Message):
         await message.reply("❌ Faqat super adminlar uchun!")
         return
 
-    stats = user_db.get_extended_statistics()
+    stats = await user_db_async.get_extended_statistics()
 
     if not stats:
         await message.answer("❌ Statistikani olishda xatolik!")
@@ -1145,6 +1146,48 @@ async def finance_report(message: types.Message):
     await message.answer(finance_text)
 
 
+# ==================== DB SO'ROVLAR STATISTIKASI ====================
+@dp.message_handler(commands="dbstats")
+async def db_stats_command(message: types.Message):
+    """SQL so'rovlar statistikasi: eng qimmat shablonlar va sekin so'rovlar"""
+    telegram_id = message.from_user.id
+
+    if not await check_super_admin_permission(telegram_id):
+        await message.reply("❌ Faqat super adminlar uchun!")
+        return
+
+    if message.get_args().strip() == "reset":
+        query_stats.reset()
+        await message.answer("✅ DB statistikasi tozalandi")
+        return
+
+    snapshot = query_stats.snapshot(top=8)
+
+    text = (
+        f"🗄 <b>DB SO'ROVLAR STATISTIKASI</b>\n\n"
+        f"⏱ Uptime: {snapshot['uptime_seconds'] // 60} daqiqa\n"
+        f"📊 So'rovlar: ~{snapshot['estimated_queries']} "
+        f"(sampling {snapshot['sample_rate']:.0%})\n"
+        f"🧩 Shablonlar: {snapshot['templates']}\n"
+        f"🐢 Sekin chegara: {snapshot['slow_query_ms']:.0f} ms\n\n"
+        f"🔝 <b>Umumiy vaqt bo'yicha:</b>\n"
+    )
+    for i, entry in enumerate(snapshot['top_by_total_time'], 1):
+        p95 = f"{entry['p95_ms']}" if entry['p95_ms'] is not None else "∞"
+        text += (
+            f"{i}. <code>{html.escape(entry['query'][:80])}</code>\n"
+            f"   {entry['count']} ta | jami {entry['total_ms']:.0f} ms | "
+            f"o'rt. {entry['avg_ms']:.2f} ms | p95 ≤{p95} ms | max {entry['max_ms']:.0f} ms\n"
+        )
+
+    if snapshot['slow_queries']:
+        text += "\n🐢 <b>Oxirgi sekin so'rovlar:</b>\n"
+        for slow in snapshot['slow_queries'][-5:]:
+            text += f"{slow['at']} — {slow['elapsed_ms']:.0f} ms\n<code>{html.escape(slow['query'][:80])}</code>\n"
+
+    await message.answer(text)
+
+
 # ==================== BUTTON HANDLER ====================
 @dp.message_handler(Text(equals="📊 Statistika"))
 async def stats_button_handler(message: types.Message):
@@ -17,6 +17,7 @@ from aiogram.types import (
 from loader import dp, bot, user_db
 from data.config import ADMINS, OPENAI_API_KEY
 from keyboards.default.default_keyboard import main_menu_keyboard
+from utils.misc.openai_pool import PRIORITY_PAID, openai_priority
 
 logger = logging.getLogger(__name__)
 
@@ -561,21 +562,23 @@ async def start_generation(call: types.CallbackQuery, state: FSMContext):
         f"📋 Loyiha: {data.get('project_info', '')[:60]}\n"
         f"📍 Hudud: {data.get('location', '')}\n"
         f"🌐 Til: {lang_names.get(language, 'Uzbek')}\n\n"
-        f"⏳ <b>Taxminiy vaqt: 10-15 daqiqa</b>\n"
-        f"<i>AI jami 10 bo'limni alohida yozadi — sifat uchun.\n"
-        f"Quyida har bir bosqich haqida xabar beriladi.</i>",
+        f"⏳ <b>Taxminiy vaqt: 4-6 daqiqa</b>\n"
+        f"<i>AI jami 10 bo'limni alohida yozadi — sifat uchun, bir nechtasini parallel.\n"
+        f"Quyida har bir bo'lim tayyor bo'lgani haqida xabar beriladi.</i>",
         parse_mode='HTML'
     )
 
-    asyncio.create_task(
-        _run_ai_generation(
-            telegram_id=telegram_id,
-            data=data,
-            language=language,
-            price=price,
-            status_msg=status_msg,
+    # To'lov qilingan - generatsiya so'rovlari OpenAI navbatida pullik yo'lakda
+    with openai_priority(PRIORITY_PAID):
+        asyncio.create_task(
+            _run_ai_generation(
+                telegram_id=telegram_id,
+                data=data,
+                language=language,
+                price=price,
+                status_msg=status_msg,
+            )
         )
-    )
 
 
 async def _run_ai_generation(
@@ -587,7 +590,8 @@ async def _run_ai_generation(
 ):
     """AI generatsiyani background'da ishga tushirish"""
     from utils.business_plan_generator import BusinessPlanGenerator
-    from utils.business_plan_docx import BusinessPlanDocx
+    from utils.misc.generation import TokenProgress
+    from utils.render_pool import render_pool, render_business_plan
 
     try:
         generator = BusinessPlanGenerator(api_key=OPENAI_API_KEY)
@@ -600,50 +604,61 @@ async def _run_ai_generation(
             f"🌐 Til: {lang_names.get(language, 'Uzbek')}\n"
         )
 
-        # O'rtacha har bir bo'lim ~75 sekundda tayyor bo'ladi
+        # O'rtacha har bir bo'lim ~75 sekundda tayyor bo'ladi; bir vaqtda
+        # generator.max_concurrency ta bo'lim yoziladi
         SECONDS_PER_STEP = 75
-
-        async def progress_cb(step: int, total: int, title: str):
-            done = step - 1
+        section_titles = [title for _, title, _ in generator.SECTIONS]
+        finished = set()
+        step = {'done': 0, 'total': len(section_titles)}
+        # Bo'lim tugashi va token oqimi bir xabarni yangilaydi - edit'lar ketma-ket
+        edit_lock = asyncio.Lock()
+
+        async def render():
+            done, total = step['done'], step['total']
             percent = int(done / total * 100)
-            filled = done * 2  # 20 ta katak (total * 2)
-            bar = "▓" * filled + "░" * (total * 2 - filled)
+            filled = done * 20 // total
+            bar = "▓" * filled + "░" * (20 - filled)
             remaining_steps = total - done
-            remaining_min = max(1, (remaining_steps * SECONDS_PER_STEP) // 60)
-
-            # Oldingi tayyor bo'limlar ro'yxati (belgilangan)
-            sections_list = [
-                "Ijroiya xulosasi",
-                "Tashabbuskor va kompaniya tavsifi",
-                "Bozor tahlili",
-                "Mahsulot va xizmatlar",
-                "Marketing va savdo strategiyasi",
-                "Operatsion reja",
-                "Moliyaviy prognoz",
-                "Boshqaruv jamoasi",
-                "Risk tahlili",
-                "Xulosa",
-            ]
+            waves = -(-remaining_steps // generator.max_concurrency)
+            remaining_min = max(1, (waves * SECONDS_PER_STEP) // 60)
+
             lines = []
-            for i, name in enumerate(sections_list, start=1):
-                if i < step:
-                    lines.append(f"✅ {i}/10 — {name}")
-                elif i == step:
-                    lines.append(f"⏳ <b>{i}/10 — {name}</b> (yozilmoqda...)")
+            for i, name in enumerate(section_titles, start=1):
+                if name in finished:
+                    lines.append(f"✅ {i}/{total} — {name}")
                 else:
-                    lines.append(f"⚪️ {i}/10 — {name}")
+                    lines.append(f"⏳ {i}/{total} — {name}")
             progress_list = "\n".join(lines)
 
+            tokens_line = ""
+            if tokens.tokens:
+                tokens_line = (
+                    f"✍️ <i>Yozildi: {tokens.tokens:,} token "
+                    f"({tokens.tokens_per_second:.0f} token/s)</i>\n"
+                )
+
             text = (
                 f"{header}\n"
                 f"📊 <b>Jarayon: {percent}%</b>  [{bar}]\n"
-                f"⏱ <i>Taxminan {remaining_min} daqiqa qoldi</i>\n\n"
+                f"⏱ <i>Taxminan {remaining_min} daqiqa qoldi</i>\n"
+                f"{tokens_line}\n"
                 f"{progress_list}"
             )
-            try:
-                await status_msg.edit_text(text, parse_mode='HTML')
-            except Exception as e:
-                logger.debug(f"Progress edit xato: {e}")
+            async with edit_lock:
+                try:
+                    await status_msg.edit_text(text, parse_mode='HTML')
+                except Exception as e:
+                    logger.debug(f"Progress edit xato: {e}")
+
+        async def progress_cb(done: int, total: int, title: str):
+            # Bo'limlar tartibsiz tugaydi - qaysilari tayyorligi nomi bo'yicha
+            if title:
+                finished.add(title)
+            step['done'], step['total'] = done, total
+            await render()
+
+        # Tokenlar kelishi bilan xabar throttled yangilanadi
+        tokens = TokenProgress(lambda _: render())
 
         content = await generator.generate(
             language=language,
@@ -658,7 +673,9 @@ async def _run_ai_generation(
             credit_terms=data.get('credit_terms', ''),
             marketing=data.get('marketing', ''),
             progress_callback=progress_cb,
+            progress=tokens,
         )
+        await tokens.stop()
 
         if not content:
             raise ValueError("Generator None qaytardi")
@@ -683,8 +700,8 @@ async def _run_ai_generation(
         filename = f"BiznesPlan_{safe_name}_{telegram_id}.docx"
         file_path = os.path.join(DOWNLOADS_DIR, filename)
 
-        docx_gen = BusinessPlanDocx()
-        success = docx_gen.create(content=content, output_path=file_path)
+        # python-docx yig'ish alohida process'da - polling bloklanmaydi
+        success = await render_pool.run(render_business_plan, content, file_path)
 
         if not success:
             raise ValueError("DOCX yaratishda xato")
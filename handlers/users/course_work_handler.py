@@ -14,6 +14,8 @@ from data.config import OPENAI_API_KEY
 # --- IMPORTLAR ---
 from utils.course_work_generator import CourseWorkGenerator
 from utils.docx_generator import DocxGenerator
+from utils.misc.generation import TokenProgress
+from utils.misc.openai_pool import PRIORITY_PAID, openai_priority
 
 logger = logging.getLogger(__name__)
 
@@ -87,17 +89,32 @@ async def web_app_data_handler(message: types.Message, state: FSMContext):
 
     # 2. "Kuting" xabarini yuborish
     new_balance = user_db.get_user_balance(telegram_id)
-    status_msg = await message.answer(
+    status_header = (
         f"✅ <b>Qabul qilindi!</b>\n"
         f"📚 Mavzu: {topic}\n"
         f"💰 Yechildi: <b>{total_price:,.0f} so'm</b>\n"
         f"💳 Balans: <b>{new_balance:,.0f} so'm</b>\n\n"
         f"⏳ <b>AI ishni yozmoqda...</b>\n"
-        f"<i>Iltimos kuting, 1-3 daqiqa vaqt ketadi.</i>",
+    )
+    status_msg = await message.answer(
+        status_header + "<i>Iltimos kuting, 1-3 daqiqa vaqt ketadi.</i>",
         parse_mode='HTML',
         reply_markup=types.ReplyKeyboardRemove()
     )
 
+    async def show_progress(progress: TokenProgress):
+        steps = ""
+        if progress.total_steps:
+            steps = f"📑 Bo'limlar: {progress.steps_done}/{progress.total_steps}\n"
+        await status_msg.edit_text(
+            status_header
+            + steps
+            + f"✍️ <i>Yozildi: {progress.tokens:,} token ({progress.tokens_per_second:.0f} token/s)</i>",
+            parse_mode='HTML'
+        )
+
+    token_progress = TokenProgress(show_progress)
+
     try:
         # ---------------------------------------------------------
         # 3. AI GENERATOR (Matn yozish)
@@ -108,14 +125,18 @@ async def web_app_data_handler(message: types.Message, state: FSMContext):
         if not subject:
             subject = topic.split()[0] if topic.split() else "Umumiy"
 
-        content_json = await ai_generator.generate_course_work_content(
-            work_type=data.get('work_type', 'referat'),
-            topic=topic,
-            subject=subject,
-            details=data.get('details', ''),
-            page_count=int(data.get('page_count', 12)),
-            language=data.get('language', 'uz')
-        )
+        # Pul yechilgan - OpenAI navbatida pullik yo'lakda
+        with openai_priority(PRIORITY_PAID):
+            content_json = await ai_generator.generate_course_work_content(
+                work_type=data.get('work_type', 'referat'),
+                topic=topic,
+                subject=subject,
+                details=data.get('details', ''),
+                page_count=int(data.get('page_count', 12)),
+                language=data.get('language', 'uz'),
+                progress=token_progress
+            )
+        await token_progress.stop()
 
         # Frontenddan kelgan qo'shimcha ma'lumotlarni content'ga qo'shish
         if content_json:
@@ -1,16 +1,32 @@
 import datetime
 import asyncio
+import json
+import logging
 from data.config import ADMINS
-from loader import bot, dp, user_db
+from loader import bot, dp, user_db, user_db_async, broadcast_db_async
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.dispatcher.filters import Text
-from aiogram.utils.exceptions import BotBlocked, ChatNotFound, RetryAfter, Unauthorized
+from aiogram.utils.exceptions import MessageNotModified
+from utils.broadcast import BroadcastContent, BroadcastEngine, broadcast_limiter
+
+logger = logging.getLogger(__name__)
 
 # Reklama yuborish jarayonlarini saqlash uchun ro'yxat
 advertisements = []
 
+# Status xabari shu oraliqda yangilanadi (edit_text ham limitga tushadi)
+STATUS_UPDATE_INTERVAL = 5
+
+# Reklama turi -> BroadcastContent rejimi
+AD_TYPE_MODES = {
+    'ad_type_text': 'text',
+    'ad_type_forward': 'forward',
+    'ad_type_button': 'copy',
+    'ad_type_any': 'copy',
+}
+
 class ReklamaTuriState(StatesGroup):
     tur = State()
     vaqt = State()
@@ -19,125 +35,207 @@ class ReklamaTuriState(StatesGroup):
     buttons = State()
 
 class Advertisement:
-    def __init__(self, ad_id, message, ad_type, keyboard=None, send_time=None, creator_id=None):
+    def __init__(self, ad_id, message, ad_type, keyboard=None, send_time=None, creator_id=None, cursor=0,
+                 sent_count=0, failed_count=0, blocked_count=0, status_message_id=None):
         self.ad_id = ad_id
         self.message = message
         self.ad_type = ad_type
         self.keyboard = keyboard
         self.send_time = send_time
         self.creator_id = creator_id
-        self.running = False
-        self.paused = False
-        self.sent_count = 0
-        self.failed_count = 0
+        self.cursor = cursor  # Users.id - shu id gacha yuborib bo'lingan
         self.total_users = 0
-        self.current_message = None  # Admin bilan aloqa uchun xabar
+        self.stopped = False
+        self.status_message_id = status_message_id  # Admin bilan aloqa uchun xabar
         self.task = None
+        self.content = None
+        self.engine = BroadcastEngine(
+            fetch_page=user_db_async.get_broadcast_recipients,
+            send=lambda chat_id: self.content.send(chat_id),
+            on_blocked=user_db_async.mark_users_as_blocked,
+            on_checkpoint=self.checkpoint,
+            limiter=broadcast_limiter,
+        )
+        # Restart'dan keyin hisoblagichlar saqlangan joyidan davom etadi
+        self.engine.sent_count = sent_count
+        self.engine.failed_count = failed_count
+        self.engine.blocked_count = blocked_count
+
+    @property
+    def running(self):
+        return self.engine.running
+
+    @property
+    def paused(self):
+        return self.engine.paused
+
+    @property
+    def sent_count(self):
+        return self.engine.sent_count
+
+    @property
+    def failed_count(self):
+        return self.engine.failed_count
 
-    async def start(self):
-        self.running = True
+    def to_payload(self) -> dict:
+        """Restart'dan keyin tiklash uchun xabar va klaviatura"""
+        return {
+            'message': json.loads(self.message.as_json()),
+            'keyboard': json.loads(self.keyboard.as_json()) if self.keyboard else None,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Advertisement":
+        payload = record['payload']
+        keyboard = payload.get('keyboard')
+        send_time = record['send_time']
+        return cls(
+            ad_id=record['id'],
+            message=types.Message.to_object(payload['message']),
+            ad_type=record['ad_type'],
+            keyboard=types.InlineKeyboardMarkup.to_object(keyboard) if keyboard else None,
+            send_time=datetime.datetime.fromisoformat(send_time) if send_time else None,
+            creator_id=record['creator_id'],
+            cursor=record['cursor'],
+            sent_count=record['sent_count'],
+            failed_count=record['failed_count'],
+            blocked_count=record['blocked_count'],
+            status_message_id=record['status_message_id'],
+        )
+
+    async def start(self, paused=False):
+        if paused:
+            self.engine.pause()
         if self.send_time:
             delay = (self.send_time - datetime.datetime.now()).total_seconds()
             if delay > 0:
                 await asyncio.sleep(delay)
-        users = user_db.select_all_users()
-        self.total_users = len(users)
-        self.current_message = await bot.send_message(
+        # Jami = oldin ishlanganlar + cursor'dan keyin qolganlar
+        remaining = await user_db_async.count_broadcast_recipients(self.cursor)
+        self.total_users = self.engine.processed + remaining
+        await self.show_status_message()
+        await broadcast_db_async.start_broadcast(
+            self.ad_id, 'paused' if self.paused else 'running', self.total_users, self.status_message_id
+        )
+        if self.stopped:
+            # Stop status xabari ko'rsatilgandan keyin, yuborish boshlanishidan oldin bosilgan
+            await broadcast_db_async.set_broadcast_status(self.ad_id, 'stopped')
+            return
+        # Kontent bir marta tahlil qilinadi - har userga copy_message
+        self.content = BroadcastContent(
+            bot, self.message,
+            mode=AD_TYPE_MODES.get(self.ad_type, 'copy'),
+            keyboard=self.keyboard if self.ad_type == 'ad_type_button' else None
+        )
+        reporter = asyncio.create_task(self.report_progress())
+        try:
+            await self.engine.run(start_after=self.cursor)
+        finally:
+            reporter.cancel()
+        if not self.stopped:
+            await broadcast_db_async.set_broadcast_status(self.ad_id, 'finished')
+            await self.update_status_message(finished=True)
+
+    async def show_status_message(self):
+        """Restart'dan keyin eski status xabarini tahrirlash, bo'lmasa yangisini yuborish"""
+        if self.status_message_id:
+            try:
+                await self.update_status_message()
+                return
+            except MessageNotModified:
+                return
+            except Exception as e:
+                logger.warning(f"Reklama #{self.ad_id} eski status xabari: {e}")
+        message = await bot.send_message(
             chat_id=self.creator_id,
-            text=f"Reklama #{self.ad_id} yuborish boshlandi.\nYuborilgan: {self.sent_count}\nYuborilmagan: {self.failed_count}\nUmumiy: {self.sent_count + self.failed_count}/{self.total_users}\n\nStatus: Davom etmoqda",
-            reply_markup=get_status_keyboard(self.ad_id)
+            text=self.status_text("Davom etmoqda" if not self.paused else "Pauza holatida", started=True),
+            reply_markup=get_status_keyboard(self.ad_id, self.paused)
+        )
+        self.status_message_id = message.message_id
+
+    async def checkpoint(self, cursor):
+        self.cursor = cursor
+        await broadcast_db_async.checkpoint_broadcast(
+            self.ad_id, cursor,
+            self.engine.sent_count, self.engine.failed_count, self.engine.blocked_count,
+            round(self.engine.throughput(), 2)
         )
-        for user in users:
-            if not self.running:
-                break
-            while self.paused:
-                await asyncio.sleep(1)
-                if not self.running:
-                    break
-            if not self.running:
-                break
+
+    async def report_progress(self):
+        while True:
+            await asyncio.sleep(STATUS_UPDATE_INTERVAL)
             try:
-                await send_advertisement_to_user(user[1], self)
-                self.sent_count += 1
-            except (BotBlocked, ChatNotFound, Unauthorized):
-                self.failed_count += 1
-            except RetryAfter as e:
-                await asyncio.sleep(e.timeout)
-            await asyncio.sleep(0.1)
-            if self.sent_count % 10 == 0:
                 await self.update_status_message()
-        self.running = False
-        self.paused = False
-        await self.update_status_message(finished=True)
+            except MessageNotModified:
+                pass
+            except Exception as e:
+                logger.warning(f"Reklama #{self.ad_id} status xabari: {e}")
 
     async def pause(self):
-        self.paused = True
+        self.engine.pause()
+        await broadcast_db_async.set_broadcast_status(self.ad_id, 'paused')
         await self.update_status_message()
 
     async def resume(self):
-        self.paused = False
+        self.engine.resume()
+        await broadcast_db_async.set_broadcast_status(self.ad_id, 'running')
         await self.update_status_message()
 
     async def stop(self):
-        self.running = False
+        self.stopped = True
+        self.engine.stop()
+        await broadcast_db_async.set_broadcast_status(self.ad_id, 'stopped')
         await self.update_status_message(stopped=True)
 
+    def status_text(self, status, started=False):
+        header = f"Reklama #{self.ad_id} yuborish boshlandi." if started else f"Reklama #{self.ad_id}"
+        text = (
+            f"{header}\nYuborilgan: {self.sent_count}\nYuborilmagan: {self.failed_count}"
+            f" (bloklagan: {self.engine.blocked_count})"
+            f"\nUmumiy: {self.sent_count + self.failed_count}/{self.total_users}"
+        )
+        if self.running and not self.paused:
+            eta = self.engine.eta(self.total_users)
+            text += f"\nTezlik: {self.engine.throughput():.1f} xabar/s"
+            text += f"\nQolgan vaqt: {format_duration(eta) if eta is not None else 'hisoblanmoqda'}"
+        return text + f"\n\nStatus: {status}"
+
     async def update_status_message(self, finished=False, stopped=False):
         status = "Yakunlandi" if finished else ("To'xtatildi" if stopped else ("Pauza holatida" if self.paused else "Davom etmoqda"))
-        if self.current_message:
-            await self.current_message.edit_text(
-                text=f"Reklama #{self.ad_id}\nYuborilgan: {self.sent_count}\nYuborilmagan: {self.failed_count}\nUmumiy: {self.sent_count + self.failed_count}/{self.total_users}\n\nStatus: {status}",
+        if self.status_message_id:
+            await bot.edit_message_text(
+                chat_id=self.creator_id,
+                message_id=self.status_message_id,
+                text=self.status_text(status),
                 reply_markup=None if finished or stopped else get_status_keyboard(self.ad_id, self.paused)
             )
 
-async def send_advertisement_to_user(chat_id, advertisement: Advertisement):
-    message = advertisement.message
-    ad_type = advertisement.ad_type
-    keyboard = advertisement.keyboard
-    caption = message.caption or message.text or "Matn mavjud emas."
-    if ad_type == 'ad_type_text':
-        await bot.send_message(chat_id=chat_id, text=caption)
-    elif ad_type == 'ad_type_button':
-        await handle_content_with_keyboard(chat_id, message, keyboard, caption)
-    elif ad_type == 'ad_type_forward':
-        await bot.forward_message(chat_id=chat_id, from_chat_id=message.chat.id, message_id=message.message_id)
-    elif ad_type == 'ad_type_any':
-        await handle_non_text_content(chat_id, message)
-    else:
-        await handle_non_text_content(chat_id, message)
-
-async def handle_content_with_keyboard(chat_id, message, keyboard, caption):
-    if message.content_type == types.ContentType.TEXT:
-        await bot.send_message(chat_id=chat_id, text=caption, reply_markup=keyboard)
-    elif message.content_type == types.ContentType.PHOTO:
-        await bot.send_photo(chat_id=chat_id, photo=message.photo[-1].file_id, caption=caption, reply_markup=keyboard)
-    elif message.content_type == types.ContentType.VIDEO:
-        await bot.send_video(chat_id=chat_id, video=message.video.file_id, caption=caption, reply_markup=keyboard)
-    elif message.content_type == types.ContentType.DOCUMENT:
-        await bot.send_document(chat_id=chat_id, document=message.document.file_id, caption=caption, reply_markup=keyboard)
-    elif message.content_type == types.ContentType.AUDIO:
-        await bot.send_audio(chat_id=chat_id, audio=message.audio.file_id, caption=caption, reply_markup=keyboard)
-    elif message.content_type == types.ContentType.ANIMATION:
-        await bot.send_animation(chat_id=chat_id, animation=message.animation.file_id, caption=caption, reply_markup=keyboard)
-    else:
-        await bot.send_message(chat_id=chat_id, text=caption, reply_markup=keyboard)
-
-async def handle_non_text_content(chat_id, message):
-    if message.content_type == types.ContentType.TEXT:
-        text = message.text or "Matn mavjud emas."
-        await bot.send_message(chat_id=chat_id, text=text)
-    elif message.content_type == types.ContentType.PHOTO:
-        await bot.send_photo(chat_id=chat_id, photo=message.photo[-1].file_id, caption=message.caption)
-    elif message.content_type == types.ContentType.VIDEO:
-        await bot.send_video(chat_id=chat_id, video=message.video.file_id, caption=message.caption)
-    elif message.content_type == types.ContentType.DOCUMENT:
-        await bot.send_document(chat_id=chat_id, document=message.document.file_id, caption=message.caption)
-    elif message.content_type == types.ContentType.AUDIO:
-        await bot.send_audio(chat_id=chat_id, audio=message.audio.file_id, caption=message.caption)
-    elif message.content_type == types.ContentType.ANIMATION:
-        await bot.send_animation(chat_id=chat_id, animation=message.animation.file_id, caption=message.caption)
-    else:
-        await bot.send_message(chat_id=chat_id, text="Yuboriladigan kontent turi qo'llab-quvvatlanmaydi.")
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours} soat {minutes} daqiqa"
+    if minutes:
+        return f"{minutes} daqiqa {seconds} soniya"
+    return f"{seconds} soniya"
+
+
+async def resume_advertisements():
+    """Restart'dan oldin tugallanmagan reklamalarni saqlangan cursor'dan davom ettirish"""
+    records = await broadcast_db_async.get_unfinished_broadcasts()
+    for record in records:
+        try:
+            advertisement = Advertisement.from_record(record)
+        except Exception as e:
+            logger.error(f"❌ Reklama #{record['id']} tiklanmadi: {e}")
+            await broadcast_db_async.set_broadcast_status(record['id'], 'stopped')
+            continue
+        advertisements.append(advertisement)
+        advertisement.task = asyncio.create_task(advertisement.start(paused=record['status'] == 'paused'))
+        logger.info(f"▶️ Reklama #{record['id']} davom ettirildi (cursor={record['cursor']})")
+    return len(records)
 
 async def check_super_admin_permission(telegram_id: int):
     return telegram_id in ADMINS
@@ -241,15 +339,24 @@ async def confirm_ad_handler(callback_query: types.CallbackQuery, state: FSMCont
     ad_content = data.get('ad_content')
     keyboard = data.get('keyboard')
     send_time = data.get('send_time_value') if data.get('send_time') == 'send_later' else None
-    ad_id = len(advertisements) + 1
     advertisement = Advertisement(
-        ad_id=ad_id,
+        ad_id=None,
         message=ad_content,
         ad_type=ad_type,
         keyboard=keyboard,
         send_time=send_time,
         creator_id=callback_query.from_user.id
     )
+    ad_id = advertisement.ad_id = await broadcast_db_async.create_broadcast(
+        creator_id=advertisement.creator_id,
+        ad_type=ad_type,
+        payload=advertisement.to_payload(),
+        send_time=send_time.isoformat() if send_time else None
+    )
+    if ad_id is None:
+        await state.finish()
+        await callback_query.message.edit_text("❌ Reklamani saqlashda xatolik.")
+        return
     advertisements.append(advertisement)
     await state.finish()
     await callback_query.message.edit_text(f"Reklama #{ad_id} yuborish jadvalga qo'shildi.")
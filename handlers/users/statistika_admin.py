@@ -1,6 +1,6 @@
 from aiogram import types
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from loader import user_db, dp
+from loader import user_db, user_db_async, dp
 from data.config import ADMINS  # ADMINS ro'yxatini import qilish
 
 
@@ -24,14 +24,15 @@ async def admin_statistics_handler(message: types.Message):
     telegram_id=message.from_user.id
     if await check_super_admin_permission(telegram_id) or await check_admin_permission(telegram_id):
         # Statistikalarni olish
-        total_users = user_db.count_users()
-        active_users = user_db.count_active_users()
-        inactive_users = user_db.count_users() - active_users
-        users_last_12_hours = user_db.count_users_last_12_hours()
-        users_today = user_db.count_users_today()
-        users_this_week = user_db.count_users_this_week()
-        users_this_month = user_db.count_users_this_month()
-        total_admins = len(user_db.get_all_admins())
+        total_users = await user_db_async.count_users()
+        active_users = await user_db_async.count_active_users()
+        inactive_users = total_users - active_users
+        growth = await user_db_async.get_user_growth_counts()
+        users_last_12_hours = growth['last_12_hours']
+        users_today = growth['today']
+        users_this_week = growth['week']
+        users_this_month = growth['month']
+        total_admins = len(await user_db_async.get_all_admins())
 
         # Inline tugmalar
         markup = InlineKeyboardMarkup()
@@ -7,7 +7,7 @@ import logging
 import json
 import uuid
 
-from loader import dp, bot, user_db
+from loader import dp, bot, user_db, user_db_async
 from keyboards.default.default_keyboard import (
     main_menu_keyboard,
     cancel_keyboard,
@@ -246,6 +246,16 @@ Pastdagi tugmalardan birini tanlang! 👇
         await message.answer("❌ Xatolik yuz berdi. Iltimos, qaytadan urinib ko'ring.")
 
 
+@dp.my_chat_member_handler(chat_type=types.ChatType.PRIVATE)
+async def bot_blocked_or_unblocked(update: types.ChatMemberUpdated):
+    """User botni bloklasa/blokdan chiqarsa - reklama ro'yxatidan chiqariladi/qaytariladi"""
+    status = update.new_chat_member.status
+    if status == types.ChatMemberStatus.KICKED:
+        await user_db_async.mark_user_as_blocked(update.from_user.id)
+    elif status == types.ChatMemberStatus.MEMBER:
+        await user_db_async.mark_user_as_unblocked(update.from_user.id)
+
+
 # ==================== PITCH DECK ====================
 @dp.message_handler(Text(equals="🎯 Pitch Deck"), state='*')
 async def pitch_deck_start(message: types.Message, state: FSMContext):
@@ -18,6 +18,8 @@ from keyboards.default.default_keyboard import main_menu_keyboard
 # Generator importlari
 from utils.weekly_report_generator import WeeklyReportGenerator
 from utils.weekly_report_docx import WeeklyReportDocx
+from utils.misc.generation import TokenProgress
+from utils.misc.openai_pool import PRIORITY_PAID, openai_priority
 
 logger = logging.getLogger(__name__)
 
@@ -97,16 +99,24 @@ async def handle_weekly_report_data(message: types.Message, data: dict):
     tasks = data.get('tasks', {})
 
     # 4. Status xabar
-    status_msg = await message.answer(
+    status_header = (
         f"✅ <b>Qabul qilindi!</b>\n\n"
         f"👤 {full_name}\n"
         f"🏘️ {mahalla}\n"
         f"📅 {week_date}\n\n"
         f"⏳ <b>AI hujjat yaratmoqda...</b>\n"
-        f"<i>Iltimos kuting, 1-3 daqiqa vaqt ketadi.</i>",
+    )
+    status_msg = await message.answer(
+        status_header + "<i>Iltimos kuting, 1-3 daqiqa vaqt ketadi.</i>",
         parse_mode='HTML'
     )
 
+    async def show_progress(progress: TokenProgress):
+        await status_msg.edit_text(
+            status_header + f"✍️ <i>Yozildi: {progress.tokens:,} token</i>",
+            parse_mode='HTML'
+        )
+
     try:
         # 5. Balansdan yechish
         success = user_db.deduct_from_balance(telegram_id, REPORT_PRICE)
@@ -126,14 +136,18 @@ async def handle_weekly_report_data(message: types.Message, data: dict):
 
         # 6. AI GENERATOR - Content yaratish
         ai_generator = WeeklyReportGenerator(api_key=OPENAI_API_KEY)
-
-        content = await ai_generator.generate_weekly_report(
-            full_name=full_name,
-            mahalla=mahalla,
-            tuman=tuman,
-            week_date=week_date,
-            tasks=tasks
-        )
+        token_progress = TokenProgress(show_progress)
+
+        with openai_priority(PRIORITY_PAID):
+            content = await ai_generator.generate_weekly_report(
+                full_name=full_name,
+                mahalla=mahalla,
+                tuman=tuman,
+                week_date=week_date,
+                tasks=tasks,
+                progress=token_progress
+            )
+        await token_progress.stop()
 
         if not content:
             # Xatolik - pulni qaytarish
@@ -4,6 +4,8 @@ from utils.db_api.users import UserDatabase
 from utils.db_api.groups import GroupDatabase
 from utils.db_api.channels import ChannelDatabase
 from utils.db_api.cache import MediaCacheDatabase
+from utils.db_api.broadcasts import BroadcastDatabase
+from utils.db_api.async_database import AsyncDatabase
 
 from data import config
 
@@ -15,3 +17,8 @@ user_db=UserDatabase(path_to_db="data/user.db")
 group_db=GroupDatabase(path_to_db="data/group.db")
 channel_db=ChannelDatabase(path_to_db="data/channel.db")
 cache_db=MediaCacheDatabase(path_to_db="data/cache.db")
+broadcast_db=BroadcastDatabase(path_to_db="data/user.db")
+# async fasadlar - handler'lar va worker event loop'ni bloklamasligi uchun
+user_db_async=AsyncDatabase(user_db)
+channel_db_async=AsyncDatabase(channel_db)
+broadcast_db_async=AsyncDatabase(broadcast_db)
@@ -1,13 +1,14 @@
 # middlewares/subscription.py
 # Majburiy obuna middleware
 
+import asyncio
 import logging
 from aiogram import types
 from aiogram.dispatcher.handler import CancelHandler
 from aiogram.dispatcher.middlewares import BaseMiddleware
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-from loader import dp, bot, channel_db
+from loader import dp, bot, channel_db_async
 from utils.misc import subscription
 from data.config import ADMINS
 
@@ -18,6 +19,32 @@ ALLOWED_COMMANDS = ['/start', '/help', '/admin', '/bepul']
 ALLOWED_CALLBACKS = ['check_subs', 'lang_']  # check_subs va lang_ bilan boshlanadigan callback'lar
 
 
+async def get_not_subscribed(user_id: int, channels: list, use_cache: bool = True) -> list:
+    """
+    Obuna bo'lmagan kanallar ro'yxati.
+
+    Natijalar subscription keshidan olinadi, qolganlari uchun
+    get_chat_member so'rovlari parallel yuboriladi.
+    """
+    results = await asyncio.gather(*(
+        subscription.check(user_id=user_id, channel=channel[1], use_cache=use_cache)
+        for channel in channels
+    ), return_exceptions=True)
+
+    not_subscribed = []
+    for channel, is_subscribed in zip(channels, results):
+        if isinstance(is_subscribed, Exception):
+            logger.error(f"❌ Kanal tekshirishda xato: {channel} - {is_subscribed}")
+            continue  # Xato bo'lgan kanalni o'tkazib yuboramiz
+        if not is_subscribed:
+            not_subscribed.append({
+                'id': channel[1],  # channel_id
+                'title': channel[2],  # title
+                'link': channel[3]  # invite_link
+            })
+    return not_subscribed
+
+
 class SubscriptionMiddleware(BaseMiddleware):
     """Majburiy obuna middleware"""
 
@@ -56,7 +83,7 @@ class SubscriptionMiddleware(BaseMiddleware):
 
         # ==================== KANALLAR RO'YXATINI OLISH ====================
         try:
-            channels = channel_db.get_all_channels()
+            channels = await channel_db_async.get_all_channels()
         except Exception as e:
             logger.error(f"❌ Kanallarni olishda xato: {e}")
             return  # Xato bo'lsa, user'ni o'tkazamiz
@@ -66,27 +93,7 @@ class SubscriptionMiddleware(BaseMiddleware):
             return
 
         # ==================== OBUNA TEKSHIRISH ====================
-        not_subscribed_channels = []
-
-        for channel in channels:
-            try:
-                channel_id = channel[1]  # channel_id
-                title = channel[2]  # title
-                invite_link = channel[3]  # invite_link
-
-                # Obunani tekshirish
-                is_subscribed = await subscription.check(user_id=user_id, channel=channel_id)
-
-                if not is_subscribed:
-                    not_subscribed_channels.append({
-                        'id': channel_id,
-                        'title': title,
-                        'link': invite_link
-                    })
-
-            except Exception as e:
-                logger.error(f"❌ Kanal tekshirishda xato: {channel} - {e}")
-                continue  # Xato bo'lgan kanalni o'tkazib yuboramiz
+        not_subscribed_channels = await get_not_subscribed(user_id, channels)
 
         # ==================== AGAR HAMMAGA OBUNA BO'LGAN BO'LSA ====================
         if not not_subscribed_channels:
@@ -148,8 +155,11 @@ async def check_subscriptions_callback(call: types.CallbackQuery):
     """Obunani tekshirish tugmasi bosilganda"""
     user_id = call.from_user.id
 
+    # User "obuna bo'ldim" deyapti - eski natijalarni tashlab, Telegram'dan qayta so'raymiz
+    subscription.cache.invalidate_user(user_id)
+
     try:
-        channels = channel_db.get_all_channels()
+        channels = await channel_db_async.get_all_channels()
     except Exception as e:
         logger.error(f"❌ Kanallarni olishda xato: {e}")
         await call.answer("✅ Xush kelibsiz!", show_alert=True)
@@ -162,25 +172,7 @@ async def check_subscriptions_callback(call: types.CallbackQuery):
         return
 
     # Obuna bo'lmagan kanallar
-    not_subscribed = []
-
-    for channel in channels:
-        try:
-            channel_id = channel[1]
-            title = channel[2]
-            invite_link = channel[3]
-
-            is_subscribed = await subscription.check(user_id=user_id, channel=channel_id)
-
-            if not is_subscribed:
-                not_subscribed.append({
-                    'id': channel_id,
-                    'title': title,
-                    'link': invite_link
-                })
-        except Exception as e:
-            logger.error(f"❌ Tekshirishda xato: {e}")
-            continue
+    not_subscribed = await get_not_subscribed(user_id, channels, use_cache=False)
 
     # Agar hammaga obuna bo'lgan bo'lsa
     if not not_subscribed:
@@ -0,0 +1,384 @@
+# utils/broadcast.py
+# Ommaviy xabar yuborish: sahifali qabul qiluvchilar, rate limiter, parallel yuboruvchilar
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from aiogram import Bot, types
+from aiogram.utils.exceptions import (
+    BadRequest, BotBlocked, ChatNotFound, RetryAfter, TelegramAPIError, Unauthorized, UserDeactivated
+)
+
+logger = logging.getLogger(__name__)
+
+# Telegram: bot uchun ~30 xabar/soniya (global), bitta chatga ~1 xabar/soniya
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+BROADCAST_PAGE_SIZE = int(os.getenv("BROADCAST_PAGE_SIZE", "500"))
+
+# Bu xatolar - user botni bloklagan yoki akkaunt o'chirilgan, qayta urinish befoyda
+BLOCKED_ERRORS = (BotBlocked, ChatNotFound, UserDeactivated, Unauthorized)
+
+# copy_message manba xabar o'chirilgan bo'lsa - file_id bilan yuborishga o'tiladi
+SOURCE_GONE_ERRORS = ('message to copy not found', 'message to forward not found')
+
+# content_type -> (send_* metodi, fayl argumenti, caption qo'llab-quvvatlanadimi)
+FILE_SENDERS = {
+    types.ContentType.PHOTO: ('send_photo', 'photo', True),
+    types.ContentType.VIDEO: ('send_video', 'video', True),
+    types.ContentType.DOCUMENT: ('send_document', 'document', True),
+    types.ContentType.AUDIO: ('send_audio', 'audio', True),
+    types.ContentType.ANIMATION: ('send_animation', 'animation', True),
+    types.ContentType.VOICE: ('send_voice', 'voice', True),
+    types.ContentType.VIDEO_NOTE: ('send_video_note', 'video_note', False),
+    types.ContentType.STICKER: ('send_sticker', 'sticker', False),
+}
+
+
+class BroadcastContent:
+    """
+    Reklama kontenti yuborishdan oldin bir marta tahlil qilinadi:
+    content_type, file_id, matn va klaviatura har user uchun qayta hisoblanmaydi.
+
+    Rejimlar:
+    - 'copy' - har qanday kontent copy_message bilan (bitta API chaqiruv,
+      Telegram serverida mavjud file_id qayta ishlatiladi, formatlash saqlanadi)
+    - 'text' - faqat matn: matnli xabar nusxalanadi, media bo'lsa caption matn sifatida
+    - 'forward' - forward_message
+
+    Manba xabar admin chatidan o'chirilgan bo'lsa (masalan, restart'dan keyin)
+    copy_message ishlamaydi - shunda bir marta file_id bilan send_* ga o'tiladi.
+    """
+
+    def __init__(self, bot: Bot, message: types.Message, mode: str = 'copy',
+                 keyboard: types.InlineKeyboardMarkup = None):
+        self.bot = bot
+        self.mode = mode
+        self.keyboard = keyboard
+        self.from_chat_id = message.chat.id
+        self.message_id = message.message_id
+        self.content_type = message.content_type
+        self.text = message.text or message.caption
+        self.entities = message.entities or message.caption_entities
+        self.file_id = self._resolve_file_id(message)
+        self.use_copy = mode != 'text' or self.content_type == types.ContentType.TEXT
+
+    @staticmethod
+    def _resolve_file_id(message: types.Message) -> Optional[str]:
+        if message.content_type == types.ContentType.PHOTO:
+            return message.photo[-1].file_id
+        if message.content_type in FILE_SENDERS:
+            return getattr(message, message.content_type).file_id
+        return None
+
+    async def send(self, chat_id: int):
+        if self.mode == 'forward':
+            await self.bot.forward_message(chat_id=chat_id, from_chat_id=self.from_chat_id,
+                                           message_id=self.message_id)
+            return
+        if self.use_copy:
+            try:
+                await self.bot.copy_message(chat_id=chat_id, from_chat_id=self.from_chat_id,
+                                            message_id=self.message_id, reply_markup=self.keyboard)
+                return
+            except BadRequest as e:
+                if not any(error in str(e).lower() for error in SOURCE_GONE_ERRORS):
+                    raise
+                logger.warning(f"⚠️ Manba xabar topilmadi, file_id bilan yuboriladi: {e}")
+                self.use_copy = False
+        await self._send_resolved(chat_id)
+
+    async def _send_resolved(self, chat_id: int):
+        """copy_message ishlatib bo'lmaganda: oldindan olingan file_id/matn bilan"""
+        sender = FILE_SENDERS.get(self.content_type)
+        if self.mode == 'text' or sender is None or self.file_id is None:
+            if self.mode != 'text' and self.content_type != types.ContentType.TEXT and sender is None:
+                text = "Yuboriladigan kontent turi qo'llab-quvvatlanmaydi."
+                entities = None
+            else:
+                text = self.text or "Matn mavjud emas."
+                entities = self.entities if self.text else None
+            await self.bot.send_message(chat_id=chat_id, text=text, entities=entities, reply_markup=self.keyboard)
+            return
+
+        method, argument, has_caption = sender
+        kwargs = {argument: self.file_id, 'reply_markup': self.keyboard}
+        if has_caption and self.text:
+            kwargs.update(caption=self.text, caption_entities=self.entities)
+        await getattr(self.bot, method)(chat_id=chat_id, **kwargs)
+
+
+class RateLimiter:
+    """
+    Token bucket (global limit) + chat bo'yicha minimal interval.
+
+    RetryAfter kelsa pause() orqali barcha yuboruvchilar birga to'xtaydi -
+    har biri alohida flood limitga urilmasligi uchun.
+    """
+
+    def __init__(self, rate: float = BROADCAST_RATE, burst: float = None,
+                 per_chat_interval: float = 1.0, max_tracked_chats: int = 10_000):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.per_chat_interval = per_chat_interval
+        self.max_tracked_chats = max_tracked_chats
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._last_sent: "OrderedDict[int, float]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Global to'xtash (RetryAfter)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, chat_id: int = None):
+        # Chat limiti global navbatni ushlab turmasligi uchun lock'dan tashqarida
+        if chat_id is not None:
+            last = self._last_sent.get(chat_id)
+            if last is not None:
+                wait = last + self.per_chat_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    self._updated_at = time.monotonic()
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    break
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+        if chat_id is not None:
+            self._last_sent[chat_id] = time.monotonic()
+            self._last_sent.move_to_end(chat_id)
+            if len(self._last_sent) > self.max_tracked_chats:
+                self._last_sent.popitem(last=False)
+
+
+# Telegram limiti bot bo'yicha - parallel (yoki restart'dan keyin birga tiklangan)
+# reklamalar bitta limiter va bitta RetryAfter pauzasini bo'lishadi
+broadcast_limiter = RateLimiter()
+
+
+class BroadcastEngine:
+    """
+    Qabul qiluvchilarni bazadan sahifalab (keyset: id > cursor) o'qib,
+    `concurrency` ta yuboruvchi bilan RateLimiter doirasida yuboradi.
+
+    - fetch_page(after_id, limit) -> [(id, chat_id), ...] id bo'yicha o'sish tartibida
+    - send(chat_id) - bitta userga yuborish
+    - on_blocked([chat_id, ...]) - bloklagan userlar to'plami (bulk yozish uchun)
+    - on_checkpoint(cursor) - har checkpoint_interval soniyada va oxirida;
+      cursor - shu id gacha (shu id ham) barcha qabul qiluvchilar ishlangan
+
+    Keyingi sahifa joriy sahifa yuborilayotganda oldindan o'qiladi. Yuborishlar
+    tartibsiz tugaydi, shuning uchun cursor uzluksiz tugagan prefiks bo'yicha
+    (watermark) suriladi - restart'da faqat oxirgi checkpoint'dan keyin
+    yuborilganlar takrorlanishi mumkin.
+    """
+
+    def __init__(
+            self,
+            fetch_page: Callable[[int, int], Awaitable[Sequence[Tuple[int, int]]]],
+            send: Callable[[int], Awaitable],
+            on_blocked: Callable[[List[int]], Awaitable] = None,
+            on_checkpoint: Callable[[int], Awaitable] = None,
+            limiter: RateLimiter = None,
+            concurrency: int = BROADCAST_CONCURRENCY,
+            page_size: int = BROADCAST_PAGE_SIZE,
+            max_retries: int = 3,
+            checkpoint_interval: float = 5.0,
+            rate_window: float = 60.0,
+    ):
+        self.fetch_page = fetch_page
+        self.send = send
+        self.on_blocked = on_blocked
+        self.on_checkpoint = on_checkpoint
+        self.limiter = limiter or broadcast_limiter
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.max_retries = max_retries
+        self.checkpoint_interval = checkpoint_interval
+        self.rate_window = rate_window
+
+        # Resume'da saqlangan qiymatlar bilan to'ldirish mumkin
+        self.cursor = 0
+        self.sent_count = 0
+        self.failed_count = 0
+        self.blocked_count = 0
+        self.running = False
+        self._stop_requested = False
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._blocked: List[int] = []
+        self._queued = deque()
+        self._done = set()
+        self._samples = deque()
+
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    @property
+    def processed(self) -> int:
+        return self.sent_count + self.failed_count
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def stop(self):
+        """run() dan oldin chaqirilsa ham amal qiladi - run() hech narsa yubormaydi"""
+        self._stop_requested = True
+        self.running = False
+        # Pauzada kutayotgan yuboruvchilar chiqib ketishi uchun
+        self._resumed.set()
+
+    def throughput(self) -> float:
+        """Oxirgi rate_window soniyadagi tezlik (xabar/soniya)"""
+        now = time.monotonic()
+        self._sample(now)
+        oldest_time, oldest_processed = self._samples[0]
+        elapsed = now - oldest_time
+        return (self.processed - oldest_processed) / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, total: int) -> Optional[float]:
+        """Qolgan vaqt (soniya); tezlik noma'lum bo'lsa None"""
+        rate = self.throughput()
+        remaining = max(total - self.processed, 0)
+        if remaining == 0:
+            return 0.0
+        return remaining / rate if rate > 0 else None
+
+    def _sample(self, now: float):
+        if not self._samples or now - self._samples[-1][0] >= 1.0:
+            self._samples.append((now, self.processed))
+        while len(self._samples) > 1 and now - self._samples[1][0] >= self.rate_window:
+            self._samples.popleft()
+
+    async def run(self, start_after: int = 0):
+        if self._stop_requested:
+            return
+        self.cursor = start_after
+        self.running = True
+        self._queued.clear()
+        self._done.clear()
+        self._samples.clear()
+        self._sample(time.monotonic())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        senders = [asyncio.create_task(self._sender(queue)) for _ in range(self.concurrency)]
+        checkpointer = asyncio.create_task(self._checkpoint_loop())
+
+        try:
+            page = await self.fetch_page(self.cursor, self.page_size)
+            while page and self.running:
+                next_page = asyncio.create_task(self.fetch_page(page[-1][0], self.page_size))
+                for row_id, chat_id in page:
+                    if not self.running:
+                        break
+                    self._queued.append(row_id)
+                    await queue.put((row_id, chat_id))
+
+                if not self.running:
+                    next_page.cancel()
+                    break
+                page = await next_page
+            await queue.join()
+        finally:
+            self.running = False
+            checkpointer.cancel()
+            for sender in senders:
+                sender.cancel()
+            await asyncio.gather(checkpointer, *senders, return_exceptions=True)
+            await self._checkpoint()
+
+    async def _sender(self, queue: asyncio.Queue):
+        while True:
+            row_id, chat_id = await queue.get()
+            try:
+                if self.running:
+                    await self._resumed.wait()
+                if self.running:
+                    await self._deliver(chat_id)
+                    self._mark_done(row_id)
+            except Exception as e:
+                self.failed_count += 1
+                self._mark_done(row_id)
+                logger.error(f"❌ Broadcast xato ({chat_id}): {e}")
+            finally:
+                queue.task_done()
+
+    def _mark_done(self, row_id: int):
+        self._done.add(row_id)
+        while self._queued and self._queued[0] in self._done:
+            self.cursor = self._queued.popleft()
+            self._done.discard(self.cursor)
+
+    async def _checkpoint_loop(self):
+        last_cursor = self.cursor
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            self._sample(time.monotonic())
+            if self.cursor != last_cursor:
+                last_cursor = self.cursor
+                await self._checkpoint()
+
+    async def _checkpoint(self):
+        # Avval bloklanganlar yoziladi - cursor ulardan o'tib ketmasligi uchun
+        await self._flush_blocked()
+        if self.on_checkpoint:
+            try:
+                await self.on_checkpoint(self.cursor)
+            except Exception as e:
+                logger.error(f"❌ Broadcast checkpoint xato: {e}")
+
+    async def _deliver(self, chat_id: int):
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(chat_id)
+            try:
+                await self.send(chat_id)
+                self.sent_count += 1
+                return
+            except RetryAfter as e:
+                logger.warning(f"⏳ Flood limit: {e.timeout} s kutiladi")
+                self.limiter.pause(e.timeout)
+            except BLOCKED_ERRORS:
+                self.failed_count += 1
+                self.blocked_count += 1
+                self._blocked.append(chat_id)
+                if len(self._blocked) >= 100:
+                    await self._flush_blocked()
+                return
+            except TelegramAPIError as e:
+                self.failed_count += 1
+                logger.warning(f"⚠️ Yuborilmadi ({chat_id}): {e}")
+                return
+        self.failed_count += 1
+
+    async def _flush_blocked(self):
+        if not self._blocked:
+            return
+        blocked, self._blocked = self._blocked, []
+        if self.on_blocked:
+            try:
+                await self.on_blocked(blocked)
+            except Exception as e:
+                logger.error(f"❌ Bloklagan userlarni yozishda xato: {e}")
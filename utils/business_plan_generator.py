@@ -3,13 +3,21 @@
 
 import asyncio
 import logging
+import os
 from typing import Awaitable, Callable, Dict, Optional
-from openai import AsyncOpenAI
 
+from utils.misc.generation import GenerationTimer, TokenProgress, complete_chat, gather_limited
+from utils.misc.openai_pool import openai_pool
+
+# (tayyor bo'limlar soni, jami, oxirgi tayyor bo'lim sarlavhasi) - bo'limlar
+# tartibsiz tugaydi; boshida (0, jami, "") bilan bir marta chaqiriladi
 ProgressCallback = Callable[[int, int, str], Awaitable[None]]
 
 logger = logging.getLogger(__name__)
 
+# Bitta biznes reja uchun bir vaqtda yoziladigan bo'limlar
+BUSINESS_PLAN_CONCURRENCY = int(os.getenv("BUSINESS_PLAN_CONCURRENCY", "4"))
+
 
 class BusinessPlanGenerator:
     """
@@ -33,71 +41,13 @@ class BusinessPlanGenerator:
         "en": "English",
     }
 
-    def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
-
-    async def generate(
-            self,
-            business_name: str = "",
-            industry: str = "",
-            description: str = "",
-            investment: str = "",
-            target_market: str = "",
-            language: str = "uz",
-            initiator_type: str = "",
-            company_info: str = "",
-            personal_info: str = "",
-            location: str = "",
-            project_info: str = "",
-            product_service: str = "",
-            expenses: str = "",
-            financing: str = "",
-            credit_terms: str = "",
-            marketing: str = "",
-            progress_callback: Optional[ProgressCallback] = None,
-    ) -> Optional[Dict]:
-        """
-        To'liq professional biznes plan yaratish.
-        Qaytaradi: dict with all sections.
-        """
-        lang_instr = self.LANG_MAP.get(language, self.LANG_MAP["uz"])
-
-        # Project name fallback
-        if not project_info and business_name:
-            project_info = business_name
-        if not product_service and industry:
-            product_service = industry
-
-        context = (
-            f"=== LOYIHA PASPORTI ===\n"
-            f"1. Tashabbuskor turi: {initiator_type or '—'}\n"
-            f"2. Korxona nomi va faoliyati: {company_info or '—'}\n"
-            f"3. Tashabbuskor (F.I.Sh + tel): {personal_info or '—'}\n"
-            f"4. Hudud: {location or '—'}\n"
-            f"5. Loyiha nomi va maqsadi: {project_info or '—'}\n"
-            f"6. Mahsulot/xizmat: {product_service or '—'}\n"
-            f"7. Xarajatlar (uskuna/tovar va qiymat): {expenses or '—'}\n"
-            f"8. Moliyalashtirish (o'z mablag' + kredit): {financing or '—'}\n"
-            f"9. Kredit shartlari (foiz va muddat): {credit_terms or '—'}\n"
-            f"10. Marketing usullari: {marketing or '—'}\n"
-        )
-
-        logger.info(f"Biznes plan generatsiya boshlandi: {project_info or business_name}")
-
-        total_steps = 10
-
-        async def _notify(step: int, title: str):
-            if progress_callback:
-                try:
-                    await progress_callback(step, total_steps, title)
-                except Exception as e:
-                    logger.warning(f"Progress callback xato: {e}")
-
-        try:
-            # Step 1: Executive Summary
-            logger.info("Step 1: Ijroiya xulosasi...")
-            await _notify(1, "Ijroiya xulosasi")
-            executive_summary = await self._generate_section(
+    # (natija kaliti, progress sarlavhasi, _generate_section argumentlari).
+    # Bo'limlar bir-birining matniga tayanmaydi - faqat loyiha pasportiga,
+    # shuning uchun hammasi parallel yoziladi
+    SECTIONS = (
+        (
+            "executive_summary", "Ijroiya xulosasi",
+            dict(
                 section="IJROIYA XULOSASI (EXECUTIVE SUMMARY)",
                 instructions=(
                     "Biznes rejaning eng muhim qismi. 450-600 so'z. "
@@ -111,16 +61,12 @@ class BusinessPlanGenerator:
                     "7) Loyihaning ijtimoiy-iqtisodiy ahamiyati (soliq, ish o'rinlari).\n"
                     "Bankirlar yoki investorlar qiziqadigan, ishontiruvchi, aniq raqamlar asosida yoz."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=450,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 2: Company / Initiator Description
-            logger.info("Step 2: Tashabbuskor va kompaniya tavsifi...")
-            await _notify(2, "Tashabbuskor va kompaniya tavsifi")
-            company_description = await self._generate_section(
+            ),
+        ),
+        (
+            "company_description", "Tashabbuskor va kompaniya tavsifi",
+            dict(
                 section="TASHABBUSKOR VA KOMPANIYA TAVSIFI",
                 instructions=(
                     "500-700 so'z. Quyidagilarni LOYIHA PASPORTIDAGI ANIQ MA'LUMOTLAR asosida yoz:\n"
@@ -134,16 +80,12 @@ class BusinessPlanGenerator:
                     "7) Ro'yxatga olish tartibi (O'zbekiston Respublikasi qonunchiligiga muvofiq).\n"
                     "8) Tashabbuskorning kompetensiyasi va loyihaga tayyorlik darajasi."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=500,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 3: Market Analysis
-            logger.info("Step 3: Bozor tahlili...")
-            await _notify(3, "Bozor tahlili")
-            market_analysis = await self._generate_section(
+            ),
+        ),
+        (
+            "market_analysis", "Bozor tahlili",
+            dict(
                 section="BOZOR TAHLILI",
                 instructions=(
                     "800-1000 so'z. Loyiha hududi (paspartda ko'rsatilgan) uchun ANIQ ma'lumotlar bilan yoz:\n"
@@ -157,16 +99,12 @@ class BusinessPlanGenerator:
                     "7) SWOT tahlili (alohida 4 bandda: Kuchli, Zaif, Imkoniyat, Tahdid — har birida kamida 4 ta band).\n"
                     "8) Raqobatdosh ustunlik — nima uchun bu loyiha yaxshiroq (paspartdagi xususiyatlarga tayanib)."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=800,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 4: Product/Service
-            logger.info("Step 4: Mahsulot va xizmatlar...")
-            await _notify(4, "Mahsulot va xizmatlar")
-            product_service_sec = await self._generate_section(
+            ),
+        ),
+        (
+            "product_service_section", "Mahsulot va xizmatlar",
+            dict(
                 section="MAHSULOT VA XIZMATLAR",
                 instructions=(
                     "600-800 so'z. Paspartdagi 'Mahsulot/xizmat' bandi asosida yoz:\n"
@@ -179,16 +117,12 @@ class BusinessPlanGenerator:
                     "6) Sifat va standartlar (O'zDst, GOST yoki soha standartlari).\n"
                     "7) Mahsulot/xizmat rivoji — keyingi 1-3 yildagi kengaytirish rejasi."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=600,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 5: Marketing Strategy
-            logger.info("Step 5: Marketing strategiyasi...")
-            await _notify(5, "Marketing va savdo strategiyasi")
-            marketing_strategy = await self._generate_section(
+            ),
+        ),
+        (
+            "marketing_strategy", "Marketing va savdo strategiyasi",
+            dict(
                 section="MARKETING VA SAVDO STRATEGIYASI",
                 instructions=(
                     "700-900 so'z. Paspartdagi 'Marketing' bandidagi KANALLARDAN asosiy tayanch sifatida foydalan:\n"
@@ -203,16 +137,12 @@ class BusinessPlanGenerator:
                     "7) Brend strategiyasi — logo, slogan, brend ohangi.\n"
                     "8) Birinchi 6 oylik marketing rejasi — oyma-oy jadval."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=700,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 6: Operations Plan
-            logger.info("Step 6: Operatsion reja...")
-            await _notify(6, "Operatsion reja")
-            operations_plan = await self._generate_section(
+            ),
+        ),
+        (
+            "operations_plan", "Operatsion reja",
+            dict(
                 section="OPERATSION REJA",
                 instructions=(
                     "600-800 so'z. Paspartdagi hudud va xarajatlar asosida yoz:\n"
@@ -226,16 +156,12 @@ class BusinessPlanGenerator:
                     "8) Loyihani amalga oshirish kalendari (milestones) — 12 oylik bosqichli jadval "
                     "(1-oy: ro'yxatdan o'tish, 2-oy: kredit olish, 3-oy: uskunalar, va hokazo)."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=600,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 7: Financial Projections — MUHIM BO'LIM
-            logger.info("Step 7: Moliyaviy prognoz...")
-            await _notify(7, "Moliyaviy prognoz (kredit grafigi, P&L, Cash Flow)")
-            financial_projections = await self._generate_section(
+            ),
+        ),
+        (
+            "financial_projections", "Moliyaviy prognoz (kredit grafigi, P&L, Cash Flow)",
+            dict(
                 section="MOLIYAVIY PROGNOZ",
                 instructions=(
                     "1000-1300 so'z. BU ENG MUHIM BO'LIM — paspartdagi ANIQ RAQAMLARDAN foydalaning:\n"
@@ -267,16 +193,12 @@ class BusinessPlanGenerator:
                     "MUHIM: barcha raqamlarni PASPARTdagi ma'lumotlarga mos va realistik yozing. "
                     "Jadvallarni matn ichida tartibli joylashtiring."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=1000,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 8: Team
-            logger.info("Step 8: Jamoa...")
-            await _notify(8, "Boshqaruv jamoasi va kadrlar")
-            team_section = await self._generate_section(
+            ),
+        ),
+        (
+            "team_section", "Boshqaruv jamoasi va kadrlar",
+            dict(
                 section="BOSHQARUV JAMOASI VA KADRLAR",
                 instructions=(
                     "400-550 so'z. Quyidagilarni yoz:\n"
@@ -289,16 +211,12 @@ class BusinessPlanGenerator:
                     "7) Ijtimoiy paket va motivatsiya tizimi.\n"
                     "8) Ish o'rinlari soni va ijtimoiy ahamiyati."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=400,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 9: Risk Analysis
-            logger.info("Step 9: Risk tahlili...")
-            await _notify(9, "Risk tahlili va boshqaruv")
-            risk_analysis = await self._generate_section(
+            ),
+        ),
+        (
+            "risk_analysis", "Risk tahlili va boshqaruv",
+            dict(
                 section="RISK TAHLILI VA BOSHQARUV",
                 instructions=(
                     "500-700 so'z. JADVAL ko'rinishida yoz (Risk | Ehtimol | Ta'sir | Profilaktika | Muqobil harakat):\n"
@@ -319,16 +237,12 @@ class BusinessPlanGenerator:
                     "- Muqobil harakat rejasi (Contingency Plan)\n\n"
                     "Oxirida: sug'urta va qo'shimcha himoya choralari."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=500,
-            )
-            await asyncio.sleep(0.5)
-
-            # Step 10: Conclusion
-            logger.info("Step 10: Xulosa...")
-            await _notify(10, "Xulosa va investor/bankga murojaat")
-            conclusion = await self._generate_section(
+            ),
+        ),
+        (
+            "conclusion", "Xulosa va investor/bankga murojaat",
+            dict(
                 section="XULOSA VA INVESTOR/BANKGA MUROJAAT",
                 instructions=(
                     "350-450 so'z. Quyidagilarni PASPORT asosidagi aniq raqamlar bilan yoz:\n"
@@ -341,10 +255,100 @@ class BusinessPlanGenerator:
                     "7) Bank yoki investorga aniq murojaat va hamkorlik taklifi.\n"
                     "Ishontiruvchi, professional va amaliy ohangda yoz."
                 ),
-                context=context,
-                lang_instr=lang_instr,
                 min_words=350,
-            )
+            ),
+        ),
+    )
+
+    def __init__(self, api_key: str, max_concurrency: int = BUSINESS_PLAN_CONCURRENCY):
+        # 429/Retry-After va RPM/TPM limiti umumiy pool'da - barcha generatorlar uchun bitta
+        self.client = openai_pool.client(api_key, feature="business_plan")
+        self.max_concurrency = max_concurrency
+
+    async def generate(
+            self,
+            business_name: str = "",
+            industry: str = "",
+            description: str = "",
+            investment: str = "",
+            target_market: str = "",
+            language: str = "uz",
+            initiator_type: str = "",
+            company_info: str = "",
+            personal_info: str = "",
+            location: str = "",
+            project_info: str = "",
+            product_service: str = "",
+            expenses: str = "",
+            financing: str = "",
+            credit_terms: str = "",
+            marketing: str = "",
+            progress_callback: Optional[ProgressCallback] = None,
+            progress: Optional[TokenProgress] = None,
+    ) -> Optional[Dict]:
+        """
+        To'liq professional biznes plan yaratish.
+        progress berilsa bo'limlar stream qilinadi va tokenlar shu yerga yoziladi.
+        Qaytaradi: dict with all sections.
+        """
+        lang_instr = self.LANG_MAP.get(language, self.LANG_MAP["uz"])
+
+        # Project name fallback
+        if not project_info and business_name:
+            project_info = business_name
+        if not product_service and industry:
+            product_service = industry
+
+        context = (
+            f"=== LOYIHA PASPORTI ===\n"
+            f"1. Tashabbuskor turi: {initiator_type or '—'}\n"
+            f"2. Korxona nomi va faoliyati: {company_info or '—'}\n"
+            f"3. Tashabbuskor (F.I.Sh + tel): {personal_info or '—'}\n"
+            f"4. Hudud: {location or '—'}\n"
+            f"5. Loyiha nomi va maqsadi: {project_info or '—'}\n"
+            f"6. Mahsulot/xizmat: {product_service or '—'}\n"
+            f"7. Xarajatlar (uskuna/tovar va qiymat): {expenses or '—'}\n"
+            f"8. Moliyalashtirish (o'z mablag' + kredit): {financing or '—'}\n"
+            f"9. Kredit shartlari (foiz va muddat): {credit_terms or '—'}\n"
+            f"10. Marketing usullari: {marketing or '—'}\n"
+        )
+
+        logger.info(f"Biznes plan generatsiya boshlandi: {project_info or business_name}")
+
+        total_steps = len(self.SECTIONS)
+
+        async def _notify(step: int, title: str):
+            if progress_callback:
+                try:
+                    await progress_callback(step, total_steps, title)
+                except Exception as e:
+                    logger.warning(f"Progress callback xato: {e}")
+
+        async def generate_one(key: str, title: str, spec: dict):
+            async with timer.step(title, "section"):
+                text = await self._generate_section(
+                    context=context, lang_instr=lang_instr, progress=progress, **spec
+                )
+            if progress is not None:
+                progress.step_done()
+            # Callback'lar ketma-ket - status xabari eski holat bilan ustidan yozilmasin
+            async with notify_lock:
+                completed.append(title)
+                await _notify(len(completed), title)
+            return key, text
+
+        try:
+            timer = GenerationTimer("business_plan")
+            completed = []
+            notify_lock = asyncio.Lock()
+            if progress is not None:
+                progress.total_steps = total_steps
+            await _notify(0, "")
+            sections = dict(await gather_limited(
+                (generate_one(key, title, spec) for key, title, spec in self.SECTIONS),
+                self.max_concurrency
+            ))
+            logger.info(timer.summary())
 
             logger.info("✅ Barcha bo'limlar yaratildi!")
             return {
@@ -365,16 +369,7 @@ class BusinessPlanGenerator:
                 "credit_terms": credit_terms,
                 "marketing": marketing,
                 # Generatsiya qilingan bo'limlar
-                "executive_summary": executive_summary,
-                "company_description": company_description,
-                "market_analysis": market_analysis,
-                "product_service_section": product_service_sec,
-                "marketing_strategy": marketing_strategy,
-                "operations_plan": operations_plan,
-                "financial_projections": financial_projections,
-                "team_section": team_section,
-                "risk_analysis": risk_analysis,
-                "conclusion": conclusion,
+                **sections,
             }
 
         except Exception as e:
@@ -388,6 +383,7 @@ class BusinessPlanGenerator:
             context: str,
             lang_instr: str,
             min_words: int,
+            progress: Optional[TokenProgress] = None,
     ) -> str:
         """Bitta bo'limni GPT-4o bilan yaratish"""
         prompt = f"""Sen O'zbekiston bozori bo'yicha professional biznes tahlilchi va moliyaviy strategist.
@@ -413,15 +409,19 @@ QAT'IY QOIDALAR:
 6. Matndan boshqa hech narsa qo'shma: sarlavha, izoh, "Quyida..." kabi kirishlar YO'Q.
 7. Professional, aniq, ishonchli va amaliy uslub."""
 
+        # 429 va tarmoq xatolari pool ichida qayta uriniladi; bu yerda - qolganlari
+        # (masalan stream o'rtasida uzilish)
         for attempt in range(3):
             try:
-                response = await self.client.chat.completions.create(
+                text = await complete_chat(
+                    self.client,
+                    progress,
                     model="gpt-4o-mini",
                     messages=[{"role": "user", "content": prompt}],
                     max_tokens=3000,
                     temperature=0.6,
                 )
-                text = response.choices[0].message.content.strip()
+                text = text.strip()
                 word_count = len(text.split())
                 logger.info(f"  '{section}': {word_count} so'z")
                 return text
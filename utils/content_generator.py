@@ -2,7 +2,9 @@ import asyncio
 import json
 import logging
 from typing import Dict, List, Optional
-from openai import AsyncOpenAI
+
+from utils.misc.generation import TokenProgress, complete_chat
+from utils.misc.openai_pool import openai_pool
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +16,14 @@ class ContentGenerator:
     """
 
     def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.client = openai_pool.client(api_key, feature="content")
 
     async def generate_pitch_deck_content(
             self,
             answers: List[str],
-            use_gpt4: bool = True
+            use_gpt4: bool = True,
+            progress: Optional[TokenProgress] = None,
+            use_cache: bool = True
     ) -> Dict:
         """
         Pitch Deck uchun professional content yaratish
@@ -27,6 +31,8 @@ class ContentGenerator:
         Args:
             answers: 10 ta savolga javoblar
             use_gpt4: GPT-4 ishlatish (yoki GPT-3.5)
+            progress: berilsa javob stream qilinadi va tokenlar shu yerga yoziladi
+            use_cache: False - bozor tahlili llm_cache'dan olinmaydi
 
         Returns:
             Professional pitch content (JSON)
@@ -37,7 +43,9 @@ class ContentGenerator:
         market_data = await self._generate_market_analysis(
             project_info=answers[1] if len(answers) > 1 else "",
             target_audience=answers[5] if len(answers) > 5 else "",
-            model=model
+            model=model,
+            progress=progress,
+            use_cache=use_cache
         )
 
         # To'liq pitch content yaratish
@@ -46,7 +54,9 @@ class ContentGenerator:
         try:
             logger.info(f"OpenAI: Pitch deck content yaratish boshlandi (model: {model})")
 
-            response = await self.client.chat.completions.create(
+            raw = await complete_chat(
+                self.client,
+                progress,
                 model=model,
                 messages=[
                     {
@@ -63,7 +73,7 @@ class ContentGenerator:
                 response_format={"type": "json_object"}
             )
 
-            content = json.loads(response.choices[0].message.content)
+            content = json.loads(raw)
             logger.info(f"OpenAI: Pitch deck content yaratildi")
 
             return content
@@ -78,11 +88,15 @@ class ContentGenerator:
             details: str,
             slide_count: int,
             use_gpt4: bool = False,
-            language: str = "uz"
+            language: str = "uz",
+            progress: Optional[TokenProgress] = None,
+            use_cache: bool = True
     ) -> Dict:
         """
         Professional prezentatsiya uchun content yaratish
-        GPT-4o bilan ishlaydi
+        GPT-4o bilan ishlaydi; progress berilsa javob stream qilinadi.
+        Bir xil mavzu/slaydlar soni/til uchun javob llm_cache'dan olinadi
+        (use_cache=False - har doim yangidan yaratish).
         """
         model = "gpt-4o-mini"
 
@@ -178,7 +192,10 @@ REMEMBER: All text MUST be {lang_instruction}. Only image_keywords in English.""
         try:
             logger.info(f"OpenAI: Prezentatsiya content yaratish (model: {model}, lang: {language})")
 
-            response = await self.client.chat.completions.create(
+            raw = await complete_chat(
+                self.client,
+                progress,
+                cache=use_cache,
                 model=model,
                 messages=[
                     {
@@ -195,7 +212,7 @@ REMEMBER: All text MUST be {lang_instruction}. Only image_keywords in English.""
                 response_format={"type": "json_object"}
             )
 
-            content = json.loads(response.choices[0].message.content)
+            content = json.loads(raw)
             logger.info(f"OpenAI: Prezentatsiya content yaratildi")
 
             return content
@@ -301,8 +318,10 @@ Faqat O'zbek tilida, real va amaliy bo'lsin.
                 ]
             }
 
-    async def _generate_market_analysis(self, project_info: str, target_audience: str, model: str) -> Dict:
-        """Bozor tahlili yaratish"""
+    async def _generate_market_analysis(self, project_info: str, target_audience: str, model: str,
+                                        progress: Optional[TokenProgress] = None,
+                                        use_cache: bool = True) -> Dict:
+        """Bozor tahlili yaratish (bir xil loyiha/auditoriya uchun keshdan)"""
 
         prompt = f"""
 Loyiha: {project_info}
@@ -320,7 +339,10 @@ Bozor tahlili JSON:
 """
 
         try:
-            response = await self.client.chat.completions.create(
+            raw = await complete_chat(
+                self.client,
+                progress,
+                cache=use_cache,
                 model=model,
                 messages=[
                     {"role": "system", "content": "Siz bozor tahlili mutaxassisisiz."},
@@ -331,7 +353,7 @@ Bozor tahlili JSON:
                 response_format={"type": "json_object"}
             )
 
-            return json.loads(response.choices[0].message.content)
+            return json.loads(raw)
 
         except:
             return {
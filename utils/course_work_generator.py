@@ -1,15 +1,22 @@
 # utils/course_work_generator.py
 # MUSTAQIL ISH / REFERAT CONTENT GENERATOR
-# YANGILANGAN - Multi-step generation: har bir bo'lim alohida API call bilan yaratiladi
+# YANGILANGAN - Multi-step generation: har bir bo'lim alohida API call bilan yaratiladi,
+# outline'dan keyin bo'limlar parallel
 
 import asyncio
 import json
 import logging
+import os
 from typing import Dict, List, Optional
-from openai import AsyncOpenAI
+
+from utils.misc.generation import GenerationTimer, TokenProgress, complete_chat, gather_limited
+from utils.misc.openai_pool import openai_pool
 
 logger = logging.getLogger(__name__)
 
+# Bitta hujjat uchun bir vaqtda yuboriladigan OpenAI so'rovlari
+COURSE_WORK_CONCURRENCY = int(os.getenv("COURSE_WORK_CONCURRENCY", "4"))
+
 
 class CourseWorkGenerator:
     """
@@ -17,8 +24,9 @@ class CourseWorkGenerator:
     Multi-step generation: har bir bo'lim alohida generatsiya qilinadi
     """
 
-    def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(self, api_key: str, max_concurrency: int = COURSE_WORK_CONCURRENCY):
+        self.client = openai_pool.client(api_key, feature="course_work")
+        self.max_concurrency = max_concurrency
 
     async def generate_course_work_content(
             self,
@@ -28,11 +36,17 @@ class CourseWorkGenerator:
             details: str,
             page_count: int,
             language: str = 'uz',
-            use_gpt4: bool = True
+            use_gpt4: bool = True,
+            progress: Optional[TokenProgress] = None,
+            use_cache: bool = True
     ) -> Dict:
         """
         Mustaqil ish uchun BATAFSIL content yaratish - MULTI-STEP
         Har bir bo'lim alohida API call bilan yaratiladi
+
+        progress berilsa barcha so'rovlar stream qilinadi: tokenlar va tugagan
+        qadamlar (outline, adabiyotlar, har bir bo'lim) progress'ga yoziladi.
+        use_cache=False - outline llm_cache'dan olinmaydi.
         """
         try:
             # Ish turi bo'yicha struktura
@@ -41,37 +55,48 @@ class CourseWorkGenerator:
             total_words = page_count * 350
 
             logger.info(f"Multi-step generation boshlandi: {structure['name']} ({total_words} so'z)")
+            timer = GenerationTimer("course_work")
+
+            # Bog'liqliklar: hamma bo'limlar faqat outline'ga tayanadi, adabiyotlar esa
+            # outline'ga ham bog'liq emas. Shuning uchun:
+            #   1) outline || adabiyotlar
+            #   2) KIRISH + barcha boblar bo'limlari + XULOSA - parallel (semaphore bilan)
 
             # =============================================
-            # STEP 1: Generate outline (structure/plan)
+            # STEP 1: Generate references (outline'ni kutmaydi)
             # =============================================
-            logger.info("Step 1: Outline yaratilmoqda...")
-            outline = await self._generate_outline(
-                work_type, topic, subject, details, page_count, language, structure
-            )
-            await asyncio.sleep(0.5)
+            def step_done():
+                if progress is not None:
+                    progress.step_done()
+
+            async def generate_references():
+                async with timer.step("references"):
+                    references = await self._generate_references_ai(
+                        topic, subject, language, lang_instructions, structure['min_references'],
+                        progress=progress
+                    )
+                step_done()
+                return references
+
+            references_task = asyncio.create_task(generate_references())
 
             # =============================================
-            # STEP 2: Generate KIRISH (introduction)
+            # STEP 2: Generate outline (structure/plan)
             # =============================================
-            logger.info("Step 2: KIRISH yaratilmoqda...")
-            intro_min_words = max(800, structure['intro_words'])
-            introduction_text = await self._generate_section_content(
-                topic=topic,
-                subject=subject,
-                section_title="KIRISH",
-                outline=outline,
-                section_type="introduction",
-                language=language,
-                lang_instructions=lang_instructions,
-                min_words=intro_min_words,
-                chapter_title=None,
-                section_number=None
-            )
-            await asyncio.sleep(0.5)
+            logger.info("Step 1: Outline yaratilmoqda...")
+            try:
+                async with timer.step("outline"):
+                    outline = await self._generate_outline(
+                        work_type, topic, subject, details, page_count, language, structure,
+                        progress=progress, use_cache=use_cache
+                    )
+            except BaseException:
+                references_task.cancel()
+                raise
+            step_done()
 
             # =============================================
-            # STEP 3: Generate each chapter section
+            # STEP 3: KIRISH, bob bo'limlari va XULOSA - parallel
             # =============================================
             # Min so'z — ish turiga qarab
             section_min_words = {
@@ -85,7 +110,39 @@ class CourseWorkGenerator:
                 'hisobot': 700,
             }.get(work_type, 1000)
 
+            async def generate_section(label, kind, **kwargs):
+                async with timer.step(label, kind):
+                    text = await self._generate_section_content(
+                        topic=topic,
+                        subject=subject,
+                        outline=outline,
+                        language=language,
+                        lang_instructions=lang_instructions,
+                        progress=progress,
+                        **kwargs
+                    )
+                step_done()
+                return text
+
             chapters = []
+            section_jobs = [
+                generate_section(
+                    "KIRISH", "introduction",
+                    section_title="KIRISH",
+                    section_type="introduction",
+                    min_words=max(800, structure['intro_words']),
+                    chapter_title=None,
+                    section_number=None
+                ),
+                generate_section(
+                    "XULOSA", "conclusion",
+                    section_title="XULOSA",
+                    section_type="conclusion",
+                    min_words=max(600, structure['conclusion_words']),
+                    chapter_title=None,
+                    section_number=None
+                ),
+            ]
             for ch_idx, chapter_info in enumerate(outline.get('chapters', [])):
                 chapter_title = chapter_info.get('title', f'{ch_idx + 1}-bob')
                 chapter_number = chapter_info.get('number', ch_idx + 1)
@@ -94,29 +151,19 @@ class CourseWorkGenerator:
                 for sec_idx, section_info in enumerate(chapter_info.get('sections', [])):
                     sec_title = section_info.get('title', f'Bo\'lim {sec_idx + 1}')
                     sec_number = section_info.get('number', f'{chapter_number}.{sec_idx + 1}')
-
-                    logger.info(f"Step 3: {sec_number}. {sec_title} yaratilmoqda...")
-
-                    section_text = await self._generate_section_content(
-                        topic=topic,
-                        subject=subject,
+                    sections.append({
+                        'number': sec_number,
+                        'title': sec_title,
+                        'content': None
+                    })
+                    section_jobs.append(generate_section(
+                        sec_number, "section",
                         section_title=sec_title,
-                        outline=outline,
                         section_type="chapter_section",
-                        language=language,
-                        lang_instructions=lang_instructions,
                         min_words=section_min_words,
                         chapter_title=chapter_title,
                         section_number=sec_number
-                    )
-
-                    sections.append({
-                        'number': sec_number,
-                        'title': sec_title,
-                        'content': section_text
-                    })
-
-                    await asyncio.sleep(0.5)
+                    ))
 
                 chapters.append({
                     'number': chapter_number,
@@ -124,32 +171,29 @@ class CourseWorkGenerator:
                     'sections': sections
                 })
 
-            # =============================================
-            # STEP 4: Generate XULOSA (conclusion)
-            # =============================================
-            logger.info("Step 4: XULOSA yaratilmoqda...")
-            conclusion_min_words = max(600, structure['conclusion_words'])
-            conclusion_text = await self._generate_section_content(
-                topic=topic,
-                subject=subject,
-                section_title="XULOSA",
-                outline=outline,
-                section_type="conclusion",
-                language=language,
-                lang_instructions=lang_instructions,
-                min_words=conclusion_min_words,
-                chapter_title=None,
-                section_number=None
-            )
-            await asyncio.sleep(0.5)
+            if progress is not None:
+                # outline + adabiyotlar + bo'limlar
+                progress.total_steps = len(section_jobs) + 2
+
+            logger.info(f"Step 2: {len(section_jobs)} ta bo'lim parallel yaratilmoqda "
+                        f"(bir vaqtda {self.max_concurrency} ta)...")
+            try:
+                section_texts = await gather_limited(section_jobs, self.max_concurrency)
+            except BaseException:
+                references_task.cancel()
+                raise
+
+            introduction_text, conclusion_text, *chapter_texts = section_texts
+            chapter_texts = iter(chapter_texts)
+            for chapter in chapters:
+                for section in chapter['sections']:
+                    section['content'] = next(chapter_texts)
 
             # =============================================
-            # STEP 5: Generate references
+            # STEP 4: Adabiyotlar (allaqachon parallel ketmoqda)
             # =============================================
-            logger.info("Step 5: Adabiyotlar yaratilmoqda...")
-            references = await self._generate_references_ai(
-                topic, subject, language, lang_instructions, structure['min_references']
-            )
+            references = await references_task
+            logger.info(timer.summary())
 
             # =============================================
             # COMBINE everything into final structure
@@ -203,10 +247,12 @@ class CourseWorkGenerator:
 
     async def _generate_outline(
             self, work_type: str, topic: str, subject: str, details: str,
-            page_count: int, language: str, structure: Dict
+            page_count: int, language: str, structure: Dict,
+            progress: Optional[TokenProgress] = None, use_cache: bool = True
     ) -> Dict:
         """
         Step 1: Ish strukturasini (outline) yaratish
+        Bir xil mavzu/fan/hajm uchun outline llm_cache'dan olinadi
         Returns: dict with chapters, sections, abstract, keywords
         """
         lang_instructions = self._get_language_instructions(language)
@@ -262,7 +308,10 @@ MUHIM:
 """
 
         try:
-            response = await self.client.chat.completions.create(
+            raw = await complete_chat(
+                self.client,
+                progress,
+                cache=use_cache,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -280,7 +329,7 @@ MUHIM:
                 response_format={"type": "json_object"}
             )
 
-            outline = json.loads(response.choices[0].message.content)
+            outline = json.loads(raw)
             logger.info(f"Outline yaratildi: {len(outline.get('chapters', []))} bob")
             return outline
 
@@ -300,7 +349,8 @@ MUHIM:
             lang_instructions: str,
             min_words: int = 800,
             chapter_title: Optional[str] = None,
-            section_number: Optional[str] = None
+            section_number: Optional[str] = None,
+            progress: Optional[TokenProgress] = None
     ) -> str:
         """
         Bitta bo'lim uchun batafsil content yaratish
@@ -382,7 +432,9 @@ IMPORTANT RULES:
             }
             system_content = system_prompts.get(language, system_prompts['uz'])
 
-            response = await self.client.chat.completions.create(
+            text = await complete_chat(
+                self.client,
+                progress,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -395,7 +447,7 @@ IMPORTANT RULES:
                 temperature=0.7
             )
 
-            text = response.choices[0].message.content.strip()
+            text = text.strip()
 
             # Clean up any markdown or formatting artifacts
             text = self._clean_generated_text(text)
@@ -411,7 +463,8 @@ IMPORTANT RULES:
 
     async def _generate_references_ai(
             self, topic: str, subject: str, language: str,
-            lang_instructions: str, min_count: int
+            lang_instructions: str, min_count: int,
+            progress: Optional[TokenProgress] = None
     ) -> List[str]:
         """
         Step 5: AI bilan adabiyotlar ro'yxatini yaratish
@@ -460,7 +513,9 @@ Write ONLY the list, no extra text."""
         }
 
         try:
-            response = await self.client.chat.completions.create(
+            text = await complete_chat(
+                self.client,
+                progress,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -473,7 +528,7 @@ Write ONLY the list, no extra text."""
                 temperature=0.7
             )
 
-            text = response.choices[0].message.content.strip()
+            text = text.strip()
             # Parse references from text
             references = []
             for line in text.split('\n'):
@@ -0,0 +1,53 @@
+# async_database.py: Database metodlarini event loop'ni bloklamasdan chaqirish
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# SQLite yozuvlari baribir ketma-ket bajariladi, shuning uchun kichik pul yetarli.
+# Har bir thread o'z ulanishini ConnectionPool'dan oladi.
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="db")
+
+
+class AsyncDatabase:
+    """
+    Istalgan Database (UserDatabase, ChannelDatabase, ...) uchun async fasad.
+
+    Sinxron obyektning barcha metodlari bir xil nom va argumentlar bilan
+    korutin sifatida mavjud va DB thread pool'ida bajariladi:
+
+        user_db_async = AsyncDatabase(user_db)
+        balance = await user_db_async.get_user_balance(telegram_id)
+
+    Sinxron API o'zgarmaydi (`.sync` orqali ham olish mumkin), shuning uchun
+    handler'larni bosqichma-bosqich ko'chirish mumkin.
+    """
+
+    def __init__(self, db, executor: ThreadPoolExecutor = None):
+        self._db = db
+        self._executor = executor or DB_EXECUTOR
+        self._methods = {}
+
+    @property
+    def sync(self):
+        return self._db
+
+    async def run(self, func, *args, **kwargs):
+        """Ixtiyoriy sinxron funksiyani DB thread'ida bajarish"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name):
+        method = self._methods.get(name)
+        if method is not None:
+            return method
+
+        attr = getattr(self._db, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        self._methods[name] = method
+        return method
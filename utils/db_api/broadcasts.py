@@ -0,0 +1,105 @@
+# broadcasts.py: Reklama (broadcast) jarayonlari - restart'dan keyin davom ettirish uchun
+import json
+from typing import Dict, List, Optional
+
+from .database import Database
+
+# Qayta ishga tushganda davom ettiriladigan statuslar
+ACTIVE_STATUSES = ('scheduled', 'running', 'paused')
+
+
+class BroadcastDatabase(Database):
+    def create_table_broadcasts(self):
+        """Broadcast jarayonlari jadvali"""
+        sql = """
+        CREATE TABLE IF NOT EXISTS Broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            creator_id BIGINT NOT NULL,
+            ad_type VARCHAR(50) NOT NULL,
+            payload TEXT NOT NULL,
+            send_time DATETIME NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'scheduled',
+            cursor INTEGER NOT NULL DEFAULT 0,
+            total_users INTEGER NOT NULL DEFAULT 0,
+            sent_count INTEGER NOT NULL DEFAULT 0,
+            failed_count INTEGER NOT NULL DEFAULT 0,
+            blocked_count INTEGER NOT NULL DEFAULT 0,
+            throughput REAL NOT NULL DEFAULT 0,
+            status_message_id INTEGER NULL,
+            started_at DATETIME NULL,
+            finished_at DATETIME NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME NULL
+        );
+        """
+        self.execute(sql, commit=True)
+        self.execute("CREATE INDEX IF NOT EXISTS idx_broadcasts_status ON Broadcasts(status);", commit=True)
+
+    def create_broadcast(self, creator_id: int, ad_type: str, payload: dict, send_time: str = None) -> Optional[int]:
+        """Yangi broadcast; payload - xabar va klaviatura (JSON)"""
+        result = self.execute(
+            """INSERT INTO Broadcasts (creator_id, ad_type, payload, send_time)
+               VALUES (?, ?, ?, ?) RETURNING id""",
+            parameters=(creator_id, ad_type, json.dumps(payload, ensure_ascii=False), send_time),
+            fetchone=True,
+            commit=True
+        )
+        return result[0] if result else None
+
+    def start_broadcast(self, broadcast_id: int, status: str, total_users: int, status_message_id: int = None):
+        """Yuborish boshlandi (yoki restart'dan keyin davom etdi)"""
+        self.execute(
+            """UPDATE Broadcasts SET status = ?, total_users = ?, status_message_id = ?,
+                      started_at = COALESCE(started_at, CURRENT_TIMESTAMP), updated_at = CURRENT_TIMESTAMP
+               WHERE id = ?""",
+            parameters=(status, total_users, status_message_id, broadcast_id),
+            commit=True
+        )
+
+    def checkpoint_broadcast(self, broadcast_id: int, cursor: int, sent_count: int, failed_count: int,
+                             blocked_count: int, throughput: float):
+        """Checkpoint: Users.id <= cursor bo'lgan hamma qabul qiluvchilar ishlangan"""
+        self.execute(
+            """UPDATE Broadcasts SET cursor = ?, sent_count = ?, failed_count = ?, blocked_count = ?,
+                      throughput = ?, updated_at = CURRENT_TIMESTAMP
+               WHERE id = ?""",
+            parameters=(cursor, sent_count, failed_count, blocked_count, throughput, broadcast_id),
+            commit=True
+        )
+
+    def set_broadcast_status(self, broadcast_id: int, status: str):
+        finished = status not in ACTIVE_STATUSES
+        self.execute(
+            f"""UPDATE Broadcasts SET status = ?, updated_at = CURRENT_TIMESTAMP
+                {', finished_at = CURRENT_TIMESTAMP' if finished else ''}
+                WHERE id = ?""",
+            parameters=(status, broadcast_id),
+            commit=True
+        )
+
+    def get_unfinished_broadcasts(self) -> List[Dict]:
+        """Tugallanmagan (scheduled/running/paused) broadcast'lar"""
+        result = self.execute(
+            f"""SELECT id, creator_id, ad_type, payload, send_time, status, cursor,
+                       sent_count, failed_count, blocked_count, status_message_id
+                FROM Broadcasts WHERE status IN ({', '.join('?' * len(ACTIVE_STATUSES))})
+                ORDER BY id""",
+            parameters=ACTIVE_STATUSES,
+            fetchall=True
+        ) or []
+        return [
+            {
+                'id': row[0],
+                'creator_id': row[1],
+                'ad_type': row[2],
+                'payload': json.loads(row[3]),
+                'send_time': row[4],
+                'status': row[5],
+                'cursor': row[6],
+                'sent_count': row[7],
+                'failed_count': row[8],
+                'blocked_count': row[9],
+                'status_message_id': row[10],
+            }
+            for row in result
+        ]
@@ -3,11 +3,32 @@
 
 from .database import Database
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Faol kanallar ro'yxati har bir update'da o'qiladi - xotirada saqlanadi.
+# Shu obyekt orqali yozilganda kesh darhol eskiradi; TTL faqat bazani
+# boshqa process o'zgartirgan holat uchun
+CHANNELS_CACHE_TTL = float(os.getenv("CHANNELS_CACHE_TTL", "60"))
+
 
 class ChannelDatabase(Database):
+    def __init__(self, path_to_db="main.db", cache_ttl: float = CHANNELS_CACHE_TTL):
+        super().__init__(path_to_db)
+        self.cache_ttl = cache_ttl
+        self._channels = None
+        self._channels_loaded_at = 0.0
+        self._channels_version = 0
+        self._cache_lock = threading.Lock()
+
+    def invalidate_channels_cache(self):
+        """Kanallar keshini eskirtirish - keyingi get_all_channels bazadan o'qiydi"""
+        with self._cache_lock:
+            self._channels = None
+            self._channels_version += 1
 
     def create_table_channels(self):
         """Kanallar jadvalini yaratish"""
@@ -43,6 +64,7 @@ class ChannelDatabase(Database):
             VALUES (?, ?, ?)
             """
             self.execute(sql, parameters=(channel_id, title, invite_link), commit=True)
+            self.invalidate_channels_cache()
             logger.info(f"✅ Kanal qo'shildi: {title} ({channel_id})")
             return True
 
@@ -70,6 +92,7 @@ class ChannelDatabase(Database):
             params.append(channel_id)
             sql = f"UPDATE Channels SET {', '.join(updates)} WHERE channel_id = ?"
             self.execute(sql, parameters=tuple(params), commit=True)
+            self.invalidate_channels_cache()
             logger.info(f"✅ Kanal yangilandi: {channel_id}")
             return True
 
@@ -82,6 +105,7 @@ class ChannelDatabase(Database):
         try:
             sql = "DELETE FROM Channels WHERE channel_id = ?"
             self.execute(sql, parameters=(channel_id,), commit=True)
+            self.invalidate_channels_cache()
             logger.info(f"✅ Kanal o'chirildi: {channel_id}")
             return True
         except Exception as e:
@@ -89,15 +113,27 @@ class ChannelDatabase(Database):
             return False
 
     def get_all_channels(self) -> list:
-        """Barcha faol kanallar"""
+        """Barcha faol kanallar (keshdan, CHANNELS_CACHE_TTL gacha)"""
+        with self._cache_lock:
+            if self._channels is not None and time.monotonic() - self._channels_loaded_at < self.cache_ttl:
+                return list(self._channels)
+            version = self._channels_version
+
         try:
             sql = "SELECT * FROM Channels WHERE is_active = TRUE OR is_active = 1"
             result = self.execute(sql, fetchall=True)
-            return result if result else []
+            channels = result if result else []
         except Exception as e:
             logger.error(f"❌ Kanallarni olishda xato: {e}")
             return []
 
+        with self._cache_lock:
+            # O'qish paytida yozuv bo'lgan bo'lsa eski natija keshga tushmasin
+            if version == self._channels_version:
+                self._channels = tuple(channels)
+                self._channels_loaded_at = time.monotonic()
+        return list(channels)
+
     def get_channel_by_id(self, channel_id: int):
         """Kanal ID bo'yicha olish"""
         try:
@@ -145,6 +181,7 @@ class ChannelDatabase(Database):
         try:
             sql = "UPDATE Channels SET is_active = FALSE WHERE channel_id = ?"
             self.execute(sql, parameters=(channel_id,), commit=True)
+            self.invalidate_channels_cache()
             return True
         except Exception as e:
             logger.error(f"❌ Deaktiv qilishda xato: {e}")
@@ -155,6 +192,7 @@ class ChannelDatabase(Database):
         try:
             sql = "UPDATE Channels SET is_active = TRUE WHERE channel_id = ?"
             self.execute(sql, parameters=(channel_id,), commit=True)
+            self.invalidate_channels_cache()
             return True
         except Exception as e:
             logger.error(f"❌ Aktiv qilishda xato: {e}")
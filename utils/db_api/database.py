@@ -1,46 +1,139 @@
 # database.py: Umumiy ma'lumotlar bazasi bilan bog'lanish va "execute" funksiyasi
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
-def logger(statement):
-    print(f"""
-_____________________________________________________        
-Executing: 
-{statement}
-_____________________________________________________
-""")
+from .instrumentation import query_stats
+
+
+# Har bir ulanish ochilganda bajariladigan sozlamalar
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",        # o'qish va yozish bir-birini bloklamaydi
+    "PRAGMA synchronous = NORMAL",      # WAL rejimida xavfsiz, har commit'da fsync yo'q
+    "PRAGMA cache_size = -16000",       # ~16 MB sahifa keshi
+    "PRAGMA busy_timeout = 5000",       # qulf bo'lsa 5 soniyagacha kutish
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class ConnectionPool:
+    """
+    SQLite ulanishlar puli - har bir thread uchun bitta doimiy ulanish.
+
+    sqlite3 ulanishi bir vaqtda bitta thread'da ishlatilishi kerak,
+    shuning uchun ulanishlar thread-local saqlanadi va fayl yo'li bo'yicha
+    ajratiladi. Bir xil faylga ulangan barcha Database obyektlari
+    (UserDatabase, ChannelDatabase, ...) bitta ulanishni bo'lishadi.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def get(self, path: str) -> sqlite3.Connection:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+
+        connection = connections.get(path)
+        if connection is None:
+            # check_same_thread=False - ulanish faqat shu thread'da ishlatiladi, lekin
+            # close_all() uni shutdown'da boshqa thread'dan (DB_EXECUTOR'niki ham) yopa oladi
+            connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            for pragma in CONNECTION_PRAGMAS:
+                connection.execute(pragma)
+            connections[path] = connection
+            with self._lock:
+                self._all.append(connection)
+        return connection
+
+    def close_all(self):
+        """Barcha thread'lardagi ulanishlarni yopish (shutdown uchun)"""
+        with self._lock:
+            connections, self._all = self._all, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+pool = ConnectionPool()
+
 
 class Database:
     def __init__(self, path_to_db="main.db"):
         self.path_to_db = path_to_db
+        self._pool_key = os.path.abspath(path_to_db)
 
     @property
     def connection(self):
-        return sqlite3.connect(self.path_to_db)
+        return pool.get(self._pool_key)
 
     def execute(self, sql: str, parameters: tuple = None, fetchone=False, fetchall=False, commit=False):
         if not parameters:
             parameters = ()
         connection = self.connection
-        connection.set_trace_callback(logger)
         cursor = connection.cursor()
         data = None
+        error = False
+        started = time.perf_counter()
         try:
             cursor.execute(sql, parameters)
-            if commit:
-                connection.commit()
+            # Natija commit'dan oldin o'qiladi - UPDATE ... RETURNING qatorlari
+            # statement oxirigacha bajarilgandagina yozuv yakunlanadi
             if fetchall:
                 data = cursor.fetchall()
             if fetchone:
                 data = cursor.fetchone()
+            if commit:
+                connection.commit()
         except sqlite3.Error as e:
+            error = True
             print(f"SQLite error: {e}")
             connection.rollback()
         finally:
-            connection.close()
+            query_stats.record(sql, (time.perf_counter() - started) * 1000, error=error)
+            cursor.close()
+            # Ulanish yopilmaydi, shuning uchun commit qilinmagan
+            # o'zgarishlar avvalgidek bekor qilinadi
+            if connection.in_transaction:
+                connection.rollback()
         return data
 
+    @contextmanager
+    def transaction(self):
+        """
+        Bir nechta so'rovni bitta tranzaksiyada bajarish:
+
+            with db.transaction() as cursor:
+                cursor.execute(...)
+                cursor.execute(...)
+
+        Xato bo'lsa hammasi bekor qilinadi. Ichkarida self.execute(commit=True)
+        chaqirmang - u tranzaksiyani muddatidan oldin yakunlaydi.
+        """
+        connection = self.connection
+        if connection.in_transaction:
+            connection.rollback()
+        cursor = connection.cursor()
+        started = time.perf_counter()
+        error = False
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            yield cursor
+            connection.commit()
+        except BaseException:
+            error = True
+            connection.rollback()
+            raise
+        finally:
+            query_stats.record("TRANSACTION", (time.perf_counter() - started) * 1000, error=error)
+            cursor.close()
+
     @staticmethod
     def format_args(sql, parameters: dict):
         sql += " AND ".join([f"{item} = ?" for item in parameters])
-        return sql, tuple(parameters.values())
\ No newline at end of file
+        return sql, tuple(parameters.values())
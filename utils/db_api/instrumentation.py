@@ -0,0 +1,86 @@
+# instrumentation.py: SQL so'rovlar statistikasi (trace callback o'rniga)
+import functools
+import logging
+import os
+import random
+import re
+import time
+from collections import deque
+from typing import Dict
+
+from utils.misc.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+# SQLite so'rovlari asosan millisekunddan tez, shuning uchun mayda chegaralar
+QUERY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """SQL matnidan shablon yasash: bo'shliqlar siqiladi, literal'lar '?' bilan almashtiriladi"""
+    template = _STRING_RE.sub("?", sql)
+    template = _NUMBER_RE.sub("?", template)
+    template = _WHITESPACE_RE.sub(" ", template).strip()
+    return template[:300]
+
+
+class QueryInstrumentation:
+    """
+    Database.execute uchun o'lchovlar:
+    - so'rov shabloni bo'yicha hisoblagichlar va latency gistogrammasi
+    - sekin so'rovlar logi (threshold'dan oshganlari har doim yoziladi)
+    - ixtiyoriy sampling (DB_QUERY_SAMPLE_RATE=0.1 - har 10-so'rov hisobga olinadi)
+    """
+
+    def __init__(self, sample_rate: float = 1.0, slow_query_ms: float = 200.0, slow_log_size: int = 50):
+        self.sample_rate = sample_rate
+        self.slow_query_ms = slow_query_ms
+        self.stats = LatencyStats(buckets=QUERY_BUCKETS_MS)
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.started_at = time.time()
+
+    def record(self, sql: str, elapsed_ms: float, error: bool = False):
+        is_slow = elapsed_ms >= self.slow_query_ms
+        if not is_slow and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+
+        template = normalize_sql(sql)
+        self.stats.record(template, elapsed_ms, error=error)
+
+        if is_slow:
+            self.slow_queries.append({
+                'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'elapsed_ms': round(elapsed_ms, 3),
+                'query': template,
+            })
+            logger.warning(f"🐢 Sekin so'rov ({elapsed_ms:.1f} ms): {template[:150]}")
+
+    def snapshot(self, top: int = 10) -> Dict:
+        queries = self.stats.snapshot()
+        total = sum(entry['count'] for entry in queries.values())
+        return {
+            'uptime_seconds': int(time.time() - self.started_at),
+            'sample_rate': self.sample_rate,
+            'slow_query_ms': self.slow_query_ms,
+            'sampled_queries': total,
+            'estimated_queries': int(total / self.sample_rate) if self.sample_rate else total,
+            'templates': len(queries),
+            'top_by_total_time': [dict(entry, query=query) for query, entry in self.stats.top(top)],
+            'slow_queries': list(self.slow_queries),
+        }
+
+    def reset(self):
+        self.stats.reset()
+        self.slow_queries.clear()
+        self.started_at = time.time()
+
+
+query_stats = QueryInstrumentation(
+    sample_rate=float(os.getenv("DB_QUERY_SAMPLE_RATE", "1.0")),
+    slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS", "200")),
+)
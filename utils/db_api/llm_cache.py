@@ -0,0 +1,125 @@
+# llm_cache.py: AI javoblari keshi - kalit (so'rov hash'i) bo'yicha, hajm cheklangan LRU
+import time
+from typing import Dict, Optional
+
+from .database import Database
+
+# Kesh hajmi (bayt) bitta qatorda - har yozuvda SUM(size) bilan butun jadvalni o'qimaslik uchun
+LLM_CACHE_META_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS LLMCacheMeta (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_bytes INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO LLMCacheMeta (id, total_bytes) VALUES (1, (SELECT COALESCE(SUM(size), 0) FROM LLMCache))",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_llm_cache_insert AFTER INSERT ON LLMCache
+    BEGIN
+        UPDATE LLMCacheMeta SET total_bytes = total_bytes + NEW.size WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_llm_cache_update AFTER UPDATE OF size ON LLMCache
+    BEGIN
+        UPDATE LLMCacheMeta SET total_bytes = total_bytes + NEW.size - OLD.size WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_llm_cache_delete AFTER DELETE ON LLMCache
+    BEGIN
+        UPDATE LLMCacheMeta SET total_bytes = total_bytes - OLD.size WHERE id = 1;
+    END
+    """,
+)
+
+# Eviction'da bir so'rovda o'qiladigan eng eski yozuvlar soni
+EVICTION_BATCH = 100
+
+
+class LLMCacheDatabase(Database):
+    def __init__(self, path_to_db="main.db", max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(path_to_db)
+        self.max_bytes = max_bytes
+
+    def create_table_llm_cache(self):
+        """AI javoblari keshi jadvali"""
+        sql = """
+        CREATE TABLE IF NOT EXISTS LLMCache (
+            key TEXT PRIMARY KEY,                  -- sha256(model + normallashgan so'rov + parametrlar)
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,                 -- javob hajmi (bayt)
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_used_at REAL NOT NULL             -- LRU tartibi (unix vaqt)
+        );
+        """
+        self.execute(sql, commit=True)
+        self.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON LLMCache(last_used_at);", commit=True)
+        with self.transaction() as cursor:
+            for sql in LLM_CACHE_META_SCHEMA:
+                cursor.execute(sql)
+
+    def get_llm_response(self, key: str) -> Optional[str]:
+        """
+        Keshdagi javob (topilsa LRU vaqti va hits yangilanadi).
+        execute() dan farqli, sqlite3 xatolari (jadval yo'q, DB band) yutilmaydi -
+        chaqiruvchi ularni miss emas, xato deb hisoblaydi.
+        """
+        with self.transaction() as cursor:
+            cursor.execute(
+                """UPDATE LLMCache SET hits = hits + 1, last_used_at = ?
+                   WHERE key = ?
+                   RETURNING response""",
+                (time.time(), key)
+            )
+            result = cursor.fetchone()
+        return result[0] if result else None
+
+    def put_llm_response(self, key: str, model: str, response: str) -> int:
+        """
+        Javobni saqlash va kesh max_bytes dan oshsa eng uzoq ishlatilmaganlarini
+        o'chirish. O'chirilgan yozuvlar sonini qaytaradi.
+        """
+        size = len(response.encode('utf-8'))
+        with self.transaction() as cursor:
+            cursor.execute(
+                """INSERT INTO LLMCache (key, model, response, size, last_used_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET
+                       response = excluded.response, size = excluded.size,
+                       last_used_at = excluded.last_used_at""",
+                (key, model, response, size, time.time())
+            )
+            total = cursor.execute("SELECT total_bytes FROM LLMCacheMeta WHERE id = 1").fetchone()[0]
+            evicted = 0
+            # Eng uzoq ishlatilmaganlari (last_used_at indeksi bo'yicha) hajm chegaraga tushguncha
+            while total > self.max_bytes:
+                oldest = cursor.execute(
+                    "SELECT key, size FROM LLMCache WHERE key != ? ORDER BY last_used_at LIMIT ?",
+                    (key, EVICTION_BATCH)
+                ).fetchall()
+                if not oldest:
+                    break
+                victims = []
+                for victim_key, victim_size in oldest:
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((victim_key,))
+                    total -= victim_size
+                cursor.executemany("DELETE FROM LLMCache WHERE key = ?", victims)
+                evicted += len(victims)
+            return evicted
+
+    def get_llm_cache_stats(self) -> Dict:
+        """Yozuvlar soni, umumiy hajm va jami hit'lar"""
+        result = self.execute(
+            """SELECT COUNT(*), (SELECT total_bytes FROM LLMCacheMeta WHERE id = 1), COALESCE(SUM(hits), 0)
+               FROM LLMCache""",
+            fetchone=True
+        )
+        return {'entries': result[0], 'bytes': result[1] or 0, 'max_bytes': self.max_bytes, 'total_hits': result[2]}
+
+    def clear_llm_cache(self):
+        self.execute("DELETE FROM LLMCache", commit=True)
@@ -0,0 +1,71 @@
+# migrations.py: jadvallar va ustun migratsiyalari - bot (app.py) ham, alohida
+# worker.py ham ishga tushishda chaqiradi, qaysi biri birinchi kelishidan qat'i nazar
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Eski DB'larga qo'shiladigan ustunlar: name - ustun nomi, table - jadval
+MIGRATIONS = [
+    {
+        'name': 'free_presentations',
+        'table': 'Users',
+        'sql': 'ALTER TABLE Users ADD COLUMN free_presentations INTEGER DEFAULT 0'
+    },
+    {
+        'name': 'worker_id',
+        'table': 'PresentationTasks',
+        'sql': 'ALTER TABLE PresentationTasks ADD COLUMN worker_id VARCHAR(100) NULL'
+    },
+    {
+        'name': 'attempts',
+        'table': 'PresentationTasks',
+        'sql': 'ALTER TABLE PresentationTasks ADD COLUMN attempts INTEGER DEFAULT 0'
+    },
+    {
+        'name': 'heartbeat_at',
+        'table': 'PresentationTasks',
+        'sql': 'ALTER TABLE PresentationTasks ADD COLUMN heartbeat_at DATETIME NULL'
+    },
+    {
+        'name': 'lease_expires_at',
+        'table': 'PresentationTasks',
+        'sql': 'ALTER TABLE PresentationTasks ADD COLUMN lease_expires_at DATETIME NULL'
+    },
+    {
+        'name': 'queue_message_id',
+        'table': 'PresentationTasks',
+        'sql': 'ALTER TABLE PresentationTasks ADD COLUMN queue_message_id INTEGER NULL'
+    },
+]
+
+
+def create_tables(user_db, broadcast_db):
+    """Asosiy jadvallar (data/user.db)"""
+    user_db.create_table_users()
+    user_db.create_table_transactions()
+    user_db.create_table_pricing()
+    user_db.create_table_presentation_tasks()
+    user_db.create_business_plans_table()
+    broadcast_db.create_table_broadcasts()
+
+
+def run_migrations(user_db):
+    """Yetishmayotgan ustunlar, so'ng ularga tayanadigan indeks va statistika jadvallari"""
+    logger.info("🔄 Database migratsiyalar tekshirilmoqda...")
+
+    for migration in MIGRATIONS:
+        try:
+            check_sql = f"PRAGMA table_info({migration['table']})"
+            columns = user_db.execute(check_sql, fetchall=True)
+            column_names = [col[1] for col in columns]
+
+            if migration['name'] not in column_names:
+                user_db.execute(migration['sql'], commit=True)
+                logger.info(f"✅ Migration qo'shildi: {migration['name']}")
+            else:
+                logger.info(f"ℹ️ Migration mavjud: {migration['name']}")
+        except Exception as e:
+            logger.error(f"❌ Migration xato ({migration['name']}): {e}")
+
+    user_db.create_task_lease_index()
+    user_db.create_stats_rollups()
@@ -1,11 +1,218 @@
 from .database import Database
+import os
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 import pytz
 
+from utils.task_events import notify_task_created
+
 TASHKENT_TZ = pytz.timezone('Asia/Tashkent')
 
+# Narxlar xotirada saqlanadi. Shu process'da update_price keshni darhol
+# yangilaydi; boshqa process'lar (worker) PricingVersion'ni shu oraliqda
+# bitta qatorli so'rov bilan tekshiradi va faqat versiya o'zgarsa qayta o'qiydi
+PRICING_CACHE_TTL = float(os.getenv("PRICING_CACHE_TTL", "30"))
+
+# Pricing'dagi har qanday o'zgarish versiyani oshiradi
+PRICING_VERSION_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS PricingVersion (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO PricingVersion (id, version) VALUES (1, 0)",
+) + tuple(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_pricing_version_{event.lower()} AFTER {event} ON Pricing
+    BEGIN
+        UPDATE PricingVersion SET version = version + 1 WHERE id = 1;
+    END
+    """
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+)
+
+# Bazada vaqt UTC'da saqlanadi, kunlik rollup'lar esa Toshkent kuni bo'yicha
+# (UTC+5, yozgi vaqt yo'q) - date(created_at, '+5 hours')
+TASHKENT_DAY_SQL = "date({column}, '+5 hours')"
+
+# Users.created_at ikki formatda yoziladi ('2024-01-01T10:00:00.123' va
+# '2024-01-01 10:00:00'), shuning uchun taqqoslash datetime() orqali - bu ifoda
+# bo'yicha indeks bor (idx_users_created_dt), so'rovlar indeks oralig'ini o'qiydi
+USER_CREATED_SQL = "datetime({column})"
+USER_HOUR_SQL = "strftime('%Y-%m-%d %H:00:00', {column})"
+
+# Statistika rollup jadvallari va ularni yangilab turuvchi trigger'lar.
+# Har bir INSERT/UPDATE/DELETE o'z qatoriga +/- delta qo'shadi, shuning uchun
+# admin panel Users/Transactions hajmidan qat'i nazar bir necha qatorni o'qiydi.
+STATS_ROLLUP_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS StatsDailyTransactions (
+        day DATE NOT NULL,
+        transaction_type VARCHAR(50) NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        tx_count INTEGER NOT NULL DEFAULT 0,
+        amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, transaction_type, status)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS StatsDailyTasks (
+        day DATE NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        task_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, status)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS StatsUserTotals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_users INTEGER NOT NULL DEFAULT 0,
+        users_with_balance INTEGER NOT NULL DEFAULT 0,
+        total_balance DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        positive_balance DECIMAL(14, 2) NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_users_balance ON Users(balance)",
+    """
+    CREATE TABLE IF NOT EXISTS StatsUserGrowth (
+        hour DATETIME NOT NULL PRIMARY KEY,
+        user_count INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_users_created_dt ON Users({USER_CREATED_SQL.format(column='created_at')})",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_created ON Transactions(transaction_type, status, created_at)",
+)
+
+_TX_ADD = """
+        INSERT INTO StatsDailyTransactions (day, transaction_type, status, tx_count, amount)
+        VALUES ({day}, {row}.transaction_type, COALESCE({row}.status, 'pending'), {sign}1, {sign}COALESCE({row}.amount, 0))
+        ON CONFLICT (day, transaction_type, status) DO UPDATE SET
+            tx_count = tx_count + excluded.tx_count,
+            amount = amount + excluded.amount;
+"""
+
+_TASK_ADD = """
+        INSERT INTO StatsDailyTasks (day, status, task_count)
+        VALUES ({day}, COALESCE({row}.status, 'pending'), {sign}1)
+        ON CONFLICT (day, status) DO UPDATE SET task_count = task_count + excluded.task_count;
+"""
+
+_GROWTH_ADD = """
+        INSERT INTO StatsUserGrowth (hour, user_count)
+        VALUES ({hour}, {sign}1)
+        ON CONFLICT (hour) DO UPDATE SET user_count = user_count + excluded.user_count;
+"""
+
+_USER_DELTA = """
+        UPDATE StatsUserTotals SET
+            total_users = total_users + {users},
+            users_with_balance = users_with_balance {with_balance},
+            total_balance = total_balance {total_balance},
+            positive_balance = positive_balance {positive_balance}
+        WHERE id = 1;
+"""
+
+
+def _tx_add(row: str, sign: str = "") -> str:
+    return _TX_ADD.format(day=TASHKENT_DAY_SQL.format(column=f"{row}.created_at"), row=row, sign=sign)
+
+
+def _task_add(row: str, sign: str = "") -> str:
+    return _TASK_ADD.format(day=TASHKENT_DAY_SQL.format(column=f"{row}.created_at"), row=row, sign=sign)
+
+
+def _growth_add(row: str, sign: str = "") -> str:
+    return _GROWTH_ADD.format(hour=USER_HOUR_SQL.format(column=f"{row}.created_at"), sign=sign)
+
+
+def _user_delta(old: Optional[str], new: Optional[str]) -> str:
+    def terms(expression):
+        parts = []
+        if new:
+            parts.append(f"+ {expression.format(row=new)}")
+        if old:
+            parts.append(f"- {expression.format(row=old)}")
+        return " ".join(parts)
+
+    users = {(None, 'NEW'): "1", ('OLD', None): "-1"}.get((old, new), "0")
+    return _USER_DELTA.format(
+        users=users,
+        with_balance=terms("(COALESCE({row}.balance, 0) > 0)"),
+        total_balance=terms("COALESCE({row}.balance, 0)"),
+        positive_balance=terms("MAX(COALESCE({row}.balance, 0), 0)"),
+    )
+
+
+STATS_ROLLUP_TRIGGERS = {
+    'trg_stats_tx_insert': f"""
+        CREATE TRIGGER trg_stats_tx_insert AFTER INSERT ON Transactions
+        BEGIN {_tx_add('NEW')} END
+    """,
+    'trg_stats_tx_update': f"""
+        CREATE TRIGGER trg_stats_tx_update
+        AFTER UPDATE OF status, amount, transaction_type, created_at ON Transactions
+        BEGIN {_tx_add('OLD', '-')} {_tx_add('NEW')} END
+    """,
+    'trg_stats_tx_delete': f"""
+        CREATE TRIGGER trg_stats_tx_delete AFTER DELETE ON Transactions
+        BEGIN {_tx_add('OLD', '-')} END
+    """,
+    'trg_stats_task_insert': f"""
+        CREATE TRIGGER trg_stats_task_insert AFTER INSERT ON PresentationTasks
+        BEGIN {_task_add('NEW')} END
+    """,
+    # progress har bir qadamda yangilanadi - faqat status o'zgarganda ishlaydi
+    'trg_stats_task_update': f"""
+        CREATE TRIGGER trg_stats_task_update AFTER UPDATE OF status, created_at ON PresentationTasks
+        WHEN OLD.status IS NOT NEW.status OR OLD.created_at IS NOT NEW.created_at
+        BEGIN {_task_add('OLD', '-')} {_task_add('NEW')} END
+    """,
+    'trg_stats_task_delete': f"""
+        CREATE TRIGGER trg_stats_task_delete AFTER DELETE ON PresentationTasks
+        BEGIN {_task_add('OLD', '-')} END
+    """,
+    'trg_stats_user_insert': f"""
+        CREATE TRIGGER trg_stats_user_insert AFTER INSERT ON Users
+        BEGIN {_user_delta(None, 'NEW')} END
+    """,
+    'trg_stats_growth_insert': f"""
+        CREATE TRIGGER trg_stats_growth_insert AFTER INSERT ON Users
+        BEGIN {_growth_add('NEW')} END
+    """,
+    'trg_stats_growth_update': f"""
+        CREATE TRIGGER trg_stats_growth_update AFTER UPDATE OF created_at ON Users
+        WHEN OLD.created_at IS NOT NEW.created_at
+        BEGIN {_growth_add('OLD', '-')} {_growth_add('NEW')} END
+    """,
+    'trg_stats_growth_delete': f"""
+        CREATE TRIGGER trg_stats_growth_delete AFTER DELETE ON Users
+        BEGIN {_growth_add('OLD', '-')} END
+    """,
+    # last_active kabi tez-tez yangilanadigan ustunlar trigger'ni ishga tushirmaydi
+    'trg_stats_user_update': f"""
+        CREATE TRIGGER trg_stats_user_update AFTER UPDATE OF balance ON Users
+        WHEN OLD.balance IS NOT NEW.balance
+        BEGIN {_user_delta('OLD', 'NEW')} END
+    """,
+    'trg_stats_user_delete': f"""
+        CREATE TRIGGER trg_stats_user_delete AFTER DELETE ON Users
+        BEGIN {_user_delta('OLD', None)} END
+    """,
+}
+
+
 class UserDatabase(Database):
+    def __init__(self, path_to_db="main.db", pricing_cache_ttl: float = PRICING_CACHE_TTL):
+        super().__init__(path_to_db)
+        self.pricing_cache_ttl = pricing_cache_ttl
+        self._prices = None
+        self._prices_version = None
+        self._prices_checked_at = 0.0
+        self._cache_lock = threading.Lock()
+
     def create_table_users(self):
         """Foydalanuvchilar jadvali"""
         sql_users = """
@@ -13,7 +220,7 @@ class UserDatabase(Database):
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             telegram_id BIGINT NOT NULL UNIQUE,
             username VARCHAR(255) NULL,
-            ALTER TABLE Users ADD COLUMN free_presentations INTEGER DEFAULT 0;
+            free_presentations INTEGER DEFAULT 0,
             balance DECIMAL(10, 2) DEFAULT 0.00,
             total_spent DECIMAL(10, 2) DEFAULT 0.00,
             total_deposited DECIMAL(10, 2) DEFAULT 0.00,
@@ -96,6 +303,11 @@ class UserDatabase(Database):
                 VALUES (?, ?, ?, ?, ?)
             """, parameters=(service, price, currency, desc, active), commit=True)
 
+        with self.transaction() as cursor:
+            for sql in PRICING_VERSION_SCHEMA:
+                cursor.execute(sql)
+        self.invalidate_pricing_cache()
+
     def create_table_presentation_tasks(self):
         """Prezentatsiya task'lari"""
         sql = """
@@ -111,6 +323,11 @@ class UserDatabase(Database):
             file_path TEXT NULL,
             error_message TEXT NULL,
             amount_charged DECIMAL(10, 2) NULL,
+            worker_id VARCHAR(100) NULL,
+            attempts INTEGER DEFAULT 0,
+            heartbeat_at DATETIME NULL,
+            lease_expires_at DATETIME NULL,
+            queue_message_id INTEGER NULL,
             started_at DATETIME NULL,
             completed_at DATETIME NULL,
             created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
@@ -122,6 +339,88 @@ class UserDatabase(Database):
         self.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON PresentationTasks(status);", commit=True)
         self.execute("CREATE INDEX IF NOT EXISTS idx_tasks_uuid ON PresentationTasks(task_uuid);", commit=True)
 
+    def create_task_lease_index(self):
+        """Lease ustunlari migratsiyadan keyin qo'shiladi, shuning uchun indeks alohida"""
+        self.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_lease ON PresentationTasks(status, lease_expires_at);",
+            commit=True
+        )
+
+    def create_stats_rollups(self):
+        """
+        Statistika rollup jadvallari va trigger'lari.
+
+        Trigger'lar birinchi marta yaratilganda jadvallar mavjud ma'lumotdan
+        to'ldiriladi (backfill). Keyin har bir yozuv rollup'ni o'zi yangilaydi.
+        """
+        existing = self.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_stats_%'",
+            fetchall=True
+        ) or []
+        existing = {row[0] for row in existing}
+        missing = [name for name in STATS_ROLLUP_TRIGGERS if name not in existing]
+
+        with self.transaction() as cursor:
+            for sql in STATS_ROLLUP_SCHEMA:
+                cursor.execute(sql)
+            for name in missing:
+                cursor.execute(STATS_ROLLUP_TRIGGERS[name])
+            if missing:
+                self._rebuild_stats_rollups(cursor)
+
+        if missing:
+            print(f"✅ Statistika rollup'lari qayta hisoblandi ({len(missing)} ta trigger yaratildi)")
+
+    def rebuild_stats_rollups(self) -> bool:
+        """Rollup'larni asosiy jadvallardan qaytadan hisoblash (ta'mirlash uchun)"""
+        try:
+            with self.transaction() as cursor:
+                self._rebuild_stats_rollups(cursor)
+            return True
+        except Exception as e:
+            print(f"❌ Rollup'larni qayta hisoblashda xato: {e}")
+            return False
+
+    @staticmethod
+    def _rebuild_stats_rollups(cursor):
+        tx_day = TASHKENT_DAY_SQL.format(column="created_at")
+        cursor.execute("DELETE FROM StatsDailyTransactions")
+        cursor.execute(f"""
+            INSERT INTO StatsDailyTransactions (day, transaction_type, status, tx_count, amount)
+            SELECT {tx_day}, transaction_type, COALESCE(status, 'pending'), COUNT(*), COALESCE(SUM(amount), 0)
+            FROM Transactions
+            GROUP BY 1, 2, 3
+        """)
+
+        cursor.execute("DELETE FROM StatsDailyTasks")
+        cursor.execute(f"""
+            INSERT INTO StatsDailyTasks (day, status, task_count)
+            SELECT {tx_day}, COALESCE(status, 'pending'), COUNT(*)
+            FROM PresentationTasks
+            GROUP BY 1, 2
+        """)
+
+        user_hour = USER_HOUR_SQL.format(column="created_at")
+        cursor.execute("DELETE FROM StatsUserGrowth")
+        cursor.execute(f"""
+            INSERT INTO StatsUserGrowth (hour, user_count)
+            SELECT {user_hour}, COUNT(*)
+            FROM Users
+            WHERE created_at IS NOT NULL
+            GROUP BY 1
+        """)
+
+        cursor.execute("DELETE FROM StatsUserTotals")
+        cursor.execute("""
+            INSERT INTO StatsUserTotals (id, total_users, users_with_balance, total_balance, positive_balance)
+            SELECT 1,
+                   COUNT(*),
+                   COALESCE(SUM(COALESCE(balance, 0) > 0), 0),
+                   COALESCE(SUM(COALESCE(balance, 0)), 0),
+                   COALESCE(SUM(MAX(COALESCE(balance, 0), 0)), 0)
+            FROM Users
+        """)
+
     # ==================== USER METHODLAR ====================
 
     # users_db.py ga qo'shish
@@ -413,10 +712,64 @@ class UserDatabase(Database):
 
     # ==================== PRICING METHODLAR ====================
 
+    def invalidate_pricing_cache(self):
+        """Narxlar keshini eskirtirish - keyingi o'qish bazadan"""
+        with self._cache_lock:
+            self._prices = None
+            self._prices_version = None
+
+    def _get_pricing_db_version(self) -> Optional[int]:
+        try:
+            result = self.execute("SELECT version FROM PricingVersion WHERE id = 1", fetchone=True)
+            return result[0] if result else None
+        except Exception:
+            # Eski baza (create_table_pricing hali chaqirilmagan) - har TTL'da qayta o'qiladi
+            return None
+
+    def _pricing(self) -> Dict[str, Dict]:
+        """service_type -> narx yozuvi; TTL o'tgan bo'lsa avval versiya tekshiriladi"""
+        with self._cache_lock:
+            prices, cached_version = self._prices, self._prices_version
+            if prices is not None and time.monotonic() - self._prices_checked_at < self.pricing_cache_ttl:
+                return prices
+
+        version = self._get_pricing_db_version()
+        if prices is not None and version is not None and version == cached_version:
+            with self._cache_lock:
+                self._prices_checked_at = time.monotonic()
+            return prices
+
+        # Versiya narxlardan oldin o'qiladi: oraliqda yozuv bo'lsa keyingi tekshiruv qayta yuklaydi
+        sql = "SELECT service_type, price, currency, description, is_active FROM Pricing ORDER BY service_type"
+        prices = {
+            row[0]: {
+                'service_type': row[0],
+                'price': float(row[1]),
+                'currency': row[2],
+                'description': row[3],
+                'is_active': bool(row[4])
+            }
+            for row in self.execute(sql, fetchall=True) or []
+        }
+        with self._cache_lock:
+            self._prices = prices
+            self._prices_version = version
+            self._prices_checked_at = time.monotonic()
+        return prices
+
+    def load_pricing_cache(self) -> int:
+        """Startup'da narxlarni xotiraga yuklash; narxlar sonini qaytaradi"""
+        self.invalidate_pricing_cache()
+        return len(self._pricing())
+
+    def get_pricing_version(self) -> Optional[int]:
+        """Kesh qaysi PricingVersion'dan yuklangan (worker'lar eskirganini aniqlashi uchun)"""
+        self._pricing()
+        return self._prices_version
+
     def get_price(self, service_type: str) -> Optional[float]:
-        sql = "SELECT price FROM Pricing WHERE service_type = ? AND is_active = TRUE"
-        result = self.execute(sql, parameters=(service_type,), fetchone=True)
-        return float(result[0]) if result else None
+        entry = self._pricing().get(service_type)
+        return entry['price'] if entry and entry['is_active'] else None
 
     def update_price(self, service_type: str, new_price: float, admin_telegram_id: int) -> bool:
         try:
@@ -427,20 +780,11 @@ class UserDatabase(Database):
         except Exception as e:
             print(f"❌ Narxni yangilashda xato: {e}")
             return False
+        finally:
+            self.invalidate_pricing_cache()
 
     def get_all_prices(self) -> List[Dict]:
-        sql = "SELECT service_type, price, currency, description, is_active FROM Pricing ORDER BY service_type"
-        results = self.execute(sql, fetchall=True)
-        prices = []
-        for row in results:
-            prices.append({
-                'service_type': row[0],
-                'price': float(row[1]),
-                'currency': row[2],
-                'description': row[3],
-                'is_active': bool(row[4])
-            })
-        return prices
+        return [dict(entry) for entry in self._pricing().values()]
 
     # ==================== PRESENTATION TASK METHODLAR ====================
 
@@ -462,12 +806,95 @@ class UserDatabase(Database):
 
             result = self.execute("SELECT id FROM PresentationTasks WHERE task_uuid = ?", parameters=(task_uuid,),
                                   fetchone=True)
-            return result[0] if result else None
+            if not result:
+                return None
+
+            # Worker 5 soniyalik pollingni kutmasdan darhol boshlaydi
+            notify_task_created()
+            return result[0]
 
         except Exception as e:
             print(f"❌ Task yaratishda xato: {e}")
             return None
 
+    def charge_and_create_presentation_task(
+            self, telegram_id: int, task_uuid: str, presentation_type: str, slide_count: int, answers: str,
+            price_service: str = 'slide_basic', default_price: float = 2000.0, description: str = None
+    ) -> Dict:
+        """
+        Bepul limit yoki balansdan yechish + tranzaksiya + task - bitta tranzaksiyada.
+
+        Shartli UPDATE ... RETURNING ishlatiladi: BEGIN IMMEDIATE yozish qulfini oladi,
+        shuning uchun parallel so'rovlar bitta bepul prezentatsiyani ikki marta
+        ishlata olmaydi va balans manfiyga tushmaydi. Xato bo'lsa hech narsa yozilmaydi.
+
+        Returns:
+            {'ok': True, 'task_id', 'is_free', 'amount_charged', 'balance', 'free_left'},
+            {'ok': False, 'error': 'insufficient_balance', 'required', 'balance'} yoki
+            {'ok': False, 'error': 'user_not_found'}
+        """
+        # Narx keshdan - tranzaksiya (yozish qulfi) ichida qo'shimcha so'rov bo'lmasin
+        price_per_unit = self.get_price(price_service)
+        with self.transaction() as cursor:
+            row = cursor.execute(
+                """UPDATE Users SET free_presentations = free_presentations - 1
+                   WHERE telegram_id = ? AND free_presentations > 0
+                   RETURNING id, balance, free_presentations""",
+                (telegram_id,)
+            ).fetchone()
+            is_free = row is not None
+            amount_charged = 0.0
+
+            if not is_free:
+                amount_charged = (price_per_unit or default_price) * slide_count
+                row = cursor.execute(
+                    """UPDATE Users SET balance = balance - ?, total_spent = total_spent + ?
+                       WHERE telegram_id = ? AND balance >= ?
+                       RETURNING id, balance, free_presentations""",
+                    (amount_charged, amount_charged, telegram_id, amount_charged)
+                ).fetchone()
+                if row is None:
+                    balance = cursor.execute(
+                        "SELECT balance FROM Users WHERE telegram_id = ?", (telegram_id,)
+                    ).fetchone()
+                    if balance is None:
+                        return {'ok': False, 'error': 'user_not_found'}
+                    return {
+                        'ok': False,
+                        'error': 'insufficient_balance',
+                        'required': amount_charged,
+                        'balance': float(balance[0]),
+                    }
+
+            user_id, balance, free_left = row
+            balance = float(balance)
+            if not is_free:
+                cursor.execute(
+                    """INSERT INTO Transactions (
+                           user_id, transaction_type, amount, balance_before, balance_after,
+                           description, status, created_at
+                       )
+                       VALUES (?, 'withdrawal', ?, ?, ?, ?, 'approved', CURRENT_TIMESTAMP)""",
+                    (user_id, amount_charged, balance + amount_charged, balance, description)
+                )
+            task_id = cursor.execute(
+                """INSERT INTO PresentationTasks
+                   (user_id, task_uuid, presentation_type, slide_count, answers, amount_charged)
+                   VALUES (?, ?, ?, ?, ?, ?) RETURNING id""",
+                (user_id, task_uuid, presentation_type, slide_count, answers, amount_charged)
+            ).fetchone()[0]
+
+        # Commit'dan keyin - worker task'ni ko'ra olishi uchun
+        notify_task_created()
+        return {
+            'ok': True,
+            'task_id': task_id,
+            'is_free': is_free,
+            'amount_charged': amount_charged,
+            'balance': balance,
+            'free_left': free_left or 0,
+        }
+
     def update_task_status(self, task_uuid: str, status: str, progress: int = None, file_path: str = None,
                            error_message: str = None) -> bool:
         try:
@@ -487,6 +914,7 @@ class UserDatabase(Database):
                 updates.append("started_at = CURRENT_TIMESTAMP")
             if status in ['completed', 'failed']:
                 updates.append("completed_at = CURRENT_TIMESTAMP")
+                updates.append("lease_expires_at = NULL")
 
             parameters.append(task_uuid)
             sql = f"UPDATE PresentationTasks SET {', '.join(updates)} WHERE task_uuid = ?"
@@ -541,6 +969,144 @@ class UserDatabase(Database):
                  'created_at': row[5]})
         return tasks
 
+    # ==================== TASK CLAIM / LEASE ====================
+
+    TASK_COLUMNS = ("task_uuid, user_id, presentation_type, slide_count, answers, created_at, queue_message_id, "
+                    "amount_charged")
+
+    @staticmethod
+    def _task_row_to_dict(row) -> Dict:
+        return {'task_uuid': row[0], 'user_id': row[1], 'type': row[2], 'slide_count': row[3], 'answers': row[4],
+                'created_at': row[5], 'queue_message_id': row[6], 'amount_charged': row[7]}
+
+    # Pullik task'lar bepullardan oldin, keyin navbatga kelish tartibida
+    TASK_PRIORITY_ORDER = "(COALESCE(amount_charged, 0) > 0) DESC, created_at ASC, id ASC"
+
+    def claim_pending_tasks(self, worker_id: str, limit: int = 10, lease_seconds: int = 300,
+                            presentation_type: str = None) -> List[Dict]:
+        """
+        Pending task'larni atomar egallash (ixtiyoriy - faqat bitta turdagi).
+
+        Bitta UPDATE ... RETURNING statement SQLite yozish qulfi ostida bajariladi,
+        shuning uchun bir task'ni ikki worker (yoki ikki sweep) hech qachon
+        birga ololmaydi. Egallangan task lease_seconds ichida heartbeat
+        olmasa, reclaim_expired_tasks uni navbatga qaytaradi.
+        """
+        type_filter = "AND presentation_type = ?" if presentation_type else ""
+        sql = f"""
+        UPDATE PresentationTasks
+        SET status = 'processing', worker_id = ?, attempts = COALESCE(attempts, 0) + 1,
+            started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP,
+            lease_expires_at = DATETIME('now', ?)
+        WHERE status = 'pending' AND id IN (
+            SELECT id FROM PresentationTasks WHERE status = 'pending' {type_filter}
+            ORDER BY {self.TASK_PRIORITY_ORDER} LIMIT ?
+        )
+        RETURNING {self.TASK_COLUMNS}
+        """
+        parameters = [worker_id, f"+{int(lease_seconds)} seconds"]
+        if presentation_type:
+            parameters.append(presentation_type)
+        parameters.append(limit)
+
+        results = self.execute(sql, parameters=tuple(parameters), fetchall=True, commit=True)
+        tasks = [self._task_row_to_dict(row) for row in results or []]
+        # RETURNING tartibi kafolatlanmagan
+        tasks.sort(key=lambda t: t['created_at'] or '')
+        return tasks
+
+    def get_queue_depth(self) -> Dict[str, int]:
+        """Navbatdagi (pending) task'lar soni - tur bo'yicha"""
+        sql = """
+        SELECT presentation_type, COUNT(*) FROM PresentationTasks
+        WHERE status = 'pending' GROUP BY presentation_type
+        """
+        results = self.execute(sql, fetchall=True)
+        return {row[0]: row[1] for row in results or []}
+
+    def get_queue_snapshot(self, limit: int = 500) -> List[Dict]:
+        """Navbat tartibi (egallash tartibida) - foydalanuvchiga o'rnini ko'rsatish uchun"""
+        sql = f"""
+        SELECT task_uuid, presentation_type, (SELECT telegram_id FROM Users WHERE Users.id = user_id), queue_message_id
+        FROM PresentationTasks
+        WHERE status = 'pending'
+        ORDER BY {self.TASK_PRIORITY_ORDER}
+        LIMIT ?
+        """
+        results = self.execute(sql, parameters=(limit,), fetchall=True)
+        return [{'task_uuid': row[0], 'type': row[1], 'telegram_id': row[2], 'queue_message_id': row[3]}
+                for row in results or []]
+
+    def reserve_queue_notice(self, task_uuid: str) -> bool:
+        """
+        Navbat xabarini yuborish huquqini olish (queue_message_id = 0).
+        Bir nechta worker replikasi bir foydalanuvchiga ikki marta yozmasligi uchun.
+        """
+        sql = """
+        UPDATE PresentationTasks SET queue_message_id = 0
+        WHERE task_uuid = ? AND status = 'pending' AND queue_message_id IS NULL
+        RETURNING id
+        """
+        return self.execute(sql, parameters=(task_uuid,), fetchone=True, commit=True) is not None
+
+    def set_queue_message(self, task_uuid: str, message_id: Optional[int]):
+        """Yuborilgan navbat xabari ID'si (None - qayta yuborishga ruxsat)"""
+        self.execute("UPDATE PresentationTasks SET queue_message_id = ? WHERE task_uuid = ?",
+                     parameters=(message_id, task_uuid), commit=True)
+
+    def heartbeat_task(self, task_uuid: str, worker_id: str, lease_seconds: int = 300) -> bool:
+        """Lease'ni uzaytirish. False - task boshqa worker'ga o'tgan yoki tugagan"""
+        sql = """
+        UPDATE PresentationTasks
+        SET heartbeat_at = CURRENT_TIMESTAMP, lease_expires_at = DATETIME('now', ?)
+        WHERE task_uuid = ? AND worker_id = ? AND status = 'processing'
+        RETURNING id
+        """
+        result = self.execute(sql, parameters=(f"+{int(lease_seconds)} seconds", task_uuid, worker_id),
+                              fetchone=True, commit=True)
+        return result is not None
+
+    def reclaim_expired_tasks(self, max_attempts: int = 3) -> Dict[str, List[Dict]]:
+        """
+        Lease muddati o'tgan (worker o'lgan) task'larni qayta ishlash.
+
+        - attempts < max_attempts: 'pending' ga qaytariladi
+        - qolganlari: 'failed' qilinadi va chaqiruvchiga qaytariladi
+          (balansni qaytarish va foydalanuvchiga xabar berish uchun)
+        """
+        requeued = self.execute(f"""
+        UPDATE PresentationTasks
+        SET status = 'pending', worker_id = NULL, lease_expires_at = NULL
+        WHERE status = 'processing' AND lease_expires_at < CURRENT_TIMESTAMP
+          AND COALESCE(attempts, 0) < ?
+        RETURNING {self.TASK_COLUMNS}
+        """, parameters=(max_attempts,), fetchall=True, commit=True) or []
+
+        exhausted = self.execute(f"""
+        UPDATE PresentationTasks
+        SET status = 'failed', lease_expires_at = NULL, completed_at = CURRENT_TIMESTAMP,
+            error_message = 'Lease muddati tugadi (urinishlar tugadi)'
+        WHERE status = 'processing' AND lease_expires_at < CURRENT_TIMESTAMP
+        RETURNING {self.TASK_COLUMNS}
+        """, fetchall=True, commit=True) or []
+
+        return {
+            'requeued': [self._task_row_to_dict(row) for row in requeued],
+            'exhausted': [self._task_row_to_dict(row) for row in exhausted],
+        }
+
+    def release_worker_tasks(self, worker_id: str) -> int:
+        """Worker to'xtatilganda tugamagan task'larini navbatga qaytarish"""
+        sql = """
+        UPDATE PresentationTasks
+        SET status = 'pending', worker_id = NULL, lease_expires_at = NULL,
+            attempts = MAX(COALESCE(attempts, 0) - 1, 0)
+        WHERE status = 'processing' AND worker_id = ?
+        RETURNING id
+        """
+        results = self.execute(sql, parameters=(worker_id,), fetchall=True, commit=True)
+        return len(results or [])
+
     # ==================== STATISTIKA ====================
 
     def get_financial_stats(self) -> Dict:
@@ -589,6 +1155,42 @@ class UserDatabase(Database):
         self.execute("UPDATE Users SET is_blocked = TRUE, is_active = FALSE WHERE telegram_id = ?",
                      parameters=(telegram_id,), commit=True)
 
+    def mark_users_as_blocked(self, telegram_ids: List[int], chunk_size: int = 500) -> int:
+        """Ko'p userni bitta tranzaksiyada bloklangan deb belgilash (broadcast natijalari)"""
+        telegram_ids = list(telegram_ids)
+        with self.transaction() as cursor:
+            for i in range(0, len(telegram_ids), chunk_size):
+                chunk = telegram_ids[i:i + chunk_size]
+                cursor.execute(
+                    f"UPDATE Users SET is_blocked = TRUE, is_active = FALSE "
+                    f"WHERE telegram_id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                )
+        return len(telegram_ids)
+
+    def mark_user_as_unblocked(self, telegram_id: int):
+        self.execute("UPDATE Users SET is_blocked = FALSE, is_active = TRUE WHERE telegram_id = ?",
+                     parameters=(telegram_id,), commit=True)
+
+    def count_broadcast_recipients(self, after_id: int = 0) -> int:
+        result = self.execute(
+            "SELECT COUNT(*) FROM Users WHERE id > ? AND (is_blocked IS NULL OR is_blocked = FALSE)",
+            parameters=(after_id,),
+            fetchone=True
+        )
+        return result[0] if result else 0
+
+    def get_broadcast_recipients(self, after_id: int = 0, limit: int = 500) -> List[tuple]:
+        """Broadcast uchun keyingi sahifa: [(id, telegram_id), ...] - PRIMARY KEY bo'yicha keyset"""
+        result = self.execute(
+            """SELECT id, telegram_id FROM Users
+               WHERE id > ? AND (is_blocked IS NULL OR is_blocked = FALSE)
+               ORDER BY id LIMIT ?""",
+            parameters=(after_id, limit),
+            fetchall=True
+        )
+        return result or []
+
     def get_active_users(self):
         return self.execute("SELECT * FROM Users WHERE is_active = TRUE", fetchall=True)
 
@@ -604,26 +1206,61 @@ class UserDatabase(Database):
     def count_blocked_users(self):
         return self.execute("SELECT COUNT(*) FROM Users WHERE is_blocked = TRUE;", fetchone=True)[0]
 
+    def _user_growth_windows(self) -> Dict[str, datetime]:
+        now = datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return {
+            'last_12_hours': now - timedelta(hours=12),
+            'today': today,
+            'week': today - timedelta(days=today.weekday()),
+            'month': today.replace(day=1),
+        }
+
+    @staticmethod
+    def _new_users_since_sql(since: datetime):
+        """
+        `since` dan beri qo'shilgan userlar: to'liq soatlar StatsUserGrowth'dan,
+        boshidagi chala soat esa Users'dan idx_users_created_dt oralig'i bilan.
+        """
+        next_hour = since.replace(minute=0, second=0, microsecond=0)
+        if next_hour < since:
+            next_hour += timedelta(hours=1)
+        since_str = since.strftime('%Y-%m-%d %H:%M:%S')
+        next_hour_str = next_hour.strftime('%Y-%m-%d %H:%M:%S')
+        created = USER_CREATED_SQL.format(column="created_at")
+        sql = f"""(SELECT COALESCE(SUM(user_count), 0) FROM StatsUserGrowth WHERE hour >= ?)
+                 + (SELECT COUNT(*) FROM Users WHERE {created} >= ? AND {created} < ?)"""
+        return sql, (next_hour_str, since_str, next_hour_str)
+
+    def get_user_growth_counts(self) -> Dict[str, int]:
+        """Oxirgi 12 soat, bugun, hafta va oy bo'yicha yangi userlar - bitta so'rovda"""
+        windows = self._user_growth_windows()
+        columns, parameters = [], []
+        for since in windows.values():
+            sql, params = self._new_users_since_sql(since)
+            columns.append(sql)
+            parameters.extend(params)
+        result = self.execute(f"SELECT {', '.join(columns)}", parameters=tuple(parameters), fetchone=True)
+        if not result:
+            return {name: 0 for name in windows}
+        return dict(zip(windows, result))
+
+    def _count_new_users(self, window: str) -> int:
+        sql, parameters = self._new_users_since_sql(self._user_growth_windows()[window])
+        result = self.execute(f"SELECT {sql}", parameters=parameters, fetchone=True)
+        return result[0] if result else 0
+
     def count_users_last_12_hours(self):
-        time_threshold = (datetime.now() - timedelta(hours=12)).isoformat()
-        return \
-        self.execute("SELECT COUNT(*) FROM Users WHERE created_at >= ?;", parameters=(time_threshold,), fetchone=True)[
-            0]
+        return self._count_new_users('last_12_hours')
 
     def count_users_today(self):
-        today = datetime.now().date().isoformat()
-        return \
-        self.execute("SELECT COUNT(*) FROM Users WHERE DATE(created_at) = ?;", parameters=(today,), fetchone=True)[0]
+        return self._count_new_users('today')
 
     def count_users_this_week(self):
-        start_of_week = (datetime.now() - timedelta(days=datetime.now().weekday())).date().isoformat()
-        return self.execute("SELECT COUNT(*) FROM Users WHERE DATE(created_at) >= ?;", parameters=(start_of_week,),
-                            fetchone=True)[0]
+        return self._count_new_users('week')
 
     def count_users_this_month(self):
-        start_of_month = datetime.now().replace(day=1).date().isoformat()
-        return self.execute("SELECT COUNT(*) FROM Users WHERE DATE(created_at) >= ?;", parameters=(start_of_month,),
-                            fetchone=True)[0]
+        return self._count_new_users('month')
 
     def add_admin(self, user_id: int, name: str, is_super_admin: bool = False):
         if not self.check_if_admin(user_id):
@@ -670,56 +1307,56 @@ class UserDatabase(Database):
         )
         return result[0] if result else 0
 
-    def reset_all_balances(self, admin_telegram_id: int) -> bool:
+    def _run_bulk(self, name: str, operation) -> Optional[Dict]:
+        """
+        Ommaviy amalni bitta tranzaksiyada bajarish.
+
+        operation(cursor) natija dict qaytaradi; unga 'elapsed_ms' qo'shiladi.
+        Xato bo'lsa hech narsa o'zgarmaydi va None qaytadi.
+        """
+        started = time.perf_counter()
+        try:
+            with self.transaction() as cursor:
+                result = operation(cursor)
+        except Exception as e:
+            print(f"❌ {name} xato: {e}")
+            return None
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    def reset_all_balances(self, admin_telegram_id: int) -> Optional[Dict]:
         """
         Barcha foydalanuvchilar balansini 0 ga tushirish
 
+        Har bir balansi bor user uchun 'reset' tranzaksiyasi INSERT ... SELECT
+        bilan yoziladi va balanslar o'sha tranzaksiyada nolga tushiriladi.
+
         Args:
             admin_telegram_id: Reset qilgan admin ID si
 
         Returns:
-            bool: Muvaffaqiyatli bo'lsa True
+            {'users', 'amount', 'elapsed_ms'} yoki xato bo'lsa None
         """
-        try:
-            # 1. Avval balansi bor userlarni olish (log uchun)
-            users_with_balance = self.execute(
-                "SELECT id, telegram_id, balance FROM Users WHERE balance > 0",
-                fetchall=True
+        def operation(cursor):
+            users, amount = cursor.execute(
+                "SELECT COUNT(*), COALESCE(SUM(balance), 0) FROM Users WHERE balance > 0"
+            ).fetchone()
+            cursor.execute(
+                """INSERT INTO Transactions
+                   (user_id, transaction_type, amount, balance_before, balance_after,
+                    description, status, admin_id, created_at, updated_at)
+                   SELECT id, 'reset', balance, balance, 0, 'Admin tomonidan barcha balanslar reset qilindi',
+                          'approved', ?, datetime('now'), datetime('now')
+                   FROM Users WHERE balance > 0""",
+                (admin_telegram_id,)
             )
+            cursor.execute("UPDATE Users SET balance = 0 WHERE balance IS NOT 0")
+            return {'users': users, 'amount': float(amount)}
 
-            if not users_with_balance:
-                print("ℹ️ Balansi bor user yo'q")
-                return True
-
-            # 2. Har bir user uchun reset tranzaksiya yozish
-            for user in users_with_balance:
-                user_id = user[0]
-                telegram_id = user[1]
-                old_balance = user[2]
-
-                # Tranzaksiya yozish
-                self.execute(
-                    """INSERT INTO Transactions 
-                       (user_id, transaction_type, amount, balance_before, balance_after, 
-                        description, status, admin_id, created_at, updated_at)
-                       VALUES (?, 'reset', ?, ?, 0, 'Admin tomonidan barcha balanslar reset qilindi', 
-                               'approved', ?, datetime('now'), datetime('now'))""",
-                    parameters=(user_id, old_balance, old_balance, admin_telegram_id),
-                    commit=True
-                )
-
-            # 3. BARCHA balanslarni 0 ga tushirish
-            self.execute(
-                "UPDATE Users SET balance = 0",
-                commit=True
-            )
-
-            print(f"✅ {len(users_with_balance)} ta user balansi reset qilindi")
-            return True
-
-        except Exception as e:
-            print(f"❌ Reset balances xato: {e}")
-            return False
+        result = self._run_bulk("Reset balances", operation)
+        if result is not None:
+            print(f"✅ {result['users']} ta user balansi reset qilindi ({result['elapsed_ms']} ms)")
+        return result
 
 
 # ==================== KENGAYTIRILGAN STATISTIKA METODLARI ====================
@@ -750,6 +1387,10 @@ class UserDatabase(Database):
     def get_extended_statistics(self) -> dict:
         """
         Kengaytirilgan statistikalar - Toshkent vaqti bo'yicha
+
+        Users/Transactions qayta skanerlanmaydi: tranzaksiya va task summalari
+        kunlik rollup jadvallaridan shartli agregatlar bilan bitta o'tishda olinadi,
+        foydalanuvchi jamlari StatsUserTotals'da tayyor turadi (create_stats_rollups).
         """
         try:
             now = datetime.now(TASHKENT_TZ)
@@ -763,208 +1404,100 @@ class UserDatabase(Database):
             month_start = now.replace(day=1, hour=0, minute=0, second=0)
             month_start_utc = month_start.astimezone(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S')
 
-            stats = {}
-
-            # ==================== FOYDALANUVCHILAR ====================
-
-            # Jami userlar
-            result = self.execute("SELECT COUNT(*) FROM Users", fetchone=True)
-            stats['total_users'] = result[0] if result else 0
+            # Rollup kalitlari - Toshkent kunlari
+            today_day = now.date().isoformat()
+            week_day = week_start.date().isoformat()
+            month_day = month_start.date().isoformat()
 
-            # Balansi bor userlar
-            result = self.execute("SELECT COUNT(*) FROM Users WHERE balance > 0", fetchone=True)
-            stats['users_with_balance'] = result[0] if result else 0
-
-            # Balansi yo'q userlar
-            stats['users_without_balance'] = stats['total_users'] - stats['users_with_balance']
-
-            # Bugun ro'yxatdan o'tganlar
-            result = self.execute(
-                "SELECT COUNT(*) FROM Users WHERE created_at >= ? AND created_at <= ?",
-                parameters=(today_start, today_end),
-                fetchone=True
-            )
-            stats['new_users_today'] = result[0] if result else 0
+            stats = {}
 
-            # Bu hafta ro'yxatdan o'tganlar
-            result = self.execute(
-                "SELECT COUNT(*) FROM Users WHERE created_at >= ?",
-                parameters=(week_start_utc,),
-                fetchone=True
-            )
-            stats['new_users_week'] = result[0] if result else 0
+            # ==================== FOYDALANUVCHILAR VA BALANSLAR ====================
 
-            # Bu oy ro'yxatdan o'tganlar
+            created = USER_CREATED_SQL.format(column="created_at")
             result = self.execute(
-                "SELECT COUNT(*) FROM Users WHERE created_at >= ?",
-                parameters=(month_start_utc,),
+                f"""SELECT t.total_users, t.users_with_balance, t.total_balance, t.positive_balance,
+                          (SELECT COALESCE(MAX(balance), 0) FROM Users),
+                          (SELECT COUNT(*) FROM Users WHERE {created} BETWEEN ? AND ?),
+                          (SELECT COUNT(*) FROM Users WHERE {created} >= ?),
+                          (SELECT COUNT(*) FROM Users WHERE {created} >= ?)
+                   FROM StatsUserTotals t WHERE t.id = 1""",
+                parameters=(today_start, today_end, week_start_utc, month_start_utc),
                 fetchone=True
-            )
-            stats['new_users_month'] = result[0] if result else 0
-
-            # ==================== BALANSLAR ====================
+            ) or (0, 0, 0, 0, 0, 0, 0, 0)
 
-            # Jami balans
-            result = self.execute("SELECT COALESCE(SUM(balance), 0) FROM Users", fetchone=True)
-            stats['total_balance'] = float(result[0]) if result else 0.0
+            stats['total_users'] = result[0]
+            stats['users_with_balance'] = result[1]
+            stats['users_without_balance'] = result[0] - result[1]
+            stats['new_users_today'] = result[5]
+            stats['new_users_week'] = result[6]
+            stats['new_users_month'] = result[7]
 
+            stats['total_balance'] = float(result[2])
             # O'rtacha balans (balansi bor userlar orasida)
-            result = self.execute(
-                "SELECT COALESCE(AVG(balance), 0) FROM Users WHERE balance > 0",
-                fetchone=True
-            )
-            stats['avg_balance'] = float(result[0]) if result else 0.0
-
-            # Eng katta balans
-            result = self.execute("SELECT COALESCE(MAX(balance), 0) FROM Users", fetchone=True)
-            stats['max_balance'] = float(result[0]) if result else 0.0
+            stats['avg_balance'] = float(result[3]) / result[1] if result[1] else 0.0
+            stats['max_balance'] = float(result[4])
 
-            # ==================== BUGUNGI TRANZAKSIYALAR ====================
+            # ==================== TRANZAKSIYALAR ====================
 
-            # Bugun to'ldirilgan (approved deposits)
+            # Har bir (tur, status) uchun: bugun, hafta, oy va jami - (summa, soni)
             result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'deposit' 
-                   AND status = 'approved'
-                   AND created_at >= ? AND created_at <= ?""",
-                parameters=(today_start, today_end),
-                fetchone=True
-            )
-            stats['today_deposited'] = float(result[0]) if result else 0.0
-            stats['today_deposit_count'] = result[1] if result else 0
+                """SELECT transaction_type, status,
+                          SUM(CASE WHEN day = ? THEN amount ELSE 0 END),
+                          SUM(CASE WHEN day = ? THEN tx_count ELSE 0 END),
+                          SUM(CASE WHEN day >= ? THEN amount ELSE 0 END),
+                          SUM(CASE WHEN day >= ? THEN tx_count ELSE 0 END),
+                          SUM(CASE WHEN day >= ? THEN amount ELSE 0 END),
+                          SUM(CASE WHEN day >= ? THEN tx_count ELSE 0 END),
+                          SUM(amount), SUM(tx_count)
+                   FROM StatsDailyTransactions
+                   WHERE status IN ('approved', 'pending')
+                   GROUP BY transaction_type, status""",
+                parameters=(today_day, today_day, week_day, week_day, month_day, month_day),
+                fetchall=True
+            ) or []
+            periods = ('today', 'week', 'month', 'total')
+            buckets = {}
+            for row in result:
+                buckets[(row[0], row[1])] = {
+                    period: (float(row[2 + i * 2] or 0), row[3 + i * 2] or 0)
+                    for i, period in enumerate(periods)
+                }
+            empty = {period: (0.0, 0) for period in periods}
 
-            # Bugun sarflangan (withdrawals)
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'withdrawal' 
-                   AND status = 'approved'
-                   AND created_at >= ? AND created_at <= ?""",
-                parameters=(today_start, today_end),
-                fetchone=True
-            )
-            stats['today_spent'] = float(result[0]) if result else 0.0
-            stats['today_spent_count'] = result[1] if result else 0
+            deposits = buckets.get(('deposit', 'approved'), empty)
+            withdrawals = buckets.get(('withdrawal', 'approved'), empty)
+            for period in periods:
+                stats[f'{period}_deposited'], stats[f'{period}_deposit_count'] = deposits[period]
+                stats[f'{period}_spent'], stats[f'{period}_spent_count'] = withdrawals[period]
 
             # Bugun kutilayotgan to'lovlar
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'deposit' 
-                   AND status = 'pending'
-                   AND created_at >= ? AND created_at <= ?""",
-                parameters=(today_start, today_end),
-                fetchone=True
-            )
-            stats['today_pending'] = float(result[0]) if result else 0.0
-            stats['today_pending_count'] = result[1] if result else 0
-
-            # ==================== HAFTALIK TRANZAKSIYALAR ====================
+            stats['today_pending'], stats['today_pending_count'] = \
+                buckets.get(('deposit', 'pending'), empty)['today']
 
-            # Bu hafta to'ldirilgan
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'deposit' 
-                   AND status = 'approved'
-                   AND created_at >= ?""",
-                parameters=(week_start_utc,),
-                fetchone=True
-            )
-            stats['week_deposited'] = float(result[0]) if result else 0.0
-            stats['week_deposit_count'] = result[1] if result else 0
-
-            # Bu hafta sarflangan
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'withdrawal' 
-                   AND status = 'approved'
-                   AND created_at >= ?""",
-                parameters=(week_start_utc,),
-                fetchone=True
-            )
-            stats['week_spent'] = float(result[0]) if result else 0.0
-            stats['week_spent_count'] = result[1] if result else 0
-
-            # ==================== OYLIK TRANZAKSIYALAR ====================
-
-            # Bu oy to'ldirilgan
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'deposit' 
-                   AND status = 'approved'
-                   AND created_at >= ?""",
-                parameters=(month_start_utc,),
-                fetchone=True
-            )
-            stats['month_deposited'] = float(result[0]) if result else 0.0
-            stats['month_deposit_count'] = result[1] if result else 0
-
-            # Bu oy sarflangan
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'withdrawal' 
-                   AND status = 'approved'
-                   AND created_at >= ?""",
-                parameters=(month_start_utc,),
-                fetchone=True
-            )
-            stats['month_spent'] = float(result[0]) if result else 0.0
-            stats['month_spent_count'] = result[1] if result else 0
-
-            # ==================== JAMI (ALL TIME) ====================
-
-            # Jami to'ldirilgan
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'deposit' AND status = 'approved'""",
-                fetchone=True
-            )
-            stats['total_deposited'] = float(result[0]) if result else 0.0
-            stats['total_deposit_count'] = result[1] if result else 0
-
-            # Jami sarflangan
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE transaction_type = 'withdrawal' AND status = 'approved'""",
-                fetchone=True
-            )
-            stats['total_spent'] = float(result[0]) if result else 0.0
-            stats['total_spent_count'] = result[1] if result else 0
-
-            # Jami kutilayotgan
-            result = self.execute(
-                """SELECT COALESCE(SUM(amount), 0), COUNT(*) FROM Transactions 
-                   WHERE status = 'pending'""",
-                fetchone=True
-            )
-            stats['total_pending'] = float(result[0]) if result else 0.0
-            stats['total_pending_count'] = result[1] if result else 0
+            # Jami kutilayotgan (barcha turlar)
+            pending = [bucket['total'] for key, bucket in buckets.items() if key[1] == 'pending']
+            stats['total_pending'] = sum(amount for amount, _ in pending)
+            stats['total_pending_count'] = sum(count for _, count in pending)
 
             # ==================== TASK STATISTIKA ====================
 
-            # Bugungi tasklar
             result = self.execute(
-                """SELECT status, COUNT(*) FROM PresentationTasks 
-                   WHERE created_at >= ? AND created_at <= ?
-                   GROUP BY status""",
-                parameters=(today_start, today_end),
+                """SELECT status, SUM(CASE WHEN day = ? THEN task_count ELSE 0 END), SUM(task_count)
+                   FROM StatsDailyTasks GROUP BY status""",
+                parameters=(today_day,),
                 fetchall=True
-            )
-            stats['today_tasks'] = {row[0]: row[1] for row in result} if result else {}
+            ) or []
+            stats['today_tasks'] = {row[0]: row[1] for row in result if row[1]}
             stats['today_tasks_total'] = sum(stats['today_tasks'].values())
-
-            # Jami tasklar
-            result = self.execute(
-                "SELECT status, COUNT(*) FROM PresentationTasks GROUP BY status",
-                fetchall=True
-            )
-            stats['all_tasks'] = {row[0]: row[1] for row in result} if result else {}
+            stats['all_tasks'] = {row[0]: row[2] for row in result if row[2]}
 
             # ==================== TOP USERLAR ====================
 
-            # Eng ko'p balansli 5 user
+            # Eng ko'p balansli 5 user (idx_users_balance)
             result = self.execute(
-                """SELECT u.telegram_id, u.username, u.balance 
-                   FROM Users u 
-                   WHERE u.balance > 0 
+                """SELECT u.telegram_id, u.username, u.balance
+                   FROM Users u
+                   WHERE u.balance > 0
                    ORDER BY u.balance DESC LIMIT 5""",
                 fetchall=True
             )
@@ -973,12 +1506,12 @@ class UserDatabase(Database):
                 for r in result
             ] if result else []
 
-            # Bugun eng ko'p to'ldirgan userlar
+            # Bugun eng ko'p to'ldirgan userlar (idx_transactions_created)
             result = self.execute(
                 """SELECT u.telegram_id, u.username, SUM(t.amount) as total
                    FROM Transactions t
                    JOIN Users u ON t.user_id = u.id
-                   WHERE t.transaction_type = 'deposit' 
+                   WHERE t.transaction_type = 'deposit'
                    AND t.status = 'approved'
                    AND t.created_at >= ? AND t.created_at <= ?
                    GROUP BY u.telegram_id
@@ -1126,6 +1659,36 @@ class UserDatabase(Database):
             print(f"❌ add_free_presentations xato: {e}")
             return False
 
+    def add_free_presentations_all(self, count: int) -> Optional[Dict]:
+        """Barcha userlarga bepul prezentatsiya qo'shish -> {'users', 'added', 'elapsed_ms'}"""
+        def operation(cursor):
+            cursor.execute(
+                "UPDATE Users SET free_presentations = COALESCE(free_presentations, 0) + ?", (count,)
+            )
+            return {'users': cursor.rowcount, 'added': cursor.rowcount * count}
+
+        return self._run_bulk("add_free_presentations_all", operation)
+
+    def set_free_presentations_all(self, count: int) -> Optional[Dict]:
+        """Barcha userlarga bepul prezentatsiya sonini o'rnatish -> {'users', 'old_total', 'new_total', 'elapsed_ms'}"""
+        def operation(cursor):
+            old_total = cursor.execute("SELECT COALESCE(SUM(free_presentations), 0) FROM Users").fetchone()[0]
+            cursor.execute("UPDATE Users SET free_presentations = ?", (count,))
+            return {'users': cursor.rowcount, 'old_total': old_total, 'new_total': cursor.rowcount * count}
+
+        return self._run_bulk("set_free_presentations_all", operation)
+
+    def remove_free_presentations_all(self) -> Optional[Dict]:
+        """Barcha bepul prezentatsiyalarni o'chirish -> {'users', 'removed', 'elapsed_ms'}"""
+        def operation(cursor):
+            users, removed = cursor.execute(
+                "SELECT COUNT(*), COALESCE(SUM(free_presentations), 0) FROM Users WHERE free_presentations > 0"
+            ).fetchone()
+            cursor.execute("UPDATE Users SET free_presentations = 0 WHERE free_presentations IS NOT 0")
+            return {'users': users, 'removed': removed}
+
+        return self._run_bulk("remove_free_presentations_all", operation)
+
     # ==================== BIZNES PLAN METHODLAR ====================
 
     def add_business_plan(
@@ -5,6 +5,9 @@ import ssl
 from typing import Optional, Dict
 import json
 
+from utils.misc.http_client import HttpClient
+from utils.misc.polling import StatusMultiplexer
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +32,10 @@ class GammaAPI:
         self.ssl_context.check_hostname = False
         self.ssl_context.verify_mode = ssl.CERT_NONE
 
+        # Bitta uzoq yashovchi sessiya (TLS handshake har poll'da qayta qilinmaydi)
+        self.http = HttpClient("gamma", timeout=self.timeout, limit_per_host=10, ssl=self.ssl_context)
+        self.status_mux = StatusMultiplexer(self.check_status, name="gamma")
+
     async def create_presentation_from_text(
             self,
             text_content: str,
@@ -76,52 +83,51 @@ class GammaAPI:
             logger.info(f"🎨 Theme qo'shildi: {theme_id}")
 
         try:
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-
-            async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-                logger.info(f"🎯 Gamma API: POST {self.base_url}/generations")
-                logger.info(
-                    f"📊 Cards: {num_cards}, Mode: {text_mode}, Theme: {theme_id if theme_id and not _retry_without_theme else 'default'}")
-
-                async with session.post(
-                        f"{self.base_url}/generations",
-                        headers=headers,
-                        json=payload
-                ) as response:
-
-                    response_text = await response.text()
-                    logger.info(f"📥 Response status: {response.status}")
-                    logger.info(f"📄 Response: {response_text[:300]}")
-
-                    if response.status in [200, 201]:
-                        result = json.loads(response_text) if response_text else {}
-                        generation_id = result.get('generationId')
-
-                        if generation_id:
-                            logger.info(f"✅ Generation ID: {generation_id}")
-                            return {
-                                'generationId': generation_id,
-                                'status': 'processing'
-                            }
-                        else:
-                            logger.error(f"❌ generationId yo'q: {result}")
-                            return None
+            logger.info(f"🎯 Gamma API: POST {self.base_url}/generations")
+            logger.info(
+                f"📊 Cards: {num_cards}, Mode: {text_mode}, Theme: {theme_id if theme_id and not _retry_without_theme else 'default'}")
+
+            async with self.http.request(
+                    "POST",
+                    f"{self.base_url}/generations",
+                    endpoint="generations",
+                    headers=headers,
+                    json=payload
+            ) as response:
+
+                response_text = await response.text()
+                logger.info(f"📥 Response status: {response.status}")
+                logger.info(f"📄 Response: {response_text[:300]}")
+
+                if response.status in [200, 201]:
+                    result = json.loads(response_text) if response_text else {}
+                    generation_id = result.get('generationId')
+
+                    if generation_id:
+                        logger.info(f"✅ Generation ID: {generation_id}")
+                        return {
+                            'generationId': generation_id,
+                            'status': 'processing'
+                        }
                     else:
-                        logger.error(f"❌ Gamma API XATO ({response.status}): {response_text}")
-
-                        # ✅ FALLBACK: Agar theme bilan xato bo'lsa, theme'siz qayta urinish
-                        if theme_id and not _retry_without_theme and response.status in [400, 422, 500]:
-                            logger.warning(f"⚠️ Theme '{theme_id}' bilan xato! Theme'siz qayta urinib ko'ramiz...")
-                            return await self.create_presentation_from_text(
-                                text_content=text_content,
-                                title=title,
-                                num_cards=num_cards,
-                                text_mode=text_mode,
-                                theme_id=None,
-                                _retry_without_theme=True
-                            )
-
+                        logger.error(f"❌ generationId yo'q: {result}")
                         return None
+                else:
+                    logger.error(f"❌ Gamma API XATO ({response.status}): {response_text}")
+
+                    # ✅ FALLBACK: Agar theme bilan xato bo'lsa, theme'siz qayta urinish
+                    if theme_id and not _retry_without_theme and response.status in [400, 422, 500]:
+                        logger.warning(f"⚠️ Theme '{theme_id}' bilan xato! Theme'siz qayta urinib ko'ramiz...")
+                        return await self.create_presentation_from_text(
+                            text_content=text_content,
+                            title=title,
+                            num_cards=num_cards,
+                            text_mode=text_mode,
+                            theme_id=None,
+                            _retry_without_theme=True
+                        )
+
+                    return None
 
         except asyncio.TimeoutError:
             logger.error("⏱️ Timeout")
@@ -155,30 +161,29 @@ class GammaAPI:
         }
 
         try:
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-
-            async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-                logger.info(f"🎨 Gamma API: GET {self.base_url}/themes")
+            logger.info(f"🎨 Gamma API: GET {self.base_url}/themes")
 
-                async with session.get(
-                        f"{self.base_url}/themes?limit={limit}",
-                        headers=headers
-                ) as response:
+            async with self.http.request(
+                    "GET",
+                    f"{self.base_url}/themes?limit={limit}",
+                    endpoint="themes",
+                    headers=headers
+            ) as response:
 
-                    if response.status == 200:
-                        result = await response.json()
-                        themes = result.get('data', result if isinstance(result, list) else [])
-                        logger.info(f"✅ {len(themes)} ta theme topildi")
+                if response.status == 200:
+                    result = await response.json()
+                    themes = result.get('data', result if isinstance(result, list) else [])
+                    logger.info(f"✅ {len(themes)} ta theme topildi")
 
-                        # Theme ID'larni log qilish
-                        for theme in themes[:10]:
-                            logger.info(f"🎨 Theme: id='{theme.get('id')}', name='{theme.get('name')}'")
+                    # Theme ID'larni log qilish
+                    for theme in themes[:10]:
+                        logger.info(f"🎨 Theme: id='{theme.get('id')}', name='{theme.get('name')}'")
 
-                        return themes
-                    else:
-                        response_text = await response.text()
-                        logger.error(f"❌ Themes xato ({response.status}): {response_text}")
-                        return None
+                    return themes
+                else:
+                    response_text = await response.text()
+                    logger.error(f"❌ Themes xato ({response.status}): {response_text}")
+                    return None
 
         except Exception as e:
             logger.error(f"💥 Themes xato: {e}")
@@ -196,53 +201,54 @@ class GammaAPI:
         }
 
         try:
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-
-            async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-                async with session.get(
-                        f"{self.base_url}/generations/{generation_id}",
-                        headers=headers
-                ) as response:
-
-                    response_text = await response.text()
+            async with self.http.request(
+                    "GET",
+                    f"{self.base_url}/generations/{generation_id}",
+                    endpoint="generations/{id}",
+                    headers=headers
+            ) as response:
+
+                response_text = await response.text()
+
+                if response.status == 200:
+                    result = json.loads(response_text)
+
+                    logger.info(f"📋 Status response: {json.dumps(result, indent=2, ensure_ascii=False)[:500]}")
+
+                    status = result.get('status', 'unknown')
+                    gamma_url = result.get('gammaUrl', '')
+                    pptx_url = result.get('pptxUrl', '')
+                    pdf_url = result.get('pdfUrl', '')
+                    export_url = result.get('exportUrl', '')
+                    files = result.get('files', [])
+                    exports = result.get('exports', {})
+
+                    logger.info(f"📊 Status: {status}")
+                    logger.info(f"📄 PPTX URL: {pptx_url[:50] if pptx_url else 'yo`q'}")
+
+                    return {
+                        'status': status,
+                        'gammaUrl': gamma_url,
+                        'pptxUrl': pptx_url or export_url,
+                        'pdfUrl': pdf_url,
+                        'files': files,
+                        'exports': exports,
+                        'result': result,
+                        'retry_after': response.headers.get('Retry-After')
+                    }
+
+                elif response.status == 202:
+                    logger.info("⏳ 202 - hali ishlanmoqda")
+                    return {
+                        'status': 'processing',
+                        'gammaUrl': '',
+                        'pptxUrl': '',
+                        'retry_after': response.headers.get('Retry-After')
+                    }
 
-                    if response.status == 200:
-                        result = json.loads(response_text)
-
-                        logger.info(f"📋 Status response: {json.dumps(result, indent=2, ensure_ascii=False)[:500]}")
-
-                        status = result.get('status', 'unknown')
-                        gamma_url = result.get('gammaUrl', '')
-                        pptx_url = result.get('pptxUrl', '')
-                        pdf_url = result.get('pdfUrl', '')
-                        export_url = result.get('exportUrl', '')
-                        files = result.get('files', [])
-                        exports = result.get('exports', {})
-
-                        logger.info(f"📊 Status: {status}")
-                        logger.info(f"📄 PPTX URL: {pptx_url[:50] if pptx_url else 'yo`q'}")
-
-                        return {
-                            'status': status,
-                            'gammaUrl': gamma_url,
-                            'pptxUrl': pptx_url or export_url,
-                            'pdfUrl': pdf_url,
-                            'files': files,
-                            'exports': exports,
-                            'result': result
-                        }
-
-                    elif response.status == 202:
-                        logger.info("⏳ 202 - hali ishlanmoqda")
-                        return {
-                            'status': 'processing',
-                            'gammaUrl': '',
-                            'pptxUrl': ''
-                        }
-
-                    else:
-                        logger.error(f"❌ Xato ({response.status}): {response_text}")
-                        return None
+                else:
+                    logger.error(f"❌ Xato ({response.status}): {response_text}")
+                    return None
 
         except Exception as e:
             logger.error(f"💥 Status xato: {e}")
@@ -251,21 +257,18 @@ class GammaAPI:
     async def download_file(self, file_url: str, output_path: str) -> bool:
         """Faylni URL dan yuklab olish"""
         try:
-            connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-
-            async with aiohttp.ClientSession(timeout=self.timeout, connector=connector) as session:
-                logger.info(f"📥 Download: {file_url[:80]}...")
+            logger.info(f"📥 Download: {file_url[:80]}...")
 
-                async with session.get(file_url) as response:
-                    if response.status == 200:
-                        with open(output_path, 'wb') as f:
-                            f.write(await response.read())
+            async with self.http.request("GET", file_url, endpoint="download") as response:
+                if response.status == 200:
+                    with open(output_path, 'wb') as f:
+                        f.write(await response.read())
 
-                        logger.info(f"✅ Saqlandi: {output_path}")
-                        return True
-                    else:
-                        logger.error(f"❌ Download xato: {response.status}")
-                        return False
+                    logger.info(f"✅ Saqlandi: {output_path}")
+                    return True
+                else:
+                    logger.error(f"❌ Download xato: {response.status}")
+                    return False
 
         except Exception as e:
             logger.error(f"💥 Download xato: {e}")
@@ -317,20 +320,8 @@ class GammaAPI:
             check_interval: int = 10,
             wait_for_pptx: bool = True
     ) -> bool:
-        """Generation tayyor bo'lishini kutish"""
-        elapsed = 0
-
-        logger.info(f"⏳ Kutish: max {timeout_seconds}s, interval {check_interval}s")
-
-        while elapsed < timeout_seconds:
-            status_info = await self.check_status(generation_id)
-
-            if not status_info:
-                logger.warning("⚠️ Status xato, qayta...")
-                await asyncio.sleep(check_interval)
-                elapsed += check_interval
-                continue
-
+        """Generation tayyor bo'lishini kutish (adaptiv interval, umumiy status_mux sikli)"""
+        def is_done(status_info: Dict) -> Optional[bool]:
             status = status_info.get('status', '')
 
             if status == 'failed' or status == 'error':
@@ -338,23 +329,20 @@ class GammaAPI:
                 return False
 
             if status == 'completed':
-                if wait_for_pptx:
-                    pptx_url = status_info.get('pptxUrl', '')
-                    if pptx_url:
-                        logger.info("✅ Tayyor! PPTX URL ham bor!")
-                        return True
-                    else:
-                        logger.info("⏳ Completed, lekin PPTX URL hali yo'q...")
-                else:
+                if not wait_for_pptx:
                     logger.info("✅ Tayyor!")
                     return True
+                if status_info.get('pptxUrl', ''):
+                    logger.info("✅ Tayyor! PPTX URL ham bor!")
+                    return True
+                logger.info("⏳ Completed, lekin PPTX URL hali yo'q...")
 
-            logger.info(f"⏳ {elapsed}s / {timeout_seconds}s (status: {status})")
-            await asyncio.sleep(check_interval)
-            elapsed += check_interval
+            return None
 
-        logger.error(f"⏱️ Timeout: {timeout_seconds}s")
-        return False
+        logger.info(f"⏳ Kutish: max {timeout_seconds}s, interval <= {check_interval}s")
+        return await self.status_mux.wait(
+            generation_id, is_done, timeout=timeout_seconds, max_interval=check_interval
+        )
 
     def format_content_for_gamma(self, content: Dict, content_type: str) -> str:
         """Content'ni Gamma uchun formatlash"""
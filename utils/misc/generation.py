@@ -0,0 +1,209 @@
+# utils/misc/generation.py
+# Ko'p qadamli AI generatsiya: bosqichlar vaqti va parallel bajarish cheklovi
+
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from utils.misc.llm_cache import llm_cache
+from utils.misc.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+# "{generator} {qadam}" bo'yicha latency (masalan "course_work section")
+generation_stats = LatencyStats()
+
+# Streaming progress xabari ko'pi bilan shu oraliqda yangilanadi (Telegram edit limiti)
+STREAM_PROGRESS_INTERVAL = float(os.getenv("STREAM_PROGRESS_INTERVAL", "3"))
+
+
+class GenerationTimer:
+    """
+    Bitta hujjat generatsiyasining qadamlari vaqti.
+
+    Qadamlar parallel bajarilsa ularning yig'indisi umumiy (wall) vaqtdan
+    katta bo'ladi - summary() ikkalasini ham ko'rsatadi.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.steps: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def step(self, label: str, kind: str = None):
+        """label - qadam nomi (log uchun), kind - metrika kaliti (masalan 'section')"""
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.steps[label] = elapsed
+            generation_stats.record(f"{self.name} {kind or label}", elapsed * 1000, error=error)
+
+    @property
+    def wall_time(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        wall = self.wall_time
+        serial = sum(self.steps.values())
+        slowest = sorted(self.steps.items(), key=lambda item: item[1], reverse=True)[:5]
+        return (
+            f"{self.name}: {wall:.1f}s (ketma-ket bo'lganda ~{serial:.1f}s, {len(self.steps)} qadam); "
+            f"eng sekin: " + ", ".join(f"{label}={elapsed:.1f}s" for label, elapsed in slowest)
+        )
+
+
+async def gather_limited(coros: Iterable[Awaitable], limit: int) -> List:
+    """Coroutine'larni bir vaqtda ko'pi bilan `limit` tadan bajarish; natijalar tartibi saqlanadi"""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return list(await asyncio.gather(*(run(coro) for coro in coros)))
+
+
+class TokenProgress:
+    """
+    Streaming generatsiya progressi: bir yoki bir nechta parallel stream'dan
+    kelgan tokenlar va tugagan qadamlar (bo'limlar).
+
+    on_update(progress) ko'pi bilan `interval` soniyada bir marta, alohida
+    task'da chaqiriladi - Telegram'ni kutish token o'qishni sekinlashtirmaydi.
+    Oldingi yangilash hali tugamagan bo'lsa navbatdagisi o'tkazib yuboriladi.
+    """
+
+    def __init__(self, on_update: Callable[["TokenProgress"], Awaitable[None]],
+                 interval: float = STREAM_PROGRESS_INTERVAL, total_steps: int = 0):
+        self.on_update = on_update
+        self.interval = interval
+        self.total_steps = total_steps
+        self.steps_done = 0
+        self.tokens = 0
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self._updated_at = 0.0
+        self._pending: Optional[asyncio.Task] = None
+        self._stopped = False
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def tokens_per_second(self) -> float:
+        if self.first_token_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.first_token_at
+        return self.tokens / elapsed if elapsed > 0 else 0.0
+
+    def add_tokens(self, count: int):
+        """count manfiy bo'lishi mumkin - usage bo'yicha ortiqcha sanalgan tokenlar tuzatiladi"""
+        if count == 0:
+            return
+        if count > 0 and self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.tokens += count
+        self._maybe_update()
+
+    def step_done(self):
+        self.steps_done += 1
+        self._maybe_update()
+
+    def _maybe_update(self):
+        now = time.monotonic()
+        if self._stopped or now - self._updated_at < self.interval or (self._pending and not self._pending.done()):
+            return
+        self._updated_at = now
+        self._pending = asyncio.create_task(self._update())
+
+    async def _update(self):
+        try:
+            await self.on_update(self)
+        except Exception as e:
+            logger.debug(f"Progress yangilashda xato: {e}")
+
+    async def stop(self):
+        """
+        Yangilashlarni to'xtatish: keyingi status (masalan "Fayl shakllantirilmoqda")
+        kechikkan progress edit bilan ustidan yozilmasligi uchun
+        """
+        self._stopped = True
+        if self._pending and not self._pending.done():
+            await self._pending
+
+
+async def complete_chat(client, progress: Optional[TokenProgress] = None, cache: bool = False, **kwargs) -> str:
+    """
+    chat.completions.create -> javob matni.
+
+    progress berilsa stream rejimida: tokenlar kelishi bilan progress'ga
+    qo'shiladi (oxirida usage bo'yicha aniq songa tuzatiladi). Aks holda
+    oddiy so'rov.
+
+    cache=True - javob llm_cache'dan olinadi/saqlanadi (kalit: model,
+    normallashgan xabarlar va parametrlar). Faqat yaroqli javob saqlanadi:
+    bo'sh emas, json_object formatida esa JSON sifatida o'qiladigan.
+    """
+    if not (cache and llm_cache.enabled):
+        return await _request_chat(client, progress, **kwargs)
+
+    key = llm_cache.make_key(kwargs)
+    cached = await llm_cache.get(key)
+    if cached is not None:
+        return cached
+
+    text = await _request_chat(client, progress, **kwargs)
+    if _is_cacheable(text, kwargs.get("response_format")):
+        await llm_cache.put(key, kwargs.get("model", ""), text)
+    return text
+
+
+def _is_cacheable(text: str, response_format: Optional[dict]) -> bool:
+    if not text or not text.strip():
+        return False
+    if (response_format or {}).get("type") == "json_object":
+        try:
+            json.loads(text)
+        except ValueError:
+            return False
+    return True
+
+
+async def _request_chat(client, progress: Optional[TokenProgress] = None, **kwargs) -> str:
+    if progress is None:
+        response = await client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content or ""
+
+    started = time.perf_counter()
+    first_token = True
+    counted = 0
+    parts = []
+    stream = await client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+    async for chunk in stream:
+        if chunk.choices:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token:
+                    first_token = False
+                    generation_stats.record("stream first_token", (time.perf_counter() - started) * 1000)
+                parts.append(delta)
+                # Har bir chunk odatda bitta token
+                counted += 1
+                progress.add_tokens(1)
+        if getattr(chunk, "usage", None) and chunk.usage.completion_tokens:
+            # Ishorali farq: chunk'lar kam ham, ko'p ham sanalgan bo'lishi mumkin
+            progress.add_tokens(chunk.usage.completion_tokens - counted)
+            counted = chunk.usage.completion_tokens
+    return "".join(parts)
@@ -0,0 +1,79 @@
+# utils/misc/http_client.py
+# Uzoq yashovchi aiohttp.ClientSession: keep-alive pool, host bo'yicha limit, endpoint metrikalari
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import aiohttp
+
+from utils.misc.metrics import LatencyStats
+
+# Barcha tashqi API chaqiruvlari: "<client> <METHOD> <endpoint>" kaliti bo'yicha
+http_stats = LatencyStats()
+
+
+class HttpClient:
+    """
+    Bitta tashqi servis uchun umumiy sessiya.
+
+    Har chaqiruvda yangi ClientSession/TCPConnector ochilmaydi - status
+    poll'lari va yuklab olishlar mavjud keep-alive ulanishlarni qayta ishlatadi.
+
+        async with self.http.request("GET", url, endpoint="status") as response:
+            ...
+
+    Sessiya birinchi so'rovda (yoki start() da) yaratiladi, close() da yopiladi.
+    """
+
+    def __init__(self, name: str, timeout: aiohttp.ClientTimeout = None, limit: int = 100,
+                 limit_per_host: int = 20, keepalive_timeout: float = 30, ssl=None,
+                 headers: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.timeout = timeout or aiohttp.ClientTimeout(total=600)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ssl = ssl
+        self.headers = headers
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop = None
+
+    async def start(self):
+        await self.get_session()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+                ssl=self.ssl,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers)
+            self._loop = loop
+        return self._session
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, endpoint: str, **kwargs):
+        """session.request + latency metrikasi (javob tanasi o'qilguncha bo'lgan vaqt)"""
+        session = await self.get_session()
+        started = time.perf_counter()
+        error = False
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                error = response.status >= 500
+                yield response
+        except Exception:
+            error = True
+            raise
+        finally:
+            http_stats.record(f"{self.name} {method} {endpoint}", (time.perf_counter() - started) * 1000, error=error)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
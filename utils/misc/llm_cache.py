@@ -0,0 +1,102 @@
+# utils/misc/llm_cache.py
+# AI javoblari keshi: bir xil (yoki faqat bo'shliq/registrda farq qiladigan) so'rovlar
+# qayta generatsiya qilinmaydi - mashhur mavzular darhol va API xarajatisiz qaytadi
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from utils.db_api.async_database import AsyncDatabase
+from utils.db_api.llm_cache import LLMCacheDatabase
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+# Kalitga kiradigan so'rov parametrlari (stream, stream_options - kirmaydi)
+KEY_PARAMS = ("model", "temperature", "max_tokens", "top_p", "response_format")
+
+
+def normalize_prompt(text: str) -> str:
+    """Ortiqcha bo'shliqlar va registr kalitga ta'sir qilmaydi"""
+    return " ".join(str(text).split()).casefold()
+
+
+class LLMResponseCache:
+    """
+    chat.completions so'rovi -> javob matni, SQLite'da (hajm bo'yicha LRU).
+
+    Kalit - normallashgan xabarlar + model + parametrlar sha256 hash'i, ya'ni
+    kesh kontent bo'yicha adreslanadi. DB chaqiruvlari AsyncDatabase thread
+    pool'ida bajariladi; DB xatosi generatsiyani to'xtatmaydi (errors'ga yoziladi,
+    so'rov keshsiz bajariladi).
+    """
+
+    def __init__(self, db: LLMCacheDatabase, enabled: bool = True):
+        self.db = db
+        self.db_async = AsyncDatabase(db)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(request: Dict) -> str:
+        payload = {name: request.get(name) for name in KEY_PARAMS}
+        payload["messages"] = [
+            (message.get("role"), normalize_prompt(message.get("content", "")))
+            for message in request.get("messages", [])
+        ]
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            response = await self.db_async.get_llm_response(key)
+        except Exception as e:
+            # Xato miss'ga qo'shilmaydi - hit_rate faqat haqiqiy qidiruvlar bo'yicha
+            self._count("errors")
+            logger.warning(f"LLM kesh o'qishda xato: {e}")
+            return None
+        self._count("hits" if response is not None else "misses")
+        return response
+
+    async def put(self, key: str, model: str, response: str):
+        try:
+            evicted = await self.db_async.put_llm_response(key, model, response)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"LLM keshga yozishda xato: {e}")
+            return
+        self._count("stores")
+        if evicted:
+            self._count("evictions", evicted)
+
+    def snapshot(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+llm_cache = LLMResponseCache(
+    LLMCacheDatabase(path_to_db=os.getenv("LLM_CACHE_DB", "data/cache.db"), max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024),
+    enabled=LLM_CACHE_ENABLED,
+)
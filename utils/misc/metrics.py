@@ -0,0 +1,91 @@
+# utils/misc/metrics.py
+# Jarayon ichidagi oddiy metrikalar: kalit bo'yicha hisoblagich va latency gistogrammasi
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Gistogramma chegaralari (millisekund)
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyStats:
+    """
+    Kalit (so'rov shabloni, endpoint, ...) bo'yicha chaqiruvlar soni,
+    xatolar, umumiy/maksimal vaqt va latency gistogrammasi.
+    Thread-safe: DB thread pool'idan ham, event loop'dan ham yozish mumkin.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+
+    def record(self, key: str, elapsed_ms: float, error: bool = False):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    'count': 0,
+                    'errors': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'histogram': [0] * (len(self.buckets) + 1),
+                }
+            entry['count'] += 1
+            if error:
+                entry['errors'] += 1
+            entry['total_ms'] += elapsed_ms
+            if elapsed_ms > entry['max_ms']:
+                entry['max_ms'] = elapsed_ms
+            entry['histogram'][self._bucket_index(elapsed_ms)] += 1
+
+    def _bucket_index(self, elapsed_ms: float) -> int:
+        for i, bound in enumerate(self.buckets):
+            if elapsed_ms <= bound:
+                return i
+        return len(self.buckets)
+
+    def _percentile(self, histogram: List[int], count: int, q: float) -> Optional[float]:
+        """
+        Gistogramma bo'yicha taxminiy percentil (bucket yuqori chegarasi).
+        Oxirgi chegaradan oshsa None.
+        """
+        if not count:
+            return 0.0
+        threshold = q * count
+        cumulative = 0
+        for i, n in enumerate(histogram):
+            cumulative += n
+            if cumulative >= threshold:
+                return float(self.buckets[i]) if i < len(self.buckets) else None
+        return None
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            entries = {key: dict(entry, histogram=list(entry['histogram'])) for key, entry in self._entries.items()}
+
+        result = {}
+        for key, entry in entries.items():
+            count = entry['count']
+            histogram = entry['histogram']
+            labels = [f"<={b}ms" for b in self.buckets] + [f">{self.buckets[-1]}ms"]
+            result[key] = {
+                'count': count,
+                'errors': entry['errors'],
+                'total_ms': round(entry['total_ms'], 3),
+                'avg_ms': round(entry['total_ms'] / count, 3) if count else 0.0,
+                'max_ms': round(entry['max_ms'], 3),
+                'p50_ms': self._percentile(histogram, count, 0.5),
+                'p95_ms': self._percentile(histogram, count, 0.95),
+                'histogram': {label: n for label, n in zip(labels, histogram) if n},
+            }
+        return result
+
+    def top(self, limit: int = 10, by: str = 'total_ms') -> List[Tuple[str, dict]]:
+        """Eng "qimmat" kalitlar (default: umumiy vaqt bo'yicha)"""
+        items = sorted(self.snapshot().items(), key=lambda kv: kv[1][by], reverse=True)
+        return items[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
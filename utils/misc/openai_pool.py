@@ -0,0 +1,293 @@
+# utils/misc/openai_pool.py
+# Barcha AI generatorlar uchun umumiy OpenAI klient: RPM/TPM limiti, ustuvorlik navbati
+# (pullik task'lar oldin), Retry-After bilan qayta urinish va funksiya bo'yicha token hisobi
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+from openai import (
+    APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, RateLimitError,
+)
+
+from utils.misc.metrics import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+# Kalit (organization) limitlari - OpenAI dashboard'dagi qiymatlardan biroz past qo'ying
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+
+# Ustuvorlik yo'laklari: kichik son - oldin
+PRIORITY_PAID = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_FREE = 2
+LANE_NAMES = {PRIORITY_PAID: "paid", PRIORITY_DEFAULT: "default", PRIORITY_FREE: "free"}
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+# Joriy task'ning yo'lagi - asyncio task'lariga (gather, create_task) avtomatik o'tadi
+_current_priority: ContextVar[int] = ContextVar("openai_priority", default=PRIORITY_DEFAULT)
+
+
+@contextmanager
+def openai_priority(priority: int):
+    """
+    Blok ichidagi barcha OpenAI so'rovlari shu yo'lakda navbatga turadi:
+
+        with openai_priority(PRIORITY_PAID):
+            content = await generator.generate_course_work_content(...)
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def estimate_tokens(request: Dict) -> int:
+    """So'rovga ajratiladigan token: prompt (~3 belgi = 1 token) + max_tokens"""
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in request.get("messages", []))
+    return prompt_chars // 3 + int(request.get("max_tokens") or 1024)
+
+
+class TokenBudget:
+    """
+    Ikki token bucket - so'rov/daqiqa va token/daqiqa - hamda ustuvorlik navbati.
+
+    So'rov ikkala bucket'da joy bo'lganda o'tadi; navbat boshidagi (eng yuqori
+    ustuvorlikdagi, keyin eng eski) so'rov o'tmaguncha pastdagilar kutadi -
+    bepul task'lar pullik task'larni hech qachon quvib o'tmaydi.
+    Token bucket oldindan taxmin bilan kamaytiriladi, javobdagi usage bilan
+    settle() orqali tuzatiladi.
+    """
+
+    def __init__(self, rpm: int = OPENAI_RPM, tpm: int = OPENAI_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+        self._updated_at = now
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_DEFAULT):
+        future = asyncio.get_running_loop().create_future()
+        # Bucket'dan katta so'rov hech qachon o'tmay qolmasligi uchun
+        heapq.heappush(self._waiters, (priority, next(self._sequence), min(tokens, self.tpm), future))
+        self._dispatch()
+        await future
+
+    def pause(self, seconds: float):
+        """429 - kalit bo'yicha limit, barcha so'rovlar birga to'xtaydi"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._dispatch()
+
+    def settle(self, reserved: int, used: int):
+        """Taxminiy va haqiqiy token farqini qaytarish (yoki qarzga yozish)"""
+        self._tokens = min(self.tpm, self._tokens + reserved - used)
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        now = time.monotonic()
+        self._refill(now)
+        delay = None
+        while self._waiters:
+            priority, _, tokens, future = self._waiters[0]
+            if future.done():
+                # Kutayotgan task bekor qilingan
+                heapq.heappop(self._waiters)
+                continue
+            if now < self._paused_until:
+                delay = self._paused_until - now
+                break
+            if self._requests >= 1 and self._tokens >= tokens:
+                heapq.heappop(self._waiters)
+                self._requests -= 1
+                self._tokens -= tokens
+                future.set_result(None)
+                continue
+            delay = max((1 - self._requests) * 60 / self.rpm, (tokens - self._tokens) * 60 / self.tpm)
+            break
+
+        if delay is not None:
+            self._timer = asyncio.get_running_loop().call_later(max(delay, 0.01), self._dispatch)
+
+
+class _UsageStream:
+    """Stream chunk'larini o'zgartirmasdan uzatadi, oxirgi usage chunk'ini hisobga yozadi"""
+
+    def __init__(self, stream, on_usage):
+        self._stream = stream
+        self._on_usage = on_usage
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        usage = None
+        async for chunk in self._stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            yield chunk
+        self._on_usage(usage)
+
+
+class PooledClient:
+    """
+    AsyncOpenAI o'rniga ishlatiladi - client.chat.completions.create(...) chaqiruvlari
+    umumiy pool (limit, navbat, qayta urinish, hisob) orqali o'tadi.
+    """
+
+    def __init__(self, pool: "OpenAIPool", api_key: str, feature: str):
+        self.pool = pool
+        self.api_key = api_key
+        self.feature = feature
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        return await self.pool.create(self.api_key, self.feature, **kwargs)
+
+
+class OpenAIPool:
+    """
+    API kalit bo'yicha bitta AsyncOpenAI (umumiy httpx ulanishlar puli) va
+    jarayon bo'yicha bitta TokenBudget.
+
+        self.client = openai_pool.client(api_key, feature="course_work")
+
+    SDK'ning o'z retry'i o'chirilgan (max_retries=0) - qayta urinishlar shu yerda,
+    budget bilan kelishilgan holda bajariladi.
+    """
+
+    def __init__(self, rpm: int = OPENAI_RPM, tpm: int = OPENAI_TPM, max_retries: int = OPENAI_MAX_RETRIES):
+        self.budget = TokenBudget(rpm, tpm)
+        self.max_retries = max_retries
+        self.wait_stats = LatencyStats()
+        self._clients: Dict[str, AsyncOpenAI] = {}
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def client(self, api_key: str, feature: str) -> PooledClient:
+        return PooledClient(self, api_key, feature)
+
+    def _raw_client(self, api_key: str) -> AsyncOpenAI:
+        client = self._clients.get(api_key)
+        if client is None:
+            client = self._clients[api_key] = AsyncOpenAI(api_key=api_key, max_retries=0)
+        return client
+
+    def _count(self, feature: str, **values):
+        with self._lock:
+            usage = self._usage.setdefault(feature, {
+                'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                'retries': 0, 'rate_limited': 0, 'errors': 0,
+            })
+            for name, value in values.items():
+                usage[name] += value
+
+    def _record_usage(self, feature: str, reserved: int, usage):
+        if usage is None:
+            # Usage kelmadi (masalan stream oxirigacha o'qilmadi) - taxmin qoladi
+            return
+        self._count(feature, prompt_tokens=usage.prompt_tokens or 0, completion_tokens=usage.completion_tokens or 0)
+        self.budget.settle(reserved, (usage.prompt_tokens or 0) + (usage.completion_tokens or 0))
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    async def create(self, api_key: str, feature: str, **kwargs):
+        """chat.completions.create - navbat, limit va qayta urinish bilan"""
+        client = self._raw_client(api_key)
+        priority = _current_priority.get()
+        reserved = estimate_tokens(kwargs)
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            await self.budget.acquire(reserved, priority)
+            self.wait_stats.record(LANE_NAMES.get(priority, str(priority)), (time.perf_counter() - started) * 1000)
+            self._count(feature, requests=1)
+            try:
+                response = await client.chat.completions.create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                rate_limited = isinstance(e, RateLimitError)
+                if not rate_limited:
+                    # So'rov bajarilmadi - ajratilgan tokenlar qaytariladi
+                    self.budget.settle(reserved, 0)
+                if rate_limited and getattr(e, "code", None) == "insufficient_quota":
+                    # Balans tugagan - qayta urinish foydasiz
+                    self._count(feature, rate_limited=1, errors=1)
+                    raise
+                delay = self._retry_after(e) or min(60.0, 2 ** attempt + random.random())
+                if rate_limited:
+                    self._count(feature, rate_limited=1)
+                    self.budget.pause(delay)
+                if attempt == self.max_retries:
+                    self._count(feature, errors=1)
+                    raise
+                self._count(feature, retries=1)
+                logger.warning(f"OpenAI {feature}: {type(e).__name__}, {delay:.1f}s dan keyin qayta "
+                               f"(urinish {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                self.budget.settle(reserved, 0)
+                self._count(feature, errors=1)
+                raise
+
+            if kwargs.get("stream"):
+                return _UsageStream(response, lambda usage: self._record_usage(feature, reserved, usage))
+            self._record_usage(feature, reserved, getattr(response, "usage", None))
+            return response
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            usage = {feature: dict(values) for feature, values in self._usage.items()}
+        return {
+            'rpm': self.budget.rpm,
+            'tpm': self.budget.tpm,
+            'queued': self.budget.queued,
+            'features': usage,
+            'wait': self.wait_stats.snapshot(),
+        }
+
+    async def close(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.close()
+
+
+openai_pool = OpenAIPool()
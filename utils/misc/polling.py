@@ -0,0 +1,248 @@
+# utils/misc/polling.py
+# Generation status'ini kutish: adaptiv interval + bitta sikl ichida ko'p job'ni poll qilish
+
+import asyncio
+import logging
+import random
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePoller:
+    """
+    Keyingi poll'gacha kutish vaqti.
+
+    - holat o'zgarmasa interval eksponensial oshadi (initial -> max_interval)
+    - holat o'zgarsa (masalan, completed lekin PPTX hali yo'q) yana tez poll qilinadi
+    - server maslahati (Retry-After, progress bo'yicha ETA) bo'lsa o'shanga amal qilinadi
+    - jitter: ko'p job bir vaqtda serverga urilmasligi uchun
+    """
+
+    def __init__(self, initial_interval: float = 2.0, max_interval: float = 15.0,
+                 factor: float = 1.6, jitter: float = 0.2):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self._interval = initial_interval
+
+    def reset(self):
+        self._interval = self.initial_interval
+
+    def next_delay(self, changed: bool = False, hint: float = None) -> float:
+        if changed:
+            self.reset()
+
+        if hint is not None and hint > 0:
+            delay = min(max(hint, self.initial_interval), self.max_interval)
+        else:
+            delay = self._interval
+            self._interval = min(self._interval * self.factor, self.max_interval)
+
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class PollStats:
+    """Client bo'yicha: job'lar, poll'lar va "bo'sh" poll'lar (holat o'zgarmagan) soni"""
+
+    def __init__(self):
+        self._clients: Dict[str, dict] = {}
+
+    def record_job(self, client: str, outcome: str, polls: int, wasted: int, elapsed: float):
+        entry = self._clients.setdefault(client, {
+            'jobs': 0, 'completed': 0, 'failed': 0, 'timeout': 0, 'error': 0,
+            'polls': 0, 'wasted_polls': 0, 'total_wait_seconds': 0.0,
+        })
+        entry['jobs'] += 1
+        entry[outcome] += 1
+        entry['polls'] += polls
+        entry['wasted_polls'] += wasted
+        entry['total_wait_seconds'] += elapsed
+
+    def snapshot(self) -> Dict[str, dict]:
+        result = {}
+        for client, entry in self._clients.items():
+            jobs = entry['jobs'] or 1
+            result[client] = dict(
+                entry,
+                total_wait_seconds=round(entry['total_wait_seconds'], 1),
+                polls_per_job=round(entry['polls'] / jobs, 2),
+                wasted_per_job=round(entry['wasted_polls'] / jobs, 2),
+                avg_wait_seconds=round(entry['total_wait_seconds'] / jobs, 1),
+            )
+        return result
+
+
+poll_stats = PollStats()
+
+
+class _Job:
+    def __init__(self, generation_id: str, is_done, deadline: float, poller: AdaptivePoller):
+        self.generation_id = generation_id
+        self.is_done = is_done
+        self.deadline = deadline
+        self.poller = poller
+        self.future = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+        self.started = time.monotonic()
+        self.next_at = self.started
+        self.last_state = None
+        self.polls = 0
+        self.wasted = 0
+
+
+class StatusMultiplexer:
+    """
+    Bir client'ning barcha kutilayotgan generation'larini bitta siklda poll qilish.
+
+        ok = await mux.wait(generation_id, is_done, timeout=600)
+
+    is_done(status_info) -> True (tayyor), False (xato, to'xtatish) yoki None (kutish).
+    check_status(generation_id) natijasida ixtiyoriy 'retry_after' va 'progress'
+    maydonlari bo'lsa, interval ularga moslashadi.
+    """
+
+    def __init__(self, check_status: Callable, name: str, max_concurrency: int = 10,
+                 initial_interval: float = 2.0):
+        self.check_status = check_status
+        self.name = name
+        self.initial_interval = initial_interval
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._jobs: Dict[str, _Job] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def wait(self, generation_id: str, is_done: Callable[[dict], Optional[bool]],
+                   timeout: float = 600, max_interval: float = 15.0) -> bool:
+        job = self._jobs.get(generation_id)
+        if job is None:
+            poller = AdaptivePoller(initial_interval=self.initial_interval, max_interval=max_interval)
+            job = _Job(generation_id, is_done, time.monotonic() + timeout, poller)
+            self._jobs[generation_id] = job
+            self._ensure_running()
+        # Zaxira: sikl biror sabab bilan to'xtab qolsa ham kutuvchi abadiy osilib qolmaydi.
+        # shield - bir xil generation'ni kutayotgan boshqa chaqiruvchilarning future'i bekor qilinmasin
+        job.waiters += 1
+        try:
+            backstop = max(job.deadline - time.monotonic(), 0) + 30
+            return await asyncio.wait_for(asyncio.shield(job.future), timeout=backstop)
+        except asyncio.TimeoutError:
+            logger.error(f"⏱️ {self.name} kutish muddati tugadi (sikl javob bermadi): {generation_id}")
+            self._finish(job, False, 'timeout')
+            return False
+        except asyncio.CancelledError:
+            # Oxirgi kutuvchi bekor qilindi (lease yo'qoldi, drain) - job endi poll qilinmaydi
+            if job.waiters == 1 and not job.future.done():
+                job.future.cancel()
+                if self._wakeup is not None:
+                    self._wakeup.set()
+            raise
+        finally:
+            job.waiters -= 1
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._wakeup is None or self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        try:
+            await self._loop()
+        except Exception as e:
+            logger.error(f"❌ {self.name} poll sikli to'xtadi: {e}")
+        finally:
+            # Sikl kutilmagan xato bilan to'xtasa - qolgan kutuvchilar ham yakunlanadi
+            for job in list(self._jobs.values()):
+                self._finish(job, False, 'error')
+
+    async def _loop(self):
+        while self._jobs:
+            self._wakeup.clear()
+            now = time.monotonic()
+
+            # Kutuvchisi bekor qilingan job'lar (masalan, worker task cancel) poll qilinmaydi
+            for generation_id in [g for g, j in self._jobs.items() if j.future.done()]:
+                self._jobs.pop(generation_id, None)
+            if not self._jobs:
+                break
+
+            for job in [j for j in self._jobs.values() if j.deadline <= now]:
+                logger.error(f"⏱️ {self.name} timeout: {job.generation_id} ({job.polls} poll)")
+                self._finish(job, False, 'timeout')
+
+            due = [j for j in self._jobs.values() if j.next_at <= now]
+            if due:
+                await asyncio.gather(*[self._poll(job) for job in due])
+
+            if not self._jobs:
+                break
+
+            sleep_for = max(min(min(j.next_at, j.deadline) for j in self._jobs.values()) - time.monotonic(), 0)
+            try:
+                # Yangi job qo'shilsa darhol uyg'onadi
+                await asyncio.wait_for(self._wakeup.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, job: _Job):
+        async with self._semaphore:
+            try:
+                status_info = await self.check_status(job.generation_id)
+            except Exception as e:
+                logger.warning(f"{self.name} status xato ({job.generation_id}): {e}")
+                status_info = None
+
+        job.polls += 1
+
+        if status_info:
+            try:
+                done = job.is_done(status_info)
+            except Exception as e:
+                logger.error(f"{self.name} status tahlilida xato ({job.generation_id}): {e}")
+                self._finish(job, False, 'error')
+                return
+            if done is not None:
+                self._finish(job, done, 'completed' if done else 'failed')
+                return
+
+        state = (status_info or {}).get('status'), bool((status_info or {}).get('pptxUrl')), \
+            (status_info or {}).get('progress')
+        changed = job.polls > 1 and state != job.last_state
+        if job.polls > 1 and not changed:
+            job.wasted += 1
+        job.last_state = state
+
+        job.next_at = time.monotonic() + job.poller.next_delay(changed=changed, hint=self._hint(job, status_info))
+
+    @staticmethod
+    def _hint(job: _Job, status_info: Optional[dict]) -> Optional[float]:
+        """Server maslahati: Retry-After yoki progress bo'yicha qolgan vaqtning yarmi"""
+        if not status_info:
+            return None
+
+        retry_after = status_info.get('retry_after')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except (TypeError, ValueError):
+                pass
+
+        progress = status_info.get('progress')
+        if isinstance(progress, (int, float)) and 0 < progress < 100:
+            elapsed = time.monotonic() - job.started
+            remaining = elapsed * (100 - progress) / progress
+            return remaining / 2
+        return None
+
+    def _finish(self, job: _Job, result: bool, outcome: str):
+        self._jobs.pop(job.generation_id, None)
+        elapsed = time.monotonic() - job.started
+        poll_stats.record_job(self.name, outcome, job.polls, job.wasted, elapsed)
+        logger.info(f"📡 {self.name} {job.generation_id}: {outcome}, {job.polls} poll "
+                    f"({job.wasted} bo'sh), {elapsed:.0f}s")
+        if not job.future.done():
+            job.future.set_result(result)
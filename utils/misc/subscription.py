@@ -1,25 +1,132 @@
 # utils/misc/subscription.py
 # Kanal obunasini tekshirish
 
-from typing import Union
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple, Union
 from aiogram import Bot
 from aiogram.utils.exceptions import ChatNotFound, Unauthorized, BotKicked, BadRequest
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Obuna bo'lmagan deb hisoblanadigan statuslar
+NOT_SUBSCRIBED_STATUSES = ('left', 'kicked', 'restricted')
+BOT_ADMIN_STATUSES = ('administrator', 'creator')
 
-async def check(user_id: int, channel: Union[int, str], bot: Bot = None) -> bool:
+
+def is_subscribed_status(status: str) -> bool:
+    """'member', 'administrator', 'creator' - obuna bo'lgan"""
+    return status not in NOT_SUBSCRIBED_STATUSES
+
+
+class SubscriptionCache:
     """
-    Foydalanuvchi kanalga obuna bo'lganligini tekshirish
+    (user_id, channel) -> obuna holati, TTL bilan.
 
-    Args:
-        user_id: Telegram user ID
-        channel: Kanal ID yoki username
-        bot: Bot instance (optional, agar berilmasa loader'dan oladi)
+    - obuna bo'lgan (positive) natija uzoq saqlanadi: odatda user kanaldan chiqmaydi
+    - obuna bo'lmagan (negative) natija qisqa: user obuna bo'lib qaytib keladi
+    - Telegram xatosi bo'lsa (fail-open) natija negative TTL bilan saqlanadi,
+      shunda buzilgan kanal har update'da API'ga urilmaydi
+    - userlar soni max_users dan oshsa eng eski userlar chiqarib yuboriladi
+
+    "Jonli" kanallar - bot admin bo'lib chat_member update'larini oladigan
+    kanallar. Ularda har bir kirish/chiqish update sifatida keladi va keshni
+    o'zi yangilaydi, shuning uchun natijalar index_ttl davomida saqlanadi
+    (subscription indeksi); get_chat_member faqat kesh miss bo'lganda chaqiriladi.
+    """
+
+    def __init__(self, positive_ttl: float = 300.0, negative_ttl: float = 15.0,
+                 index_ttl: float = 6 * 3600.0, max_users: int = 100_000):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.index_ttl = index_ttl
+        self.max_users = max_users
+        self._users: "OrderedDict[int, Dict[str, Tuple[float, bool]]]" = OrderedDict()
+        self._live_channels = set()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(channel: Union[int, str]) -> str:
+        return str(channel)
+
+    def get(self, user_id: int, channel: Union[int, str]) -> Optional[bool]:
+        entry = self._users.get(user_id, {}).get(self._key(channel))
+        if entry is None or entry[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, user_id: int, channel: Union[int, str], subscribed: bool, ttl: float = None):
+        if ttl is None:
+            if self.is_live(channel):
+                ttl = self.index_ttl
+            else:
+                ttl = self.positive_ttl if subscribed else self.negative_ttl
+        channels = self._users.get(user_id)
+        if channels is None:
+            channels = self._users[user_id] = {}
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        channels[self._key(channel)] = (time.monotonic() + ttl, subscribed)
+
+    def invalidate_user(self, user_id: int):
+        self._users.pop(user_id, None)
+
+    def invalidate_channel(self, channel: Union[int, str]):
+        key = self._key(channel)
+        for channels in self._users.values():
+            channels.pop(key, None)
+
+    def is_live(self, channel: Union[int, str]) -> bool:
+        return self._key(channel) in self._live_channels
+
+    def mark_live(self, channel: Union[int, str], live: bool = True):
+        """Kanaldan chat_member update'lari keladimi (bot adminmi)"""
+        key = self._key(channel)
+        if live:
+            self._live_channels.add(key)
+        elif key in self._live_channels:
+            # Update'lar endi kelmaydi - uzoq saqlangan natijalarga ishonib bo'lmaydi
+            self._live_channels.discard(key)
+            self.invalidate_channel(channel)
+
+    def clear(self):
+        self._users.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'users': len(self._users),
+            'live_channels': len(self._live_channels),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+cache = SubscriptionCache(
+    positive_ttl=float(os.getenv("SUBSCRIPTION_CACHE_TTL", "300")),
+    negative_ttl=float(os.getenv("SUBSCRIPTION_NEGATIVE_TTL", "15")),
+    index_ttl=float(os.getenv("SUBSCRIPTION_INDEX_TTL", "21600")),
+)
+
+# Bir xil (user, kanal) uchun parallel so'rovlar bitta get_chat_member'ni kutadi
+_inflight: Dict[Tuple[int, str], "asyncio.Future"] = {}
+
+
+async def _fetch(user_id: int, channel: Union[int, str], bot: Bot = None) -> Tuple[bool, bool]:
+    """
+    Telegram'dan so'rash.
 
     Returns:
-        bool: True - obuna bo'lgan, False - obuna bo'lmagan
+        (obuna bo'lganmi, natija aniqmi) - xato bo'lsa (True, False)
     """
     try:
         # Bot instance olish
@@ -29,33 +136,98 @@ async def check(user_id: int, channel: Union[int, str], bot: Bot = None) -> bool
         member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
 
         # Obuna holatini tekshirish
-        if member.status in ['left', 'kicked', 'restricted']:
-            return False
-
-        # 'member', 'administrator', 'creator' - obuna bo'lgan
-        return True
+        return is_subscribed_status(member.status), True
 
     except ChatNotFound:
         # Kanal topilmadi - botni kanaldan olib tashlashgan
         logger.warning(f"⚠️ Kanal topilmadi: {channel}")
-        return True  # Xato bo'lsa, user'ni o'tkazamiz
+        return True, False  # Xato bo'lsa, user'ni o'tkazamiz
 
     except Unauthorized:
         # Bot kanalda yo'q yoki ban qilingan
         logger.warning(f"⚠️ Bot kanalda yo'q: {channel}")
-        return True  # Xato bo'lsa, user'ni o'tkazamiz
+        return True, False  # Xato bo'lsa, user'ni o'tkazamiz
 
     except BotKicked:
         # Bot kanaldan chiqarilgan
         logger.warning(f"⚠️ Bot kanaldan chiqarilgan: {channel}")
-        return True
+        return True, False
 
     except BadRequest as e:
         # Noto'g'ri so'rov
         logger.warning(f"⚠️ BadRequest: {channel} - {e}")
-        return True
+        return True, False
 
     except Exception as e:
         # Boshqa xatolar
         logger.error(f"❌ Obuna tekshirishda xato: {channel} - {e}")
-        return True  # Xato bo'lsa, user'ni o'tkazamiz (UX uchun yaxshi)
\ No newline at end of file
+        return True, False  # Xato bo'lsa, user'ni o'tkazamiz (UX uchun yaxshi)
+
+
+async def check(user_id: int, channel: Union[int, str], bot: Bot = None, use_cache: bool = True) -> bool:
+    """
+    Foydalanuvchi kanalga obuna bo'lganligini tekshirish
+
+    Args:
+        user_id: Telegram user ID
+        channel: Kanal ID yoki username
+        bot: Bot instance (optional, agar berilmasa loader'dan oladi)
+        use_cache: False - keshni chetlab Telegram'dan so'rash (natija baribir keshga yoziladi)
+
+    Returns:
+        bool: True - obuna bo'lgan, False - obuna bo'lmagan
+    """
+    if use_cache:
+        cached = cache.get(user_id, channel)
+        if cached is not None:
+            return cached
+
+    key = (user_id, str(channel))
+    pending = _inflight.get(key)
+    if pending is not None:
+        await asyncio.wait({pending})
+        if not pending.cancelled():
+            return pending.result()
+        # So'ragan task bekor qilindi - o'zimiz so'raymiz
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        subscribed, definitive = await _fetch(user_id, channel, bot)
+        cache.set(user_id, channel, subscribed, ttl=None if definitive else cache.negative_ttl)
+        future.set_result(subscribed)
+        return subscribed
+    finally:
+        if not future.done():
+            future.cancel()
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def record_member_update(user_id: int, channel: Union[int, str], status: str):
+    """chat_member update'idan indeksni yangilash"""
+    cache.mark_live(channel)
+    cache.set(user_id, channel, is_subscribed_status(status))
+
+
+async def sync_live_channels(channels: Iterable[Union[int, str]], bot: Bot = None) -> int:
+    """
+    Bot qaysi kanallarda admin ekanini tekshirish (startup'da).
+    Admin bo'lmagan kanallarda chat_member update'lari kelmaydi - TTL kesh ishlaydi.
+    """
+    if bot is None:
+        from loader import bot
+
+    async def bot_status(channel):
+        try:
+            member = await bot.get_chat_member(chat_id=channel, user_id=bot.id)
+            return member.status
+        except Exception as e:
+            logger.warning(f"⚠️ Bot statusini olib bo'lmadi: {channel} - {e}")
+            return None
+
+    channels = list(channels)
+    statuses = await asyncio.gather(*(bot_status(channel) for channel in channels))
+    for channel, status in zip(channels, statuses):
+        cache.mark_live(channel, status in BOT_ADMIN_STATUSES)
+    return sum(1 for channel in channels if cache.is_live(channel))
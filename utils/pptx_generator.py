@@ -242,6 +242,7 @@ class ProPPTXGenerator:
         content: Dict,
         output_path: str,
         pixabay_api_key: str = None,
+        render_pool=None,
     ) -> bool:
         """
         Professional PPTX yaratish
@@ -250,6 +251,7 @@ class ProPPTXGenerator:
             content: GPT-4o dan kelgan content dict
             output_path: Chiqish fayl yo'li
             pixabay_api_key: Pixabay API kaliti (ixtiyoriy)
+            render_pool: RenderPool (ixtiyoriy) — _build alohida process'da bajariladi
 
         Returns:
             True — muvaffaqiyatli
@@ -259,7 +261,11 @@ class ProPPTXGenerator:
             images = await self._fetch_images(content, pixabay_api_key)
 
             # 2. PPTX yaratish
-            self._build(content, images, output_path)
+            if render_pool is not None:
+                from utils.render_pool import render_presentation
+                await render_pool.run(render_presentation, self.theme_name, content, images, output_path)
+            else:
+                self._build(content, images, output_path)
 
             # 3. Vaqtinchalik rasmlarni tozalash
             for img_path in images.values():
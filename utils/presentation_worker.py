@@ -5,12 +5,23 @@
 import asyncio
 import logging
 import json
+import math
 import os
+import socket
+import time
+import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 from aiogram import Bot
 from aiogram.types import InputFile
 
+from utils.render_pool import (
+    render_pool as default_render_pool, render_course_work, post_process_presentation
+)
+from utils.misc.generation import TokenProgress
+from utils.misc.openai_pool import PRIORITY_FREE, PRIORITY_PAID, openai_priority
+from utils.task_events import task_notifier
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,14 +33,53 @@ class PresentationWorker:
     ✅ Mustaqil ish (DOCX/PDF) - YANGI
     """
 
-    def __init__(self, bot: Bot, user_db, content_generator, presenton_api):
+    # Bir vaqtda bajariladigan task'lar soni - tur bo'yicha (presentation_type)
+    DEFAULT_CONCURRENCY = {'basic': 4, 'pitch_deck': 2, 'course_work': 2}
+    FALLBACK_CONCURRENCY = 2
+
+    # Kutish vaqtini baholash uchun boshlang'ich o'rtacha davomiylik (soniya)
+    DEFAULT_DURATIONS = {'basic': 90, 'pitch_deck': 120, 'course_work': 240}
+    FALLBACK_DURATION = 120
+
+    # Navbat xabarlari: bir o'tishda nechta yangi xabar, qancha vaqtda bir yangilash
+    QUEUE_NOTICE_BATCH = 20
+    QUEUE_NOTICE_INTERVAL = 30
+
+    def __init__(self, bot: Bot, user_db, content_generator, presenton_api, recovery_interval: int = 60,
+                 lease_seconds: int = 300, heartbeat_interval: int = 60, claim_batch_size: int = 10,
+                 max_attempts: int = 3, concurrency: Dict[str, int] = None, render_pool=None):
         self.bot = bot
+        # AsyncDatabase(UserDatabase) - DB chaqiruvlari event loop'ni bloklamaydi
         self.user_db = user_db
         self.content_generator = content_generator
         self.presenton_api = presenton_api
         self.is_running = False
         self.worker_task = None
 
+        # Yangi task'lar task_notifier orqali darhol keladi; DB sweep faqat
+        # restart'dan keyin qolib ketgan task'larni topish uchun
+        self.recovery_interval = recovery_interval
+        self.in_flight = {}  # task_uuid -> asyncio.Task
+
+        # Task'lar atomar egallanadi (claim) va lease heartbeat bilan ushlab turiladi.
+        # Worker o'lsa lease tugaydi va task boshqa worker'ga (yoki restart'ga) qaytadi.
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.claim_batch_size = claim_batch_size
+        self.max_attempts = max_attempts
+
+        # Tur bo'yicha limitlar - 200 ta task kelsa ham OpenAI/Presenton va xotira
+        # faqat limit qadar yuklanadi, qolganlari navbatda kutadi
+        self.concurrency = dict(self.DEFAULT_CONCURRENCY, **(concurrency or {}))
+        self.in_flight_types = {}  # task_uuid -> presentation_type
+        self.avg_durations = dict(self.DEFAULT_DURATIONS)
+        self.queue_messages = {}  # task_uuid -> navbat xabari (chat_id, message_id, ...)
+        self._report_task = None
+
+        # PPTX/DOCX yig'ish (python-pptx/python-docx) alohida process'larda
+        self.render_pool = render_pool or default_render_pool
+
         # Course work tools
         self.course_work_generator = None
         self.docx_generator = None
@@ -110,28 +160,272 @@ class PresentationWorker:
                 await self.worker_task
             except asyncio.CancelledError:
                 pass
+
+        if self._report_task and not self._report_task.done():
+            self._report_task.cancel()
+
+        running = list(self.in_flight.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+        # Tugamagan task'lar lease kutmasdan navbatga qaytadi
+        try:
+            released = await self.user_db.release_worker_tasks(self.worker_id)
+            if released:
+                logger.info(f"↩️ {released} ta task navbatga qaytarildi")
+        except Exception as e:
+            logger.error(f"Task'larni qaytarishda xato: {e}")
         logger.info("❌ Presentation Worker to'xtatildi")
 
+    async def drain(self, timeout: float = 120):
+        """
+        Graceful drain (SIGTERM): yangi task olinmaydi, bajarilayotganlari
+        timeout ichida tugashi kutiladi. Keyin stop() qolganlarini navbatga qaytaradi.
+        """
+        self.is_running = False
+        if self.worker_task:
+            self.worker_task.cancel()
+            try:
+                await self.worker_task
+            except asyncio.CancelledError:
+                pass
+            self.worker_task = None
+
+        running = list(self.in_flight.values())
+        if running:
+            logger.info(f"⏳ {len(running)} ta task tugashi kutilmoqda (maks. {timeout} s)")
+            done, pending = await asyncio.wait(running, timeout=timeout)
+            if pending:
+                logger.warning(f"⚠️ {len(pending)} ta task tugamadi - navbatga qaytariladi")
+
     async def _process_queue(self):
-        """Queue'dan task'larni olish"""
+        """Queue'dan task'larni olish - signal bo'yicha darhol, aks holda sekin sweep"""
         logger.info("Worker queue processing boshlandi")
 
         while self.is_running:
             try:
-                pending_tasks = self.user_db.get_pending_tasks()
+                # Signal DB o'qilishidan oldin tozalanadi - oraliqda kelgan task yo'qolmaydi
+                task_notifier.clear()
+                await self._reclaim_expired()
+
+                depth = await self.user_db.get_queue_depth()
+                has_more = False
+                waiting = 0
+
+                for task_type, pending in depth.items():
+                    free = self._limit(task_type) - self._running(task_type)
+                    if free <= 0:
+                        waiting += pending
+                        continue
+
+                    claimed = await self.user_db.claim_pending_tasks(
+                        self.worker_id, limit=min(free, self.claim_batch_size),
+                        lease_seconds=self.lease_seconds, presentation_type=task_type
+                    )
+                    if claimed:
+                        logger.info(f"🔄 {len(claimed)} ta '{task_type}' task egallandi")
+                        for task_data in claimed:
+                            self._spawn(task_data)
+
+                    waiting += max(pending - len(claimed), 0)
+                    # To'liq batch va bo'sh joy hali bor - navbatda yana task bo'lishi mumkin
+                    if len(claimed) >= self.claim_batch_size and free > len(claimed):
+                        has_more = True
 
-                if pending_tasks:
-                    logger.info(f"🔄 {len(pending_tasks)} ta task topildi")
+                if has_more:
+                    continue
 
-                    tasks = [self._process_task(task_data) for task_data in pending_tasks]
-                    await asyncio.gather(*tasks, return_exceptions=True)
+                if waiting or self.queue_messages:
+                    self._schedule_queue_report()
 
-                await asyncio.sleep(5)
+                # Yangi task yoki bo'shagan slot signal beradi
+                await task_notifier.wait(timeout=self.recovery_interval)
 
             except Exception as e:
                 logger.error(f"Worker queue xato: {e}")
                 await asyncio.sleep(10)
 
+    async def _reclaim_expired(self):
+        """Lease'i tugagan task'lar: qayta navbatga yoki (urinishlar tugasa) refund"""
+        reclaimed = await self.user_db.reclaim_expired_tasks(max_attempts=self.max_attempts)
+
+        if reclaimed['requeued']:
+            logger.warning(f"♻️ {len(reclaimed['requeued'])} ta task lease tugagani uchun navbatga qaytdi")
+
+        for task_data in reclaimed['exhausted']:
+            logger.error(f"❌ Task urinishlari tugadi: {task_data['task_uuid']}")
+            await self._handle_task_error(task_data, "Lease muddati tugadi (urinishlar tugadi)")
+
+    def _limit(self, task_type: str) -> int:
+        return self.concurrency.get(task_type, self.FALLBACK_CONCURRENCY)
+
+    def _running(self, task_type: str) -> int:
+        return sum(1 for t in self.in_flight_types.values() if t == task_type)
+
+    def _spawn(self, task_data: dict):
+        """Taskni fonda boshlash - navbat sikli uning tugashini kutmaydi"""
+        task_uuid = task_data['task_uuid']
+        task = asyncio.create_task(self._run_with_lease(task_data))
+        self.in_flight[task_uuid] = task
+        self.in_flight_types[task_uuid] = task_data.get('type')
+        task.add_done_callback(lambda _: self._on_task_done(task_uuid))
+
+    def _on_task_done(self, task_uuid: str):
+        self.in_flight.pop(task_uuid, None)
+        self.in_flight_types.pop(task_uuid, None)
+        if self.is_running:
+            # Slot bo'shadi - navbatdagi task'ni darhol olish
+            task_notifier.notify()
+
+    async def _run_with_lease(self, task_data: dict):
+        """Task bajarilayotganda lease'ni heartbeat bilan uzaytirib turish"""
+        # Pullik task'ning OpenAI so'rovlari bepullarnikidan oldin o'tadi
+        # (yo'lak task kontekstiga create_task paytida yoziladi)
+        priority = PRIORITY_PAID if (task_data.get('amount_charged') or 0) > 0 else PRIORITY_FREE
+        with openai_priority(priority):
+            work = asyncio.create_task(self._process_task(task_data))
+        heartbeat = asyncio.create_task(self._heartbeat(task_data['task_uuid'], work))
+        started = time.monotonic()
+        try:
+            await work
+            self._record_duration(task_data.get('type'), time.monotonic() - started)
+        finally:
+            heartbeat.cancel()
+            if not work.done():
+                work.cancel()
+
+    def _record_duration(self, task_type: str, elapsed: float):
+        """Kutish vaqtini baholash uchun o'rtacha davomiylik (EMA)"""
+        previous = self.avg_durations.get(task_type, self.FALLBACK_DURATION)
+        self.avg_durations[task_type] = previous * 0.8 + elapsed * 0.2
+
+    # ==================== NAVBAT XABARLARI ====================
+
+    def _schedule_queue_report(self):
+        """Navbat xabarlarini fonda yangilash - claim sikli Telegram'ni kutmaydi"""
+        if self._report_task is None or self._report_task.done():
+            self._report_task = asyncio.create_task(self._report_queue_positions())
+
+    def _estimate_wait(self, task_type: str, position: int) -> int:
+        """position-o'rindagi task uchun taxminiy kutish (soniya)"""
+        rounds = math.ceil(position / max(self._limit(task_type), 1))
+        return int(rounds * self.avg_durations.get(task_type, self.FALLBACK_DURATION))
+
+    async def _report_queue_positions(self):
+        """Kutayotgan foydalanuvchilarga navbatdagi o'rni va taxminiy kutish vaqtini yuborish"""
+        try:
+            snapshot = await self.user_db.get_queue_snapshot()
+        except Exception as e:
+            logger.error(f"Navbat holatini olishda xato: {e}")
+            return
+
+        depth = {}
+        for entry in snapshot:
+            depth[entry['type']] = depth.get(entry['type'], 0) + 1
+
+        positions = {}
+        waiting_uuids = set()
+        new_notices = 0
+        now = time.monotonic()
+
+        for entry in snapshot:
+            task_uuid, task_type, telegram_id = entry['task_uuid'], entry['type'], entry['telegram_id']
+            positions[task_type] = positions.get(task_type, 0) + 1
+            position = positions[task_type]
+            waiting_uuids.add(task_uuid)
+
+            if not telegram_id:
+                continue
+
+            message_id = entry['queue_message_id']
+            if message_id == 0:
+                # Boshqa replika hozir yuboryapti
+                continue
+
+            notice = self.queue_messages.get(task_uuid)
+            if message_id and notice is None:
+                # Xabarni boshqa replika (yoki oldingi ishga tushirish) yuborgan - faqat kuzatamiz
+                self.queue_messages[task_uuid] = {'message_id': message_id, 'position': position, 'updated_at': now}
+                continue
+            if notice and (notice['position'] == position or now - notice['updated_at'] < self.QUEUE_NOTICE_INTERVAL):
+                continue
+            if not message_id and new_notices >= self.QUEUE_NOTICE_BATCH:
+                continue
+
+            wait_minutes = max(1, round(self._estimate_wait(task_type, position) / 60))
+            text = (
+                f"⏳ <b>Navbatdasiz</b>\n\n"
+                f"📍 O'rningiz: {position}\n"
+                f"👥 Navbatda: {depth[task_type]} ta\n"
+                f"🕐 Taxminiy kutish: ~{wait_minutes} daqiqa\n\n"
+                f"Tayyor bo'lishi bilan shu yerda yangilanadi."
+            )
+
+            try:
+                if message_id:
+                    await self.bot.edit_message_text(text, telegram_id, message_id, parse_mode='HTML')
+                else:
+                    if not await self.user_db.reserve_queue_notice(task_uuid):
+                        continue
+                    try:
+                        msg = await self.bot.send_message(telegram_id, text, parse_mode='HTML')
+                    except Exception:
+                        await self.user_db.set_queue_message(task_uuid, None)
+                        raise
+                    message_id = msg.message_id
+                    await self.user_db.set_queue_message(task_uuid, message_id)
+                    new_notices += 1
+                self.queue_messages[task_uuid] = {'message_id': message_id, 'position': position, 'updated_at': now}
+            except Exception as e:
+                logger.warning(f"Navbat xabari yuborilmadi ({task_uuid}): {e}")
+
+        # Navbatdan chiqqan (boshqa worker olgan yoki bekor qilingan) task'lar
+        for task_uuid in list(self.queue_messages):
+            if task_uuid not in waiting_uuids and task_uuid not in self.in_flight:
+                self.queue_messages.pop(task_uuid, None)
+
+    async def _start_progress_message(self, task_data: dict, telegram_id: int, text: str) -> Optional[int]:
+        """Progress xabari - navbat xabari bo'lsa o'shani yangilaydi, aks holda yangisini yuboradi"""
+        notice = self.queue_messages.pop(task_data.get('task_uuid'), None)
+        # Navbat xabarini boshqa replika yuborgan bo'lishi mumkin - ID task qatorida
+        message_id = task_data.get('queue_message_id') or (notice or {}).get('message_id')
+        if message_id:
+            try:
+                await self.bot.edit_message_text(text, telegram_id, message_id, parse_mode='HTML')
+                return message_id
+            except Exception:
+                pass
+
+        msg = await self.bot.send_message(telegram_id, text, parse_mode='HTML')
+        return msg.message_id
+
+    def _token_progress(self, telegram_id: Optional[int], message_id: Optional[int], render) -> Optional[TokenProgress]:
+        """Streaming progress: render(progress) matni progress xabariga throttled yoziladi"""
+        if not (telegram_id and message_id):
+            return None
+
+        async def on_update(progress: TokenProgress):
+            await self.bot.edit_message_text(render(progress), telegram_id, message_id, parse_mode='HTML')
+
+        return TokenProgress(on_update)
+
+    async def _heartbeat(self, task_uuid: str, work: asyncio.Task):
+        while not work.done():
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                alive = await self.user_db.heartbeat_task(task_uuid, self.worker_id, lease_seconds=self.lease_seconds)
+            except Exception as e:
+                # Vaqtinchalik DB xatosi - lease hali amal qiladi, keyingi urinish
+                logger.warning(f"Heartbeat xato: {task_uuid} - {e}")
+                continue
+
+            if not alive and not work.done():
+                # Task boshqa worker'ga o'tgan yoki tugagan - ikki marta yaratmaslik uchun to'xtatamiz
+                logger.warning(f"⚠️ Lease yo'qotildi, task to'xtatildi: {task_uuid}")
+                work.cancel()
+                return
+
     async def _process_task(self, task_data: dict):
         """Bitta taskni qayta ishlash"""
         task_uuid = task_data.get('task_uuid')
@@ -156,7 +450,7 @@ class PresentationWorker:
         progress_message_id = None
 
         try:
-            self.user_db.update_task_status(task_uuid, 'processing', progress=5)
+            await self.user_db.update_task_status(task_uuid, 'processing', progress=5)
 
             answers_json = task_data.get('answers', '{}')
             answers_data = json.loads(answers_json)
@@ -171,11 +465,11 @@ class PresentationWorker:
             language = answers_data.get('language', 'uz')
             language_name = answers_data.get('language_name', "O'zbek tili")
 
-            telegram_id = self._get_telegram_id(user_id)
+            telegram_id = await self._get_telegram_id(user_id)
 
             if telegram_id:
-                msg = await self.bot.send_message(
-                    telegram_id,
+                progress_message_id = await self._start_progress_message(
+                    task_data, telegram_id,
                     f"📝 <b>{work_name} yaratilmoqda...</b>\n\n"
                     f"📚 Mavzu: {topic[:50]}...\n"
                     f"🌐 Til: {language_name}\n\n"
@@ -184,10 +478,8 @@ class PresentationWorker:
                     f"2️⃣ ⏸ Formatlash\n"
                     f"3️⃣ ⏸ Fayl yaratish\n"
                     f"4️⃣ ⏸ Tayyor!\n\n"
-                    f"📊 Progress: 5%",
-                    parse_mode='HTML'
+                    f"📊 Progress: 5%"
                 )
-                progress_message_id = msg.message_id
 
             # Content yaratish
             logger.info(f"📝 OpenAI: {work_name} content yaratish")
@@ -195,20 +487,41 @@ class PresentationWorker:
             if not self.course_work_generator:
                 raise Exception("CourseWorkGenerator mavjud emas!")
 
-            content = await self.course_work_generator.generate_course_work_content(
-                work_type=work_type,
-                topic=topic,
-                subject=subject,
-                details=details,
-                page_count=page_count,
-                language=language,
-                use_gpt4=True
-            )
+            def render_progress(progress: TokenProgress) -> str:
+                steps = f"{progress.steps_done}/{progress.total_steps} bo'lim, " if progress.total_steps else ""
+                percent = 5 + (35 * progress.steps_done // progress.total_steps if progress.total_steps else 0)
+                return (
+                    f"📝 <b>{work_name} yaratilmoqda...</b>\n\n"
+                    f"📚 Mavzu: {topic[:50]}...\n"
+                    f"🌐 Til: {language_name}\n\n"
+                    f"⏳ <b>Jarayon:</b>\n"
+                    f"1️⃣ ⚙️ Matn tayyorlanmoqda... ({steps}{progress.tokens:,} token)\n"
+                    f"2️⃣ ⏸ Formatlash\n"
+                    f"3️⃣ ⏸ Fayl yaratish\n"
+                    f"4️⃣ ⏸ Tayyor!\n\n"
+                    f"📊 Progress: {percent}%"
+                )
+
+            token_progress = self._token_progress(telegram_id, progress_message_id, render_progress)
+            try:
+                content = await self.course_work_generator.generate_course_work_content(
+                    work_type=work_type,
+                    topic=topic,
+                    subject=subject,
+                    details=details,
+                    page_count=page_count,
+                    language=language,
+                    use_gpt4=True,
+                    progress=token_progress
+                )
+            finally:
+                if token_progress:
+                    await token_progress.stop()
 
             if not content:
                 raise Exception("Content yaratilmadi")
 
-            self.user_db.update_task_status(task_uuid, 'processing', progress=40)
+            await self.user_db.update_task_status(task_uuid, 'processing', progress=40)
 
             if telegram_id and progress_message_id:
                 try:
@@ -240,7 +553,7 @@ class PresentationWorker:
                 if not self.docx_generator:
                     raise Exception("DocxGenerator mavjud emas!")
 
-                success = self.docx_generator.create_course_work(content, output_path, work_type)
+                success = await self.render_pool.run(render_course_work, content, output_path, work_type)
 
                 if not success:
                     raise Exception("DOCX yaratilmadi")
@@ -252,7 +565,7 @@ class PresentationWorker:
                 if not self.docx_generator:
                     raise Exception("DocxGenerator mavjud emas!")
 
-                success = self.docx_generator.create_course_work(content, docx_path, work_type)
+                success = await self.render_pool.run(render_course_work, content, docx_path, work_type)
 
                 if not success:
                     raise Exception("DOCX yaratilmadi")
@@ -274,7 +587,7 @@ class PresentationWorker:
                     except:
                         pass
 
-            self.user_db.update_task_status(task_uuid, 'processing', progress=80)
+            await self.user_db.update_task_status(task_uuid, 'processing', progress=80)
 
             if telegram_id and progress_message_id:
                 try:
@@ -325,7 +638,7 @@ Muvaffaqiyatlar! 🚀
                     logger.error(f"Yuborishda xato: {e}")
                     raise
 
-            self.user_db.update_task_status(task_uuid, 'completed', progress=100, file_path=output_path)
+            await self.user_db.update_task_status(task_uuid, 'completed', progress=100, file_path=output_path)
 
             if telegram_id and progress_message_id:
                 try:
@@ -395,7 +708,7 @@ Muvaffaqiyatlar! 🚀
         progress_message_id = None
 
         try:
-            self.user_db.update_task_status(task_uuid, 'processing', progress=5)
+            await self.user_db.update_task_status(task_uuid, 'processing', progress=5)
 
             # Theme olish
             theme_id = None
@@ -415,28 +728,43 @@ Muvaffaqiyatlar! 🚀
             except:
                 pass
 
-            telegram_id = self._get_telegram_id(user_id)
+            telegram_id = await self._get_telegram_id(user_id)
             if telegram_id:
                 theme_text = f"\n🎨 Theme: {theme_name}" if theme_id else ""
-                msg = await self.bot.send_message(
-                    telegram_id,
+                progress_message_id = await self._start_progress_message(
+                    task_data, telegram_id,
                     f"🎨 <b>Prezentatsiya yaratilmoqda...</b>{theme_text}\n\n"
                     f"⏳ <b>Jarayon:</b>\n"
                     f"1️⃣ ⚙️ Kontent yaratilmoqda...\n"
                     f"2️⃣ ⏸ Dizayn qilinmoqda\n"
                     f"3️⃣ ⏸ Rasmlar qo'shilmoqda\n"
                     f"4️⃣ ⏸ Tayyor!\n\n"
-                    f"📊 Progress: 5%",
-                    parse_mode='HTML'
+                    f"📊 Progress: 5%"
                 )
-                progress_message_id = msg.message_id
 
-            # 1. Content yaratish (GPT-4o)
-            content = await self._generate_content(task_data)
+            # 1. Content yaratish (GPT-4o) - javob stream qilinadi, xabarda tokenlar soni
+            theme_line = f"\n🎨 Theme: {theme_name}" if theme_id else ""
+            token_progress = self._token_progress(
+                telegram_id, progress_message_id,
+                lambda progress: (
+                    f"🎨 <b>Prezentatsiya yaratilmoqda...</b>{theme_line}\n\n"
+                    f"⏳ <b>Jarayon:</b>\n"
+                    f"1️⃣ ⚙️ Kontent yaratilmoqda... ({progress.tokens:,} token)\n"
+                    f"2️⃣ ⏸ Dizayn qilinmoqda\n"
+                    f"3️⃣ ⏸ Rasmlar qo'shilmoqda\n"
+                    f"4️⃣ ⏸ Tayyor!\n\n"
+                    f"📊 Progress: 5%"
+                )
+            )
+            try:
+                content = await self._generate_content(task_data, progress=token_progress)
+            finally:
+                if token_progress:
+                    await token_progress.stop()
             if not content:
                 raise Exception("Content yaratilmadi")
 
-            self.user_db.update_task_status(task_uuid, 'processing', progress=30)
+            await self.user_db.update_task_status(task_uuid, 'processing', progress=30)
 
             if telegram_id and progress_message_id:
                 try:
@@ -464,7 +792,7 @@ Muvaffaqiyatlar! 🚀
                     logger.info(f"🎨 ProPPTXGenerator bilan PPTX yaratish (theme: {theme_id})")
                     gen = self.pro_pptx_generator(theme_id=theme_id)
 
-                    self.user_db.update_task_status(task_uuid, 'processing', progress=50)
+                    await self.user_db.update_task_status(task_uuid, 'processing', progress=50)
 
                     if telegram_id and progress_message_id:
                         try:
@@ -485,6 +813,7 @@ Muvaffaqiyatlar! 🚀
                         content=content,
                         output_path=output_path,
                         pixabay_api_key=self.pixabay_api_key,
+                        render_pool=self.render_pool,
                     )
 
                     if pptx_created and os.path.exists(output_path):
@@ -520,7 +849,7 @@ Muvaffaqiyatlar! 🚀
                 if not generation_id:
                     raise Exception("generationId topilmadi")
 
-                self.user_db.update_task_status(task_uuid, 'processing', progress=50)
+                await self.user_db.update_task_status(task_uuid, 'processing', progress=50)
 
                 is_ready = await self.presenton_api.wait_for_completion(
                     generation_id, timeout_seconds=600, check_interval=10, wait_for_pptx=True
@@ -537,11 +866,11 @@ Muvaffaqiyatlar! 🚀
                 # Eski post-processor (faqat Presenton fallback uchun)
                 if self.pptx_post_processor:
                     try:
-                        self.pptx_post_processor(output_path)
+                        await self.render_pool.run(post_process_presentation, output_path)
                     except Exception as e:
                         logger.warning(f"⚠️ Post-processing xato: {e}")
 
-            self.user_db.update_task_status(task_uuid, 'processing', progress=90, file_path=output_path)
+            await self.user_db.update_task_status(task_uuid, 'processing', progress=90, file_path=output_path)
 
             if telegram_id and progress_message_id:
                 try:
@@ -578,7 +907,7 @@ Muvaffaqiyatlar! 🚀
                     logger.error(f"❌ Telegram send_document xato ({type(e).__name__}): {e}")
                     raise
 
-            self.user_db.update_task_status(task_uuid, 'completed', progress=100, file_path=output_path)
+            await self.user_db.update_task_status(task_uuid, 'completed', progress=100, file_path=output_path)
 
             if telegram_id and progress_message_id:
                 try:
@@ -612,18 +941,18 @@ Muvaffaqiyatlar! 🚀
         task_uuid = task_data.get('task_uuid')
         user_id = task_data.get('user_id')
 
-        self.user_db.update_task_status(task_uuid, 'failed', error_message=error_message)
+        await self.user_db.update_task_status(task_uuid, 'failed', error_message=error_message)
 
         # Balans qaytarish
         try:
-            task_info = self.user_db.get_task_by_uuid(task_uuid)
+            task_info = await self.user_db.get_task_by_uuid(task_uuid)
             if task_info and task_info.get('amount_charged'):
                 amount = task_info['amount_charged']
-                telegram_id = self._get_telegram_id(user_id)
+                telegram_id = await self._get_telegram_id(user_id)
 
                 if telegram_id and amount > 0:
-                    self.user_db.add_to_balance(telegram_id, amount)
-                    self.user_db.create_transaction(
+                    await self.user_db.add_to_balance(telegram_id, amount)
+                    await self.user_db.create_transaction(
                         telegram_id=telegram_id,
                         transaction_type='refund',
                         amount=amount,
@@ -635,7 +964,7 @@ Muvaffaqiyatlar! 🚀
             logger.error(f"Balans qaytarishda xato: {e}")
 
         # User'ga xabar
-        telegram_id = self._get_telegram_id(user_id)
+        telegram_id = await self._get_telegram_id(user_id)
         if telegram_id:
             try:
                 await self.bot.send_message(
@@ -648,8 +977,8 @@ Muvaffaqiyatlar! 🚀
             except:
                 pass
 
-    async def _generate_content(self, task_data: dict) -> Optional[dict]:
-        """Content yaratish — pre-generated yoki AI orqali"""
+    async def _generate_content(self, task_data: dict, progress: Optional[TokenProgress] = None) -> Optional[dict]:
+        """Content yaratish — pre-generated yoki AI orqali (progress berilsa AI javobi stream qilinadi)"""
         task_type = task_data.get('type')
         answers_json = task_data.get('answers', '{}')
 
@@ -667,23 +996,25 @@ Muvaffaqiyatlar! 🚀
 
             if task_type == 'pitch_deck':
                 answers = answers_data.get('answers', [])
-                return await self.content_generator.generate_pitch_deck_content(answers, use_gpt4=True)
+                return await self.content_generator.generate_pitch_deck_content(
+                    answers, use_gpt4=True, progress=progress
+                )
             else:
                 topic = answers_data.get('topic', '')
                 details = answers_data.get('details', '')
                 slide_count = answers_data.get('slide_count', 10)
                 language = answers_data.get('language', 'uz')
                 return await self.content_generator.generate_presentation_content(
-                    topic, details, slide_count, use_gpt4=True, language=language
+                    topic, details, slide_count, use_gpt4=True, language=language, progress=progress
                 )
         except Exception as e:
             logger.error(f"Content generation xato: {e}")
             return None
 
-    def _get_telegram_id(self, user_id: int) -> Optional[int]:
+    async def _get_telegram_id(self, user_id: int) -> Optional[int]:
         """Telegram ID olish"""
         try:
-            user = self.user_db.execute(
+            user = await self.user_db.execute(
                 "SELECT telegram_id FROM Users WHERE id = ?",
                 parameters=(user_id,),
                 fetchone=True
@@ -10,6 +10,9 @@ import os
 import json
 from typing import Optional, Dict
 
+from utils.misc.http_client import HttpClient
+from utils.misc.polling import StatusMultiplexer
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +48,17 @@ class PresentonAPI:
     def __init__(self, base_url: str = None):
         self.base_url = (base_url or os.getenv("PRESENTON_URL", "http://presenton:80")).rstrip("/")
         self.timeout = aiohttp.ClientTimeout(total=600)
+        # Bitta uzoq yashovchi sessiya - status poll'lari keep-alive ulanishlarda
+        self.http = HttpClient("presenton", timeout=self.timeout, limit_per_host=20)
+        self.status_mux = StatusMultiplexer(self.check_status, name="presenton")
+
+    async def start(self):
+        """on_startup: sessiyani oldindan ochish"""
+        await self.http.start()
+
+    async def close(self):
+        """on_shutdown: ulanishlarni yopish"""
+        await self.http.close()
 
     def _get_template(self, gamma_theme_id: str) -> str:
         """Gamma theme ID ni Presenton template ga mapping"""
@@ -82,44 +96,43 @@ class PresentonAPI:
         }
 
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                url = f"{self.base_url}/api/v1/ppt/presentation/generate/async"
-                logger.info(f"Presenton API: POST {url}")
-                logger.info(f"Cards: {num_cards}, Template: {template}")
-
-                async with session.post(url, json=payload) as response:
-                    response_text = await response.text()
-                    logger.info(f"Response status: {response.status}")
-                    logger.info(f"Response: {response_text[:500]}")
-
-                    if response.status in [200, 201]:
-                        result = json.loads(response_text) if response_text else {}
-
-                        # Async endpoint task_id yoki id qaytaradi
-                        task_id = result.get("id") or result.get("task_id") or result.get("presentation_id")
-                        if task_id:
-                            logger.info(f"Task ID: {task_id}")
-                            return {
-                                "generationId": task_id,
-                                "status": "processing",
-                            }
-                        else:
-                            logger.error(f"Task ID yo'q: {result}")
-                            return None
+            url = f"{self.base_url}/api/v1/ppt/presentation/generate/async"
+            logger.info(f"Presenton API: POST {url}")
+            logger.info(f"Cards: {num_cards}, Template: {template}")
+
+            async with self.http.request("POST", url, endpoint="generate/async", json=payload) as response:
+                response_text = await response.text()
+                logger.info(f"Response status: {response.status}")
+                logger.info(f"Response: {response_text[:500]}")
+
+                if response.status in [200, 201]:
+                    result = json.loads(response_text) if response_text else {}
+
+                    # Async endpoint task_id yoki id qaytaradi
+                    task_id = result.get("id") or result.get("task_id") or result.get("presentation_id")
+                    if task_id:
+                        logger.info(f"Task ID: {task_id}")
+                        return {
+                            "generationId": task_id,
+                            "status": "processing",
+                        }
                     else:
-                        logger.error(f"Presenton API XATO ({response.status}): {response_text[:300]}")
-
-                        if theme_id and not _retry_without_theme and response.status in [400, 422, 500]:
-                            logger.warning(f"Template '{template}' bilan xato! Default bilan qayta urinib ko'ramiz...")
-                            return await self.create_presentation_from_text(
-                                text_content=text_content,
-                                title=title,
-                                num_cards=num_cards,
-                                text_mode=text_mode,
-                                theme_id=None,
-                                _retry_without_theme=True,
-                            )
+                        logger.error(f"Task ID yo'q: {result}")
                         return None
+                else:
+                    logger.error(f"Presenton API XATO ({response.status}): {response_text[:300]}")
+
+                    if theme_id and not _retry_without_theme and response.status in [400, 422, 500]:
+                        logger.warning(f"Template '{template}' bilan xato! Default bilan qayta urinib ko'ramiz...")
+                        return await self.create_presentation_from_text(
+                            text_content=text_content,
+                            title=title,
+                            num_cards=num_cards,
+                            text_mode=text_mode,
+                            theme_id=None,
+                            _retry_without_theme=True,
+                        )
+                    return None
 
         except asyncio.TimeoutError:
             logger.error("Timeout")
@@ -140,82 +153,84 @@ class PresentonAPI:
         Endpoint: GET /api/v1/ppt/presentation/status/{id}
         """
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                url = f"{self.base_url}/api/v1/ppt/presentation/status/{generation_id}"
-
-                async with session.get(url) as response:
-                    response_text = await response.text()
-
-                    if response.status == 200:
-                        result = json.loads(response_text)
-                        logger.info(f"Status to'liq javob: {json.dumps(result)[:800]}")
-
-                        status = result.get("status", "unknown")
-
-                        # Status mapping
-                        status_map = {
-                            "pending": "processing",
-                            "processing": "processing",
-                            "in_progress": "processing",
-                            "completed": "completed",
-                            "done": "completed",
-                            "error": "failed",
-                            "failed": "failed",
-                        }
-                        mapped_status = status_map.get(status, status)
-
-                        # PPTX URL olish — Presenton turli formatda qaytarishi mumkin
-                        pptx_url = ""
-                        presentation_id = ""
-
-                        # Top-level tekshirish
-                        pptx_url = (
-                            result.get("path", "") or
-                            result.get("pptx_url", "") or
-                            result.get("export_url", "") or
-                            result.get("pptx_path", "") or
-                            result.get("file_url", "") or
-                            result.get("download_url", "")
-                        )
-                        presentation_id = (
-                            result.get("presentation_id", "") or
-                            result.get("id", "") or
-                            result.get("task_id", "")
-                        )
-
-                        # "data" ichida tekshirish
-                        data = result.get("data")
-                        if isinstance(data, dict):
-                            if not pptx_url:
-                                pptx_url = (
-                                    data.get("path", "") or
-                                    data.get("pptx_url", "") or
-                                    data.get("export_url", "") or
-                                    data.get("pptx_path", "") or
-                                    data.get("file_url", "") or
-                                    data.get("download_url", "")
-                                )
-                            if not presentation_id:
-                                presentation_id = (
-                                    data.get("presentation_id", "") or
-                                    data.get("id", "")
-                                )
-
-                        logger.info(f"pptx_url='{pptx_url}', presentation_id='{presentation_id}'")
+            url = f"{self.base_url}/api/v1/ppt/presentation/status/{generation_id}"
+
+            async with self.http.request("GET", url, endpoint="status") as response:
+                response_text = await response.text()
+
+                if response.status == 200:
+                    result = json.loads(response_text)
+                    logger.info(f"Status to'liq javob: {json.dumps(result)[:800]}")
+
+                    status = result.get("status", "unknown")
+
+                    # Status mapping
+                    status_map = {
+                        "pending": "processing",
+                        "processing": "processing",
+                        "in_progress": "processing",
+                        "completed": "completed",
+                        "done": "completed",
+                        "error": "failed",
+                        "failed": "failed",
+                    }
+                    mapped_status = status_map.get(status, status)
+
+                    # PPTX URL olish — Presenton turli formatda qaytarishi mumkin
+                    pptx_url = ""
+                    presentation_id = ""
+
+                    # Top-level tekshirish
+                    pptx_url = (
+                        result.get("path", "") or
+                        result.get("pptx_url", "") or
+                        result.get("export_url", "") or
+                        result.get("pptx_path", "") or
+                        result.get("file_url", "") or
+                        result.get("download_url", "")
+                    )
+                    presentation_id = (
+                        result.get("presentation_id", "") or
+                        result.get("id", "") or
+                        result.get("task_id", "")
+                    )
+
+                    # "data" ichida tekshirish
+                    data = result.get("data")
+                    if isinstance(data, dict):
+                        if not pptx_url:
+                            pptx_url = (
+                                data.get("path", "") or
+                                data.get("pptx_url", "") or
+                                data.get("export_url", "") or
+                                data.get("pptx_path", "") or
+                                data.get("file_url", "") or
+                                data.get("download_url", "")
+                            )
+                        if not presentation_id:
+                            presentation_id = (
+                                data.get("presentation_id", "") or
+                                data.get("id", "")
+                            )
 
-                        return {
-                            "status": mapped_status,
-                            "pptxUrl": pptx_url,
-                            "gammaUrl": "",
-                            "pdfUrl": "",
-                            "files": [],
-                            "exports": {},
-                            "result": result,
-                            "presentation_id": presentation_id,
-                        }
-                    else:
-                        logger.error(f"Status xato ({response.status}): {response_text[:300]}")
-                        return None
+                    logger.info(f"pptx_url='{pptx_url}', presentation_id='{presentation_id}'")
+
+                    return {
+                        "status": mapped_status,
+                        "pptxUrl": pptx_url,
+                        "gammaUrl": "",
+                        "pdfUrl": "",
+                        "files": [],
+                        "exports": {},
+                        "result": result,
+                        "presentation_id": presentation_id,
+                        # Poller uchun server maslahatlari (bo'lsa)
+                        "progress": result.get("progress"),
+                        "retry_after": response.headers.get("Retry-After"),
+                    }
+                else:
+                    logger.error(f"Status xato ({response.status}): {response_text[:300]}")
+                    return None
 
         except Exception as e:
             logger.error(f"Status xato: {e}")
@@ -233,24 +248,23 @@ class PresentonAPI:
             # Download uchun alohida timeout (uzoqroq)
             download_timeout = aiohttp.ClientTimeout(total=300, sock_read=120)
 
-            async with aiohttp.ClientSession(timeout=download_timeout) as session:
-                logger.info(f"Download (streaming): {file_url[:100]}...")
+            logger.info(f"Download (streaming): {file_url[:100]}...")
 
-                async with session.get(file_url) as response:
-                    if response.status == 200:
-                        total = 0
-                        with open(output_path, "wb") as f:
-                            async for chunk in response.content.iter_chunked(65536):
-                                f.write(chunk)
-                                total += len(chunk)
+            async with self.http.request("GET", file_url, endpoint="download", timeout=download_timeout) as response:
+                if response.status == 200:
+                    total = 0
+                    with open(output_path, "wb") as f:
+                        async for chunk in response.content.iter_chunked(65536):
+                            f.write(chunk)
+                            total += len(chunk)
 
-                        file_size = os.path.getsize(output_path)
-                        logger.info(f"Saqlandi: {output_path} ({file_size} bytes)")
-                        return file_size > 0
-                    else:
-                        resp_text = await response.text()
-                        logger.error(f"Download xato ({response.status}): {resp_text[:200]}")
-                        return False
+                    file_size = os.path.getsize(output_path)
+                    logger.info(f"Saqlandi: {output_path} ({file_size} bytes)")
+                    return file_size > 0
+                else:
+                    resp_text = await response.text()
+                    logger.error(f"Download xato ({response.status}): {resp_text[:200]}")
+                    return False
 
         except asyncio.TimeoutError:
             logger.error(f"Download timeout: {file_url[:80]}")
@@ -306,13 +320,12 @@ class PresentonAPI:
     async def _get_presentation(self, presentation_id: str) -> Optional[Dict]:
         """Prezentatsiya ma'lumotlarini olish"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                url = f"{self.base_url}/api/v1/ppt/presentation/{presentation_id}"
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        return json.loads(await response.text())
-                    logger.error(f"Presentation olish xato: {response.status}")
-                    return None
+            url = f"{self.base_url}/api/v1/ppt/presentation/{presentation_id}"
+            async with self.http.request("GET", url, endpoint="presentation") as response:
+                if response.status == 200:
+                    return json.loads(await response.text())
+                logger.error(f"Presentation olish xato: {response.status}")
+                return None
         except Exception as e:
             logger.error(f"Presentation olish xato: {e}")
             return None
@@ -334,43 +347,42 @@ class PresentonAPI:
 
             export_timeout = aiohttp.ClientTimeout(total=300, sock_read=120)
 
-            async with aiohttp.ClientSession(timeout=export_timeout) as session:
-                url = f"{self.base_url}/api/v1/ppt/presentation/export/pptx"
-                logger.info(f"Export PPTX: {url}, pres_id={pres_id}")
-
-                # Faqat ID yuboramiz (to'liq data emas)
-                payload = {"presentation_id": pres_id} if pres_id else presentation_data
-
-                async with session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        content_type = response.headers.get("content-type", "")
-                        logger.info(f"Export content-type: {content_type}")
-
-                        if "application/json" in content_type:
-                            result = json.loads(await response.text())
-                            logger.info(f"Export JSON javob: {str(result)[:300]}")
-                            file_url = (
-                                result.get("path", "") or
-                                result.get("url", "") or
-                                result.get("pptx_url", "") or
-                                result.get("download_url", "")
-                            )
-                            if file_url:
-                                return await self.download_file(file_url, output_path)
-                        else:
-                            # To'g'ridan-to'g'ri fayl (streaming)
-                            total = 0
-                            with open(output_path, "wb") as f:
-                                async for chunk in response.content.iter_chunked(65536):
-                                    f.write(chunk)
-                                    total += len(chunk)
-                            file_size = os.path.getsize(output_path)
-                            logger.info(f"PPTX saqlandi: {output_path} ({file_size} bytes)")
-                            return file_size > 0
+            url = f"{self.base_url}/api/v1/ppt/presentation/export/pptx"
+            logger.info(f"Export PPTX: {url}, pres_id={pres_id}")
 
-                    resp_text = await response.text()
-                    logger.error(f"Export xato ({response.status}): {resp_text[:300]}")
-                    return False
+            # Faqat ID yuboramiz (to'liq data emas)
+            payload = {"presentation_id": pres_id} if pres_id else presentation_data
+
+            async with self.http.request("POST", url, endpoint="export/pptx", json=payload, timeout=export_timeout) as response:
+                if response.status == 200:
+                    content_type = response.headers.get("content-type", "")
+                    logger.info(f"Export content-type: {content_type}")
+
+                    if "application/json" in content_type:
+                        result = json.loads(await response.text())
+                        logger.info(f"Export JSON javob: {str(result)[:300]}")
+                        file_url = (
+                            result.get("path", "") or
+                            result.get("url", "") or
+                            result.get("pptx_url", "") or
+                            result.get("download_url", "")
+                        )
+                        if file_url:
+                            return await self.download_file(file_url, output_path)
+                    else:
+                        # To'g'ridan-to'g'ri fayl (streaming)
+                        total = 0
+                        with open(output_path, "wb") as f:
+                            async for chunk in response.content.iter_chunked(65536):
+                                f.write(chunk)
+                                total += len(chunk)
+                        file_size = os.path.getsize(output_path)
+                        logger.info(f"PPTX saqlandi: {output_path} ({file_size} bytes)")
+                        return file_size > 0
+
+                resp_text = await response.text()
+                logger.error(f"Export xato ({response.status}): {resp_text[:300]}")
+                return False
 
         except asyncio.TimeoutError:
             logger.error("Export timeout")
@@ -392,46 +404,36 @@ class PresentonAPI:
             check_interval: int = 10,
             wait_for_pptx: bool = True,
     ) -> bool:
-        """Generation tayyor bo'lishini kutish"""
-        elapsed = 0
-        logger.info(f"Kutish: max {timeout_seconds}s, interval {check_interval}s")
-
-        while elapsed < timeout_seconds:
-            status_info = await self.check_status(generation_id)
-
-            if not status_info:
-                logger.warning("Status xato, qayta...")
-                await asyncio.sleep(check_interval)
-                elapsed += check_interval
-                continue
+        """
+        Generation tayyor bo'lishini kutish.
 
+        Interval adaptiv (2s dan check_interval gacha), barcha kutilayotgan
+        generation'lar bitta status_mux siklida poll qilinadi.
+        """
+        def is_done(status_info: Dict) -> Optional[bool]:
             status = status_info.get("status", "")
 
             if status in ("failed", "error"):
-                error_data = status_info.get("result", {})
-                error_msg = error_data.get("error", "Noma'lum xato")
+                error_data = status_info.get("result") or {}
+                error_msg = error_data.get("error", "Noma'lum xato") if isinstance(error_data, dict) else error_data
                 logger.error(f"Generation failed! Error: {error_msg}")
                 return False
 
             if status == "completed":
-                if wait_for_pptx:
-                    pptx_url = status_info.get("pptxUrl", "")
-                    presentation_id = status_info.get("presentation_id", "")
-                    if pptx_url or presentation_id:
-                        logger.info("Tayyor! PPTX mavjud!")
-                        return True
-                    else:
-                        logger.info("Completed, lekin PPTX hali yo'q...")
-                else:
+                if not wait_for_pptx:
                     logger.info("Tayyor!")
                     return True
+                if status_info.get("pptxUrl", "") or status_info.get("presentation_id", ""):
+                    logger.info("Tayyor! PPTX mavjud!")
+                    return True
+                logger.info("Completed, lekin PPTX hali yo'q...")
 
-            logger.info(f"{elapsed}s / {timeout_seconds}s (status: {status})")
-            await asyncio.sleep(check_interval)
-            elapsed += check_interval
+            return None
 
-        logger.error(f"Timeout: {timeout_seconds}s")
-        return False
+        logger.info(f"Kutish: max {timeout_seconds}s, interval <= {check_interval}s")
+        return await self.status_mux.wait(
+            generation_id, is_done, timeout=timeout_seconds, max_interval=check_interval
+        )
 
     def format_content_for_gamma(self, content: Dict, content_type: str) -> str:
         """Content'ni Presenton uchun formatlash (Gamma interface saqlanadi)"""
@@ -546,13 +548,12 @@ TAKLIF:
     async def get_themes(self, limit: int = 50) -> Optional[list]:
         """Shablonlarni olish"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                url = f"{self.base_url}/api/v1/ppt/template-management/summary"
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        result = json.loads(await response.text())
-                        return result if isinstance(result, list) else [result]
-                    return None
+            url = f"{self.base_url}/api/v1/ppt/template-management/summary"
+            async with self.http.request("GET", url, endpoint="templates") as response:
+                if response.status == 200:
+                    result = json.loads(await response.text())
+                    return result if isinstance(result, list) else [result]
+                return None
         except Exception as e:
             logger.error(f"Templates xato: {e}")
             return None
@@ -0,0 +1,118 @@
+# utils/render_pool.py
+# PPTX/DOCX yig'ish (python-pptx / python-docx) - sof CPU ish, alohida process'larda
+#
+# Render funksiyalari modul darajasida (pickle qilinadi): content dict kiradi,
+# tayyor fayl yo'li chiqadi. Rasm yuklash, OpenAI va Telegram - event loop'da qoladi.
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== RENDER FUNKSIYALARI (child process) ====================
+
+def render_presentation(theme_id: Optional[str], content: Dict, images: Dict, output_path: str) -> str:
+    """ProPPTXGenerator._build - tayyor content va yuklangan rasmlardan PPTX"""
+    from utils.pptx_generator import ProPPTXGenerator
+
+    ProPPTXGenerator(theme_id=theme_id)._build(content, images, output_path)
+    return output_path
+
+
+def post_process_presentation(path: str) -> bool:
+    """Presenton'dan kelgan PPTX'ni tuzatish (shriftlar, chegaralar)"""
+    from utils.pptx_post_processor import post_process_pptx
+
+    return post_process_pptx(path)
+
+
+def render_course_work(content: Dict, output_path: str, work_type: str = 'mustaqil_ish') -> Optional[str]:
+    """Mustaqil ish / referat DOCX. Xato bo'lsa None"""
+    from utils.docx_generator import DocxGenerator
+
+    return output_path if DocxGenerator().create_course_work(content, output_path, work_type) else None
+
+
+def render_business_plan(content: Dict, output_path: str) -> Optional[str]:
+    """Biznes reja DOCX. Xato bo'lsa None"""
+    from utils.business_plan_docx import BusinessPlanDocx
+
+    return output_path if BusinessPlanDocx().create(content=content, output_path=output_path) else None
+
+
+def _noop(_=None):
+    return os.getpid()
+
+
+# ==================== POOL ====================
+
+class RenderPool:
+    """
+    Render funksiyalarini ProcessPoolExecutor'da bajarish.
+
+        path = await render_pool.run(render_course_work, content, output_path, work_type)
+
+    max_workers=0 - process'siz rejim (bitta thread'da, event loop baribir
+    bloklanmaydi): kichik serverlar va benchmark uchun.
+
+    Process'lar forkserver orqali yaratiladi: bolalar thread'siz toza server
+    process'idan fork qilinadi, shuning uchun pool qachon (yoki BrokenProcessPool'dan
+    keyin qayta) yaratilishidan qat'i nazar ular DB/logging thread'lari ushlab
+    turgan qulflarni meros olmaydi. Server bir marta __main__ (app.py/worker.py)
+    va render modullarini import qiladi. start() pool'ni oldindan qizdiradi.
+    """
+
+    def __init__(self, max_workers: int = None):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self._executor = None
+
+    def _create_executor(self):
+        if self.max_workers <= 0:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+        try:
+            context = multiprocessing.get_context("forkserver")
+        except ValueError:
+            # forkserver yo'q platformalar (Windows) - spawn
+            context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = self._create_executor()
+        return self._executor
+
+    def start(self):
+        """Pool'ni oldindan qizdirish (birinchi render forkserver ishga tushishini kutmasligi uchun)"""
+        executor = self.executor
+        if isinstance(executor, ProcessPoolExecutor):
+            pids = set(executor.map(_noop, range(self.max_workers)))
+            logger.info(f"✅ Render pool tayyor: {len(pids)} ta process")
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        except BrokenProcessPool:
+            # Child process o'ldi (masalan, OOM) - keyingi task'lar uchun pool qayta yaratiladi
+            logger.error("❌ Render process to'satdan to'xtadi, pool qayta yaratilmoqda")
+            self._executor = None
+            raise
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+render_pool = RenderPool(max_workers=int(os.getenv("RENDER_PROCESSES", os.cpu_count() or 1)))
@@ -0,0 +1,63 @@
+# utils/task_events.py
+# Yangi task yaratilganda PresentationWorker'ni darhol uyg'otish (jarayon ichida)
+
+import asyncio
+from typing import Optional
+
+
+class TaskNotifier:
+    """
+    asyncio.Event ustidagi yupqa qatlam.
+
+    notify() istalgan thread'dan chaqirilishi mumkin (masalan, AsyncDatabase
+    thread pool'idagi create_presentation_task ichidan) - event worker'ning
+    event loop'ida o'rnatiladi.
+    """
+
+    def __init__(self):
+        self._event: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_event(self) -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if self._event is None or self._loop is not loop:
+            self._event = asyncio.Event()
+            self._loop = loop
+        return self._event
+
+    def clear(self):
+        """Navbatni o'qishdan OLDIN chaqiriladi - signal yo'qolmasligi uchun"""
+        self._ensure_event().clear()
+
+    async def wait(self, timeout: float) -> bool:
+        """Signal kelguncha yoki timeout tugaguncha kutish. Signal kelsa True."""
+        event = self._ensure_event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def notify(self):
+        loop, event = self._loop, self._event
+        if loop is None or event is None or loop.is_closed():
+            # Worker hali ishga tushmagan - keyingi sweep task'ni topadi
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            event.set()
+        else:
+            loop.call_soon_threadsafe(event.set)
+
+
+task_notifier = TaskNotifier()
+
+
+def notify_task_created():
+    """Yangi PresentationTasks qatori qo'shilganini worker'ga bildirish"""
+    task_notifier.notify()
@@ -8,7 +8,10 @@ Faylni utils/ papkasiga joylashtiring
 import json
 import logging
 import traceback
-from openai import AsyncOpenAI
+from typing import Optional
+
+from utils.misc.generation import TokenProgress, complete_chat
+from utils.misc.openai_pool import openai_pool
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +20,7 @@ class WeeklyReportGenerator:
     """ChatGPT orqali haftalik ish rejasi yaratuvchi"""
 
     def __init__(self, api_key: str):
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.client = openai_pool.client(api_key, feature="weekly_report")
 
     async def generate_weekly_report(
             self,
@@ -25,10 +28,12 @@ class WeeklyReportGenerator:
             mahalla: str,
             tuman: str,
             week_date: str,
-            tasks: dict
+            tasks: dict,
+            progress: Optional[TokenProgress] = None
     ) -> dict:
         """
         Haftalik ish rejasi contentini yaratish
+        (progress berilsa javob stream qilinadi)
         """
 
         # Foydalanuvchi kiritgan vazifalarni formatlash
@@ -100,7 +105,9 @@ Eslatma: Mas'ullar ustunida ALBATTA "{mahalla}" nomini yoz!
         try:
             logger.info(f"🚀 AI so'rov yuborilmoqda: {full_name}, {mahalla}")
 
-            response = await self.client.chat.completions.create(
+            content = await complete_chat(
+                self.client,
+                progress,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -116,7 +123,7 @@ Eslatma: Mas'ullar ustunida ALBATTA "{mahalla}" nomini yoz!
                 max_tokens=4000
             )
 
-            content = response.choices[0].message.content.strip()
+            content = content.strip()
             logger.info(f"📥 AI javob olindi, uzunlik: {len(content)}")
 
             # JSON tozalash
@@ -0,0 +1,89 @@
+# worker.py
+# Mustaqil PresentationWorker - bot polling va HTTP API'siz.
+#
+# Bir nechta replika bitta task jadvali (data/user.db) ustida ishlaydi:
+# task'lar atomar claim qilinadi (lease + heartbeat), har replika o'z worker_id'siga ega.
+# SIGTERM/SIGINT - yangi task olinmaydi, bajarilayotganlari WORKER_DRAIN_TIMEOUT
+# ichida tugatiladi, qolganlari navbatga qaytariladi.
+#
+#     python worker.py
+#     docker compose up -d --scale worker=3
+
+import asyncio
+import logging
+import signal
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("worker")
+
+from loader import bot, user_db, user_db_async, broadcast_db
+from data.config import (
+    OPENAI_API_KEY, PRESENTON_URL, WORKER_CONCURRENCY, WORKER_DRAIN_TIMEOUT, WORKER_RECOVERY_INTERVAL,
+)
+from utils.content_generator import ContentGenerator
+from utils.presenton_api import PresentonAPI
+from utils.presentation_worker import PresentationWorker
+from utils.render_pool import render_pool
+from utils.misc.llm_cache import llm_cache
+from utils.misc.openai_pool import openai_pool
+from utils.db_api.database import pool as db_pool
+from utils.db_api.migrations import create_tables, run_migrations
+
+
+async def main():
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    # Render pool boshqa thread'lar paydo bo'lishidan oldin qizdiriladi
+    render_pool.start()
+
+    # Worker bot'dan oldin (yoki bot'siz) ishga tushishi mumkin - task claim qilishdan
+    # oldin jadvallar, lease ustunlari/indeksi va AI kesh jadvali tayyor bo'lishi shart
+    create_tables(user_db, broadcast_db)
+    run_migrations(user_db)
+    llm_cache.db.create_table_llm_cache()
+
+    presenton_api = PresentonAPI(PRESENTON_URL)
+    await presenton_api.start()
+
+    worker = PresentationWorker(
+        bot=bot,
+        user_db=user_db_async,
+        content_generator=ContentGenerator(OPENAI_API_KEY),
+        presenton_api=presenton_api,
+        concurrency=WORKER_CONCURRENCY,
+        # Task boshqa process'da (bot/API) yaratiladi - signal kelmaydi, faqat polling
+        recovery_interval=WORKER_RECOVERY_INTERVAL
+    )
+
+    logger.info("=" * 50)
+    logger.info(f"🚀 WORKER ISHGA TUSHMOQDA: {worker.worker_id}")
+    logger.info("=" * 50)
+
+    await worker.start()
+    await stop_event.wait()
+
+    logger.info("⏹ To'xtatish signali - drain boshlandi")
+    try:
+        await worker.drain(timeout=WORKER_DRAIN_TIMEOUT)
+    finally:
+        await worker.stop()
+        await presenton_api.close()
+        await openai_pool.close()
+
+        session = await bot.get_session()
+        await session.close()
+
+        render_pool.shutdown(wait=False)
+        db_pool.close_all()
+
+    logger.info("✅ WORKER TO'XTATILDI")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())